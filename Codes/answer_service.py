@@ -0,0 +1,479 @@
+"""
+AI-CallConnect Answer Service
+
+Headless asyncio service exposing find_answer and text-to-speech over HTTP and
+WebSocket, so a telephony stack can use the matcher without Streamlit's rerun model.
+The corpus is loaded once at startup and shared by every connection.
+
+Endpoints:
+- POST /answer: {"question": ..., "domain": optional} returns the answer, score,
+  matching stage, corpus row and stage timings as JSON.
+- GET /speech?text=...: the spoken answer as audio, from the audio pack or the cache.
+  Only responses the service can give (corpus answers, fallback messages and the
+  greeting) are spoken, so callers cannot fill the cache or drive synthesis with text
+  of their own.
+- GET /ws: WebSocket for a whole call. Every JSON message {"id", "question",
+  "domain", "speech"} is answered with a JSON message, followed by the speech as
+  binary messages, one per sentence chunk, when speech is true.
+- GET /health and GET /metrics: liveness and the stage histograms in the Prometheus
+  text format.
+
+Matching is CPU-bound, so it runs in a pool of worker processes that each map the
+corpus pack (or parse the CSV) once; the event loop only parses requests and moves
+bytes. Text-to-speech is I/O-bound and runs on the loop's thread pool.
+
+Pre-fork mode (--prefork N, Unix only):
+- The parent loads the corpus and builds the index once, then freezes every object
+  with gc.freeze, so the garbage collector never writes to them, and forks N
+  workers. The workers share the index pages copy-on-write instead of each keeping a
+  copy, and the bulk of it (numpy buffers or the mapped pack) is never written at all.
+- Every worker runs its own event loop, matching on one thread of its own, so scoring
+  uses N cores. Where SO_REUSEPORT exists each worker listens on its own socket and
+  the kernel spreads connections evenly; elsewhere they share one listening socket.
+- GET /workers reports the answers, busy time, throughput and memory of every worker
+  from counters in shared memory, whichever worker serves the request.
+
+Usage:
+    python answer_service.py --port 8080 --workers 4
+    python answer_service.py --port 8080 --prefork 8
+"""
+
+# aiohttp: An asynchronous HTTP client/server framework for asyncio, used here for the HTTP and WebSocket endpoints.
+from aiohttp import WSMsgType, web
+
+# matching: The project's question matching engine, providing the answer lookup and the fixed responses.
+from matching import FALLBACK_MESSAGES, GREETING, match_question
+
+# corpus: The project's corpus loader, mapping the corpus pack when there is one.
+from corpus import load_corpus
+
+# audio_pack: The project's prebuilt response audio, falling back to the text-to-speech cache for other text.
+from audio_pack import get_speech
+
+# audio_cache: The project's text-to-speech cache, providing the MIME type of each audio format.
+from audio_cache import AUDIO_MIME_TYPES
+
+# streaming_tts: The project's sentence-chunked speech, handing out audio as soon as the first chunk is ready.
+from streaming_tts import SpeechStream
+
+# tracing: The project's stage timing, recording how long each request takes.
+from tracing import get_tracer
+
+# concurrent.futures: A Python module for running tasks in pools of threads or processes.
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# argparse: A Python module for parsing command-line arguments.
+import argparse
+
+# asyncio: A Python module for asynchronous I/O, used here to run the service.
+import asyncio
+
+# functools: A Python module of higher-order functions, used here to bind arguments for the executors.
+import functools
+
+# gc: The Python garbage collector interface, used here to freeze the shared index before forking.
+import gc
+
+# multiprocessing: A Python module for process-based parallelism, used here for counters shared by the workers.
+import multiprocessing
+
+# os: A Python module that provides a way of interacting with the operating system, used here to fork the workers.
+import os
+
+# signal: A Python module for handling signals, used here to stop the pre-forked workers.
+import signal
+
+# socket: A Python module for network sockets, used here for the listener shared by the workers.
+import socket
+
+# time: A Python module providing time-related functions, used here to time each request.
+import time
+
+# logging: A Python module for emitting log messages from applications and libraries.
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Defaults shared with the apps
+DEFAULT_CORPUS_PATH = "data/final/question_answer.csv"
+AUDIO_PACK_PATH = "data/final/answers.pack"
+
+# Longest accepted question, so one request cannot tie up a worker
+MAX_QUESTION_CHARS = 1000
+
+
+# Corpus of a worker process, set once by the pool initializer
+_worker_corpus = None
+
+
+def _init_worker(corpus_path):
+    global _worker_corpus
+    _worker_corpus = load_corpus(corpus_path)
+
+
+# Function to read the private and shared resident memory of a process in MB, on Linux
+def _memory_mb(pid):
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps:
+            for line in smaps:
+                name, _, value = line.partition(":")
+                if name in ("Private_Clean", "Private_Dirty", "Shared_Clean", "Shared_Dirty"):
+                    memory[name] = int(value.split()[0]) / 1024
+    except OSError:
+        return None, None
+    private = memory.get("Private_Clean", 0) + memory.get("Private_Dirty", 0)
+    shared = memory.get("Shared_Clean", 0) + memory.get("Shared_Dirty", 0)
+    return round(private, 1), round(shared, 1)
+
+
+class WorkerStats:
+    """
+    Answer counters of every serving process, in shared memory so that any of them can
+    report all of them. Each process only writes its own slot, so no lock is needed.
+
+    Args:
+    - slots (int): Number of serving processes.
+    """
+
+    # pid, answers and busy seconds of every slot
+    FIELDS = 3
+
+    def __init__(self, slots=1):
+        self.values = multiprocessing.RawArray("d", slots * self.FIELDS)
+        self.slots = slots
+        self.slot = 0
+        self.started = time.time()
+        self.values[0] = os.getpid()
+
+    # Function to take a slot, called by each worker after the fork
+    def claim(self, slot):
+        self.slot = slot
+        self.values[slot * self.FIELDS] = os.getpid()
+
+    # Function to count one answer of this process
+    def add(self, seconds):
+        base = self.slot * self.FIELDS
+        self.values[base + 1] += 1
+        self.values[base + 2] += seconds
+
+    # Function to list the counters and memory of every process
+    def report(self):
+        uptime = time.time() - self.started
+        rows = []
+        for slot in range(self.slots):
+            pid, answers, busy = self.values[slot * self.FIELDS : (slot + 1) * self.FIELDS]
+            private_mb, shared_mb = _memory_mb(int(pid))
+            rows.append(
+                {
+                    "slot": slot,
+                    "pid": int(pid),
+                    "answers": int(answers),
+                    "busy_seconds": round(busy, 3),
+                    "answers_per_second": round(answers / uptime, 3) if uptime else 0.0,
+                    "private_mb": private_mb,
+                    "shared_mb": shared_mb,
+                }
+            )
+        return rows
+
+
+# Function run in a worker process: match one question, returning a JSON-ready result
+def _answer_in_worker(question, domain):
+    timings = {}
+    match = match_question(
+        _worker_corpus.index,
+        question,
+        _worker_corpus.backend,
+        timings,
+        domain,
+        _worker_corpus.cache,
+    )
+    return {
+        "answer": match.answer,
+        "score": match.score,
+        "row": None if match.row is None else int(match.row),
+        "stage": match.stage,
+        "cached": "cache" in timings,
+        "timings_ms": {stage: seconds * 1000 for stage, seconds in timings.items()},
+    }
+
+
+class AnswerService:
+    """
+    State shared by every connection: the loaded corpus and the matching pool.
+
+    Args:
+    - corpus_path (str): Path of the question-answer corpus.
+    - workers (int): Number of matching processes, None for one per CPU, or 0 to match
+      in this process on one thread, as the pre-forked workers do.
+    - pack_path (str): Path of the prebuilt audio pack.
+    - stats (WorkerStats): Shared answer counters, or None for counters of this process.
+    """
+
+    def __init__(
+        self,
+        corpus_path=DEFAULT_CORPUS_PATH,
+        workers=None,
+        pack_path=AUDIO_PACK_PATH,
+        stats=None,
+    ):
+        self.corpus_path = corpus_path
+        self.pack_path = pack_path
+        # Loaded here too, so /health can report it and a bad corpus fails at startup
+        self.corpus = load_corpus(corpus_path)
+        if self.corpus.index is None:
+            raise ValueError(f"No questions found in {corpus_path}")
+        # Every text /speech accepts, built before any fork so the workers share it
+        self.responses = frozenset(
+            answer
+            for answer in list(self.corpus.index.answers) + FALLBACK_MESSAGES + [GREETING]
+            if isinstance(answer, str)
+        )
+        if workers == 0:
+            _init_worker(corpus_path)
+            self.pool = ThreadPoolExecutor(max_workers=1)
+        else:
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(corpus_path,)
+            )
+        self.stats = stats or WorkerStats()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    # Function to match a question in the worker pool
+    async def answer(self, question, domain=None):
+        loop = asyncio.get_running_loop()
+        trace = get_tracer().start_trace()
+        start = time.perf_counter()
+        with trace.span("find_answer"):
+            result = await loop.run_in_executor(
+                self.pool, _answer_in_worker, question, domain
+            )
+        self.stats.add(time.perf_counter() - start)
+        for stage, milliseconds in result["timings_ms"].items():
+            trace.record(f"match_{stage}", milliseconds / 1000)
+        trace.finish(request="service_answer", stage=result["stage"], score=result["score"])
+        return result
+
+    # Function to synthesize an answer whole, on the loop's thread pool
+    async def speech(self, text):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(get_speech, text, "en", self.pack_path)
+        )
+
+    # Function to synthesize an answer chunk by chunk, yielding (audio, format) as each is ready
+    async def speech_chunks(self, text):
+        loop = asyncio.get_running_loop()
+        stream = iter(SpeechStream(text, lang="en", pack_path=self.pack_path))
+        while True:
+            chunk = await loop.run_in_executor(None, next, stream, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+# Function to read and check the question of a request
+def parse_question(payload):
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object")
+    question = payload.get("question")
+    if not isinstance(question, str) or not question.strip():
+        raise ValueError("Missing question")
+    if len(question) > MAX_QUESTION_CHARS:
+        raise ValueError(f"Question longer than {MAX_QUESTION_CHARS} characters")
+    domain = payload.get("domain")
+    if domain is not None and not isinstance(domain, str):
+        raise ValueError("Domain must be a string")
+    return question, domain
+
+
+async def handle_answer(request):
+    service = request.app["service"]
+    try:
+        question, domain = parse_question(await request.json())
+    except ValueError as e:
+        # json.JSONDecodeError is a ValueError too
+        return web.json_response({"error": str(e)}, status=400)
+    return web.json_response(await service.answer(question, domain))
+
+
+async def handle_speech(request):
+    service = request.app["service"]
+    text = request.query.get("text", "").strip()
+    if not text:
+        return web.json_response({"error": "Missing text"}, status=400)
+    if len(text) > MAX_QUESTION_CHARS:
+        return web.json_response(
+            {"error": f"Text longer than {MAX_QUESTION_CHARS} characters"}, status=400
+        )
+    if text not in service.responses:
+        return web.json_response({"error": "Not a response of this service"}, status=404)
+    try:
+        audio, audio_format = await service.speech(text)
+    except Exception as e:
+        logger.exception("Speech synthesis failed")
+        return web.json_response({"error": f"Speech synthesis failed: {e}"}, status=502)
+    return web.Response(body=audio, content_type=AUDIO_MIME_TYPES[audio_format])
+
+
+async def handle_websocket(request):
+    service = request.app["service"]
+    socket = web.WebSocketResponse(heartbeat=30)
+    await socket.prepare(request)
+
+    # Messages of one call are answered in order, calls run concurrently
+    async for message in socket:
+        if message.type != WSMsgType.TEXT:
+            continue
+        try:
+            payload = message.json()
+            question, domain = parse_question(payload)
+        except ValueError as e:
+            await socket.send_json({"error": str(e)})
+            continue
+
+        start = time.perf_counter()
+        try:
+            result = await service.answer(question, domain)
+        except Exception as e:
+            # A failed match, such as a broken worker pool, only fails this question
+            logger.exception("Matching failed")
+            await socket.send_json({"id": payload.get("id"), "error": f"Matching failed: {e}"})
+            continue
+        result["id"] = payload.get("id")
+        await socket.send_json(result)
+
+        if payload.get("speech"):
+            try:
+                chunk_number = 0
+                async for audio, audio_format in service.speech_chunks(result["answer"]):
+                    if chunk_number == 0:
+                        get_tracer().observe("service_first_audio", time.perf_counter() - start)
+                    await socket.send_json(
+                        {"id": result["id"], "chunk": chunk_number, "audio_format": audio_format}
+                    )
+                    await socket.send_bytes(audio)
+                    chunk_number += 1
+                await socket.send_json({"id": result["id"], "chunks": chunk_number})
+            except Exception as e:
+                logger.exception("Speech synthesis failed")
+                await socket.send_json({"id": result["id"], "error": f"Speech synthesis failed: {e}"})
+    return socket
+
+
+async def handle_health(request):
+    service = request.app["service"]
+    return web.json_response(
+        {
+            "status": "ok",
+            "rows": len(service.corpus.index),
+            "domains": service.corpus.index.domain_names,
+        }
+    )
+
+
+async def handle_workers(request):
+    return web.json_response(request.app["service"].stats.report())
+
+
+async def handle_metrics(request):
+    return web.Response(text=get_tracer().prometheus_text(), content_type="text/plain")
+
+
+# Function to build the web application around a service
+def create_app(service):
+    app = web.Application()
+    app["service"] = service
+    app.router.add_post("/answer", handle_answer)
+    app.router.add_get("/speech", handle_speech)
+    app.router.add_get("/ws", handle_websocket)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/workers", handle_workers)
+    app.router.add_get("/metrics", handle_metrics)
+
+    async def close_service(app):
+        app["service"].close()
+
+    app.on_cleanup.append(close_service)
+    return app
+
+
+# Function to serve from N forked workers sharing one index built in this process
+def serve_prefork(corpus_path, host, port, processes):
+    # Everything the workers share is built before the fork
+    service = AnswerService(corpus_path, workers=0, stats=WorkerStats(processes))
+    # A shared socket wakes whichever worker is idle first, so one busy worker can end up
+    # with most connections; separate SO_REUSEPORT sockets are balanced by the kernel
+    reuse_port = hasattr(socket, "SO_REUSEPORT")
+    listener = None if reuse_port else socket.create_server((host, port), backlog=1024)
+
+    # Keep the collector from touching the shared objects, which would copy their pages
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    for slot in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            # Worker: serve until stopped, never returning into the parent's code
+            status = 0
+            try:
+                service.stats.claim(slot)
+                sock = listener or socket.create_server(
+                    (host, port), backlog=1024, reuse_port=True
+                )
+                web.run_app(create_app(service), sock=sock, print=None)
+            except BaseException:
+                logger.exception("Worker %d failed", slot)
+                status = 1
+            finally:
+                os._exit(status)
+        children[pid] = slot
+
+    if listener is not None:
+        listener.close()
+    print(
+        f"Loaded {len(service.corpus.index)} questions, serving on http://{host}:{port} "
+        f"from {processes} workers"
+    )
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        children.pop(pid, None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve find_answer and text-to-speech over HTTP and WebSocket.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--prefork", type=int, default=None, help="Fork this many serving processes sharing one index")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.prefork:
+        serve_prefork(args.corpus, args.host, args.port, args.prefork)
+    else:
+        start = time.perf_counter()
+        service = AnswerService(args.corpus, args.workers)
+        print(
+            f"Loaded {len(service.corpus.index)} questions in {time.perf_counter() - start:.1f}s, "
+            f"serving on http://{args.host}:{args.port}"
+        )
+        web.run_app(create_app(service), host=args.host, port=args.port, print=None)
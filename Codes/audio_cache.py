@@ -0,0 +1,259 @@
+"""
+AI-CallConnect Audio Cache
+
+Content-addressed cache for synthesized speech. Answers come from a fixed corpus, so the
+same strings are spoken again and again; each one is synthesized once and then served
+from memory or disk instead of calling the text-to-speech service and writing temp files.
+
+Cache Tiers:
+- Memory: a size-bounded LRU of audio bytes shared by all sessions in the process.
+- Disk: one file per clip under the cache directory, evicted least recently used first.
+
+Both tiers are keyed by a hash of (text, lang, engine).
+"""
+
+# gTTS: Google Text-to-Speech (gTTS) is a Python library and CLI tool to convert text into speech using Google's TTS API.
+from gtts import gTTS
+
+# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
+import os
+
+# io: A Python module for in-memory binary streams, used here to synthesize audio without temp files.
+import io
+
+# wave: A Python module for reading and writing WAV files, used here by the offline engines.
+import wave
+
+# hashlib: A Python module providing secure hash functions, used here to derive cache keys.
+import hashlib
+
+# tempfile: A Python module for temporary files and directories, used here for the default cache location.
+import tempfile
+
+# threading: A Python module for running code concurrently, used here to guard the shared cache between sessions.
+import threading
+
+# collections: A Python module with specialized containers, used here for the LRU ordering.
+from collections import OrderedDict
+
+# Default location of the on-disk tier
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ai_callconnect_tts")
+
+
+# Function to synthesize speech with gTTS directly into memory
+def synthesize_gtts(text, lang="en"):
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=lang).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+# Function to synthesize speech offline with pyttsx3 (espeak, SAPI5 or NSSpeechSynthesizer)
+def synthesize_pyttsx3(text, lang="en"):
+    # Imported here because pyttsx3 is only part of the local requirements
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    engine.setProperty("rate", 150)
+    engine.setProperty("volume", 0.9)
+
+    handle, path = tempfile.mkstemp(suffix=".wav")
+    os.close(handle)
+    try:
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        with open(path, "rb") as audio_file:
+            return audio_file.read()
+    finally:
+        os.remove(path)
+
+
+# Function to render a deterministic silent clip, used where no speech engine is available
+def synthesize_stub(text, lang="en", sample_rate=8000, seconds_per_char=0.06):
+    buffer = io.BytesIO()
+    frames = int(sample_rate * seconds_per_char * max(len(text), 1))
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b"\0\0" * frames)
+    return buffer.getvalue()
+
+
+# Text-to-speech engines by name, each a function of (text, lang) returning audio bytes
+ENGINES = {
+    "gtts": synthesize_gtts,
+    "pyttsx3": synthesize_pyttsx3,
+    "stub": synthesize_stub,
+}
+
+# Audio format produced by each engine
+ENGINE_FORMATS = {
+    "gtts": "mp3",
+    "pyttsx3": "wav",
+    "stub": "wav",
+}
+
+# MIME types used when embedding audio in the page
+AUDIO_MIME_TYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+}
+
+
+class AudioCache:
+    """
+    Two-tier LRU cache of synthesized audio.
+
+    Args:
+    - cache_dir (str): Directory of the on-disk tier, or None to keep audio in memory only.
+    - max_memory_bytes (int): Upper bound on the audio bytes kept in memory.
+    - max_disk_bytes (int): Upper bound on the audio bytes kept on disk.
+    """
+
+    def __init__(
+        self,
+        cache_dir=DEFAULT_CACHE_DIR,
+        max_memory_bytes=32 * 1024 * 1024,
+        max_disk_bytes=512 * 1024 * 1024,
+    ):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    # Function to derive the content address of a clip
+    @staticmethod
+    def key(text, lang="en", engine="gtts"):
+        payload = "\0".join((engine, lang, text)).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    # Function to list the on-disk clips as (mtime, path, size)
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".audio"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.audio")
+
+    # Function to add a clip to the memory tier, evicting the least recently used ones
+    def _remember(self, key, audio):
+        if len(audio) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # Function to write a clip to the disk tier, evicting the least recently used ones
+    def _store(self, key, audio):
+        if not self.cache_dir or len(audio) > self.max_disk_bytes:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+
+        # Write to a temporary name first so readers never see a partial clip
+        partial = f"{path}.{threading.get_ident()}.part"
+        with open(partial, "wb") as audio_file:
+            audio_file.write(audio)
+        os.replace(partial, path)
+        self._disk_bytes += len(audio)
+
+        if self._disk_bytes > self.max_disk_bytes:
+            for _, old_path, size in sorted(self._disk_entries()):
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                if old_path == path:
+                    continue
+                try:
+                    os.remove(old_path)
+                    self._disk_bytes -= size
+                except FileNotFoundError:
+                    pass
+
+    # Function to look up a clip in memory, then on disk
+    def get(self, text, lang="en", engine="gtts"):
+        key = self.key(text, lang, engine)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+
+            if self.cache_dir:
+                path = self._disk_path(key)
+                try:
+                    with open(path, "rb") as audio_file:
+                        audio = audio_file.read()
+                    # Refresh the modification time so disk eviction stays LRU
+                    os.utime(path)
+                except FileNotFoundError:
+                    audio = None
+                if audio is not None:
+                    self._remember(key, audio)
+                    self.hits += 1
+                    return audio
+
+            self.misses += 1
+            return None
+
+    # Function to check for a clip in either tier without counting a hit or miss
+    def contains(self, text, lang="en", engine="gtts"):
+        key = self.key(text, lang, engine)
+        with self._lock:
+            if key in self._memory:
+                return True
+        return bool(self.cache_dir) and os.path.exists(self._disk_path(key))
+
+    # Function to add a clip to both tiers
+    def put(self, text, audio, lang="en", engine="gtts"):
+        key = self.key(text, lang, engine)
+        with self._lock:
+            self._remember(key, audio)
+            self._store(key, audio)
+
+    # Function to return cached audio, synthesizing and caching it on a miss
+    def get_or_synthesize(self, text, lang="en", engine="gtts"):
+        audio = self.get(text, lang, engine)
+        if audio is None:
+            audio = ENGINES[engine](text, lang)
+            self.put(text, audio, lang, engine)
+        return audio
+
+
+# Shared caches by directory, so every session in the process uses the same memory tier
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+# Function to get the process-wide audio cache for a directory
+def get_audio_cache(cache_dir=DEFAULT_CACHE_DIR):
+    with _caches_lock:
+        cache = _caches.get(cache_dir)
+        if cache is None:
+            cache = AudioCache(cache_dir)
+            _caches[cache_dir] = cache
+        return cache
@@ -0,0 +1,225 @@
+"""
+AI-CallConnect Audio Pack
+
+Offline pre-synthesis of every response the agent can give. The answer set is closed
+(the Answer column of the corpus, the fallback messages and the greeting), so each
+distinct response is rendered once into a single packed audio file. At runtime the pack
+is memory-mapped read-only and responses are served as byte slices of it, so nothing is
+synthesized on the call path.
+
+Pack Layout:
+- 4 byte magic "ACPK" and a 4 byte little-endian header length.
+- A UTF-8 JSON header with the engine, language, audio format and an index of
+  {key: [offset, length]} relative to the start of the audio data.
+- The audio clips, back to back.
+
+Usage:
+    python audio_pack.py --corpus data/final/question_answer.csv --output data/final/answers.pack --engine pyttsx3
+"""
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# audio_cache: The project's text-to-speech cache, serving repeated answers without synthesizing them again.
+from audio_cache import AudioCache, ENGINES, ENGINE_FORMATS, get_audio_cache
+
+# matching: The project's question matching engine, providing the fallback messages and greeting.
+from matching import FALLBACK_MESSAGES, GREETING
+
+# concurrent.futures: A Python module for running tasks in pools of threads or processes.
+from concurrent.futures import ProcessPoolExecutor
+
+# argparse: A Python module for parsing command-line arguments.
+import argparse
+
+# json: A Python module for encoding and decoding JSON data.
+import json
+
+# mmap: A Python module for memory-mapped file access, used here to share the pack between processes.
+import mmap
+
+# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
+import os
+
+# struct: A Python module for packing binary data, used here for the pack header.
+import struct
+
+# threading: A Python module for running code concurrently, used here to guard the shared pack between sessions.
+import threading
+
+# time: A Python module providing time-related functions, used here to report build time.
+import time
+
+PACK_MAGIC = b"ACPK"
+
+
+# Function to collect every distinct response the agent can speak
+def collect_responses(corpus_path):
+    answers = pd.read_csv(corpus_path)["Answer"]
+    texts = [GREETING] + FALLBACK_MESSAGES + answers.dropna().astype(str).tolist()
+    # Keep the first occurrence of each text, skipping blank answers
+    return list(dict.fromkeys(text for text in texts if text.strip()))
+
+
+# Function to synthesize one response in a worker process
+def _synthesize(job):
+    engine, lang, text = job
+    return ENGINES[engine](text, lang)
+
+
+# Function to render responses across a process pool and write them into one pack
+def build_pack(texts, output_path, engine="pyttsx3", lang="en", workers=None):
+    """
+    Synthesizes every text once with the given engine and writes the pack file.
+
+    Returns the number of clips written.
+    """
+    texts = list(dict.fromkeys(texts))
+    jobs = [(engine, lang, text) for text in texts]
+
+    index = {}
+    partial = f"{output_path}.part"
+    data_path = f"{output_path}.data"
+    offset = 0
+    # The temporary files are removed whether the build succeeds or a clip fails
+    try:
+        with open(data_path, "wb") as data_file:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # map yields results in input order, so offsets follow the order of texts
+                for text, audio in zip(texts, pool.map(_synthesize, jobs, chunksize=16)):
+                    index[AudioCache.key(text, lang, engine)] = [offset, len(audio)]
+                    data_file.write(audio)
+                    offset += len(audio)
+
+        header = json.dumps(
+            {
+                "engine": engine,
+                "lang": lang,
+                "format": ENGINE_FORMATS[engine],
+                "index": index,
+            }
+        ).encode("utf-8")
+
+        with open(partial, "wb") as pack_file:
+            pack_file.write(PACK_MAGIC)
+            pack_file.write(struct.pack("<I", len(header)))
+            pack_file.write(header)
+            with open(data_path, "rb") as data_file:
+                while True:
+                    chunk = data_file.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    pack_file.write(chunk)
+        os.replace(partial, output_path)
+    finally:
+        for path in (data_path, partial):
+            if os.path.exists(path):
+                os.remove(path)
+
+    return len(index)
+
+
+class AudioPack:
+    """
+    Read-only, memory-mapped view of a pack file. The mapping is shared by every
+    process that opens the same pack.
+
+    Args:
+    - path (str): Path of the pack file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as pack_file:
+            self._mmap = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:4] != PACK_MAGIC:
+            raise ValueError(f"{path} is not an audio pack")
+        (header_length,) = struct.unpack("<I", self._mmap[4:8])
+        header = json.loads(self._mmap[8 : 8 + header_length].decode("utf-8"))
+
+        self.engine = header["engine"]
+        self.lang = header["lang"]
+        self.format = header["format"]
+        self._index = header["index"]
+        self._data_start = 8 + header_length
+        self._view = memoryview(self._mmap)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, text):
+        return AudioCache.key(text, self.lang, self.engine) in self._index
+
+    # Function to return a clip as a zero-copy slice of the pack, or None
+    def get(self, text, lang="en"):
+        if lang != self.lang:
+            return None
+        entry = self._index.get(AudioCache.key(text, lang, self.engine))
+        if entry is None:
+            return None
+        offset, length = entry
+        start = self._data_start + offset
+        return self._view[start : start + length]
+
+
+# Opened packs by path as (file key, pack), shared by every session in the process
+_packs = {}
+_packs_lock = threading.Lock()
+
+
+# Function to identify the current version of a pack file, or None if it does not exist
+def pack_key(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# Function to open a pack once per process, returning None if it has not been built
+# A pack built or rebuilt while the app runs is opened on the next lookup
+def get_audio_pack(path):
+    key = pack_key(path)
+    with _packs_lock:
+        cached = _packs.get(path)
+        if cached is None or cached[0] != key:
+            # The previous mapping is left to the garbage collector, since clips sliced
+            # from it may still be playing; os.replace keeps its file intact meanwhile
+            cached = (key, AudioPack(path) if key is not None else None)
+            _packs[path] = cached
+        return cached[1]
+
+
+# Function to get speech for a response from the pack, falling back to the audio cache
+def get_speech(text, lang="en", pack_path=None, engine="gtts"):
+    """
+    Returns (audio, format). Prebuilt responses come straight from the memory-mapped
+    pack; anything else is synthesized through the audio cache.
+    """
+    pack = get_audio_pack(pack_path) if pack_path else None
+    if pack is not None:
+        audio = pack.get(text, lang)
+        if audio is not None:
+            return audio, pack.format
+
+    return get_audio_cache().get_or_synthesize(text, lang, engine), ENGINE_FORMATS[engine]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-synthesize every response into an audio pack.")
+    parser.add_argument("--corpus", default="data/final/question_answer.csv")
+    parser.add_argument("--output", default="data/final/answers.pack")
+    parser.add_argument("--engine", default="pyttsx3", choices=sorted(ENGINES))
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    responses = collect_responses(args.corpus)
+    count = build_pack(responses, args.output, args.engine, args.lang, args.workers)
+    print(
+        f"Wrote {count} clips to {args.output} "
+        f"({os.path.getsize(args.output) / 1024 / 1024:.1f} MB) "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
@@ -0,0 +1,227 @@
+"""
+AI-CallConnect Matching Benchmark
+
+Headless latency benchmark for find_answer over the shipped corpora. It needs neither
+Streamlit nor audio libraries, so it can run in CI before a deployment.
+
+Query Kinds (all generated from a fixed seed):
+- exact: verbatim copies of corpus questions.
+- typo: corpus questions with character substitutions, deletions, insertions and swaps.
+- unrelated: word salad that should not match anything.
+- long: long Switchboard-style utterances with fillers and disfluency markup.
+
+For every corpus and query kind it reports p50/p95/p99 latency of each stage (exact,
+fuzzy, fallback) and of the whole lookup, throughput, how often each stage answered,
+and the memory used to build the index.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --corpus data/final/question_answer.csv --queries 500 --json results.json
+"""
+
+# numpy: A library for numerical computing in Python, used here for the latency percentiles.
+import numpy as np
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# matching: The project's question matching engine, providing the question index and staged matching.
+from matching import QuestionIndex, match_question
+
+# retrieval: The project's retrieval backends, used here to benchmark the configured matcher.
+from retrieval import BACKENDS, configured_backend, create_backend
+
+# argparse: A Python module for parsing command-line arguments.
+import argparse
+
+# glob: A Python module for finding files by pattern, used here to collect the shipped corpora.
+import glob
+
+# json: A Python module for encoding and decoding JSON data.
+import json
+
+# random: A Python library used to generate pseudo-random numbers and make random selections, commonly used for simulations and games.
+import random
+
+# resource: A Python module for process resource usage, used here for the peak resident memory.
+import resource
+
+# time: A Python module providing time-related functions, used here to measure latency.
+import time
+
+# tracemalloc: A Python module for tracing memory allocations, used here for the index memory.
+import tracemalloc
+
+# Corpora benchmarked when none are given
+DEFAULT_CORPORA = (
+    ["data/final/question_answer.csv"]
+    + sorted(glob.glob("data/interim/*.csv"))
+    + sorted(glob.glob("data/raw/Artificially_Gernerated/*.csv"))
+)
+
+STAGES = ["exact", "fuzzy", "fallback"]
+
+# Vocabulary for unrelated queries, chosen to be far from the shopping and Switchboard topics
+UNRELATED_WORDS = (
+    "quantum glacier volcano nebula tectonic photosynthesis mitochondria sonnet "
+    "archipelago equinox isotope lattice meridian obsidian paradox quasar rhombus "
+    "solstice tundra vortex zephyr basalt cipher dynamo fjord gyroscope helix"
+).split()
+
+# Fillers and markup that make utterances look like Switchboard transcripts
+SWITCHBOARD_FILLERS = [
+    "uh",
+    "um",
+    "you know",
+    "I mean",
+    "{F uh, }",
+    "{D you know, }",
+    "[ I, + I ]",
+    "#",
+    "/",
+]
+
+
+# Function to perturb a question with typing mistakes
+def make_typo(rng, text, rate=0.1):
+    chars = list(text)
+    for _ in range(max(1, int(len(chars) * rate))):
+        if not chars:
+            break
+        position = rng.randrange(len(chars))
+        edit = rng.choice(["substitute", "delete", "insert", "swap"])
+        if edit == "substitute":
+            chars[position] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        elif edit == "delete":
+            del chars[position]
+        elif edit == "insert":
+            chars.insert(position, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+        elif position + 1 < len(chars):
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+    return "".join(chars)
+
+
+# Function to build a long Switchboard-style utterance from several questions
+def make_long_utterance(rng, questions, parts=4):
+    words = []
+    for question in rng.sample(questions, min(parts, len(questions))):
+        words.append(rng.choice(SWITCHBOARD_FILLERS))
+        words.append(question)
+    return " ".join(words)
+
+
+# Function to generate the seeded queries of every kind for a corpus
+def generate_queries(questions, count, seed=0):
+    rng = random.Random(seed)
+    questions = [q for q in questions if isinstance(q, str) and q.strip()]
+    return {
+        "exact": [rng.choice(questions) for _ in range(count)],
+        "typo": [make_typo(rng, rng.choice(questions)) for _ in range(count)],
+        "unrelated": [
+            " ".join(rng.choice(UNRELATED_WORDS) for _ in range(rng.randint(3, 10)))
+            for _ in range(count)
+        ],
+        "long": [make_long_utterance(rng, questions) for _ in range(count)],
+    }
+
+
+# Function to summarize latencies in milliseconds
+def percentiles(seconds):
+    if not seconds:
+        return None
+    p50, p95, p99 = np.percentile(np.array(seconds) * 1000, [50, 95, 99])
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+# Function to benchmark one corpus
+def benchmark_corpus(path, count, seed, backend_name):
+    data = pd.read_csv(path)
+
+    # Index build time and memory, with allocation tracing only around the build
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = QuestionIndex(data)
+    backend = create_backend(index, backend_name)
+    build_seconds = time.perf_counter() - start
+    _, build_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results = {
+        "corpus": path,
+        "rows": len(data),
+        "backend": backend.name,
+        "build_seconds": build_seconds,
+        "build_peak_mb": build_peak / 1024 / 1024,
+        "kinds": {},
+    }
+
+    for kind, queries in generate_queries(index.questions, count, seed).items():
+        stage_seconds = {stage: [] for stage in STAGES}
+        totals = []
+        answered_by = {}
+        for query in queries:
+            timings = {}
+            start = time.perf_counter()
+            match = match_question(index, query, backend, timings)
+            totals.append(time.perf_counter() - start)
+            for stage, seconds in timings.items():
+                stage_seconds[stage].append(seconds)
+            answered_by[match.stage] = answered_by.get(match.stage, 0) + 1
+
+        results["kinds"][kind] = {
+            "queries": len(queries),
+            "throughput_qps": len(queries) / sum(totals),
+            "total": percentiles(totals),
+            "stages": {stage: percentiles(stage_seconds[stage]) for stage in STAGES},
+            "answered_by": answered_by,
+        }
+    return results
+
+
+# Function to print a benchmark result as a table
+def print_results(results):
+    print(
+        f"\n{results['corpus']} ({results['rows']} rows, {results['backend']} backend): "
+        f"index built in {results['build_seconds'] * 1000:.0f} ms, "
+        f"{results['build_peak_mb']:.1f} MB peak"
+    )
+    print(f"  {'kind':<10} {'stage':<9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'qps':>9}  answered by")
+    for kind, summary in results["kinds"].items():
+        rows = [("total", summary["total"])] + list(summary["stages"].items())
+        for stage, latency in rows:
+            if latency is None:
+                continue
+            extra = ""
+            if stage == "total":
+                extra = f"{summary['throughput_qps']:9.0f}  " + ", ".join(
+                    f"{name} {n}" for name, n in sorted(summary["answered_by"].items())
+                )
+            print(
+                f"  {kind:<10} {stage:<9} {latency['p50_ms']:9.3f} "
+                f"{latency['p95_ms']:9.3f} {latency['p99_ms']:9.3f} {extra}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark find_answer latency over the shipped corpora.")
+    parser.add_argument("--corpus", action="append", help="CSV to benchmark, may be repeated")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per kind")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", default=None, choices=sorted(BACKENDS))
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    all_results = []
+    for path in args.corpus or DEFAULT_CORPORA:
+        backend_name = args.backend or configured_backend()
+        results = benchmark_corpus(path, args.queries, args.seed, backend_name)
+        print_results(results)
+        all_results.append(results)
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\nPeak resident memory: {peak_rss_mb:.0f} MB")
+
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump({"peak_rss_mb": peak_rss_mb, "corpora": all_results}, results_file, indent=2)
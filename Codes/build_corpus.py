@@ -0,0 +1,383 @@
+"""
+AI-CallConnect Corpus Build
+
+Rebuilds the question-answer corpus from the Switchboard Dialog Act Corpus (SwDA)
+utterance CSVs and the artificially generated datasets, replacing the merge cells of
+Dataset_Preprocessing.ipynb.
+
+Instead of reading every utterance file into memory and concatenating them, each file
+is handled by a worker process that streams its rows through turn pairing and cleaning
+and writes the pairs to a small shard named after the file's content hash. The outputs
+are then assembled by streaming the shards in order, so memory stays bounded by one file.
+
+Outputs:
+- data/interim/question_answer.csv: raw SwDA question-answer pairs.
+- data/interim/cleaned_question_answer.csv: the same pairs cleaned with the shared
+  normalization module (disfluency markup and mojibake removed).
+- data/final/question_answer.csv: the artificial datasets followed by the cleaned pairs,
+  each row tagged with its domain.
+
+With --deduplicate, the final corpus is written by merge_corpus.py instead, which also
+drops exact and near duplicate questions. That step loads every source into memory to
+compare questions against each other, so it is opt-in and runs after the bounded-memory
+part of the build.
+
+Re-runs skip unchanged inputs. A manifest records the size, modification time and
+SHA-256 of every input, files whose hash has a shard already are not parsed again, and
+the outputs are only reassembled when some input changed.
+
+Usage:
+    python build_corpus.py --swda-dir data/raw/swda
+"""
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# normalization: The project's shared text normalization, the same cleaning the matcher applies to queries.
+from normalization import NORMALIZATION_VERSION, clean_series
+
+# matching: The project's question matching engine, providing the name of the domain column.
+from matching import DOMAIN_COLUMN
+
+# merge_corpus: The project's corpus merge, deduplicating and tagging the final corpus by domain.
+from merge_corpus import domain_for, merge_sources
+
+# hashing: The project's file hashing, used to fingerprint the inputs.
+from hashing import file_hash
+
+# concurrent.futures: A Python module for running tasks in pools of threads or processes.
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# argparse: A Python module for parsing command-line arguments.
+import argparse
+
+# csv: A Python module for reading and writing CSV files, used here to stream rows.
+import csv
+
+# hashlib: A Python module providing secure hash functions, used here for the build key.
+import hashlib
+
+# json: A Python module for encoding and decoding JSON data.
+import json
+
+# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
+import os
+
+# time: A Python module providing time-related functions, used here to report build time.
+import time
+
+MANIFEST_NAME = "build_manifest.json"
+SHARD_DIR_NAME = "swda_pairs"
+
+# Output file names, relative to the interim and final directories
+RAW_PAIRS_NAME = "question_answer.csv"
+CLEANED_PAIRS_NAME = "cleaned_question_answer.csv"
+FINAL_NAME = "question_answer.csv"
+
+# Pairs cleaned together in one vectorized pass
+CLEAN_BATCH_SIZE = 512
+
+
+# Function to list the SwDA utterance files in a stable order
+def find_utterance_files(swda_dir):
+    for root, dirs, files in os.walk(swda_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".csv") and name != "swda-metadata.csv":
+                yield os.path.join(root, name)
+
+
+# Function to stream the (caller, text) utterances of one SwDA file
+def read_utterances(path):
+    with open(path, newline="", encoding="utf-8") as utterance_file:
+        for row in csv.DictReader(utterance_file):
+            text = row.get("text") or ""
+            if text.strip():
+                yield row.get("caller"), text
+
+
+# Function to pair each utterance with the reply of the other caller
+def pair_turns(utterances):
+    """
+    Yields (question, answer) whenever the caller changes. When a caller speaks
+    several times in a row, only their last utterance before the reply is kept.
+    """
+    question = None
+    for caller, text in utterances:
+        if question is not None and caller != question[0]:
+            yield question[1], text
+            question = None
+        else:
+            question = (caller, text)
+
+
+# Function to add the cleaned text to each pair, dropping pairs with nothing left
+def clean_pairs(pairs, batch_size=CLEAN_BATCH_SIZE):
+    batch = []
+    for pair in pairs:
+        batch.append(pair)
+        if len(batch) == batch_size:
+            yield from _clean_batch(batch)
+            batch = []
+    if batch:
+        yield from _clean_batch(batch)
+
+
+def _clean_batch(batch):
+    frame = pd.DataFrame(batch, columns=["Question", "Answer"])
+    rows = zip(
+        frame["Question"],
+        frame["Answer"],
+        clean_series(frame["Question"]),
+        clean_series(frame["Answer"]),
+    )
+    for question, answer, cleaned_question, cleaned_answer in rows:
+        if cleaned_question and cleaned_answer:
+            yield question, answer, cleaned_question, cleaned_answer
+
+
+# Function to fingerprint an input, reusing the manifest hash when size and mtime match
+def fingerprint(path, previous=None):
+    stat = os.stat(path)
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if (
+        previous
+        and previous.get("size") == entry["size"]
+        and previous.get("mtime_ns") == entry["mtime_ns"]
+    ):
+        entry["sha256"] = previous["sha256"]
+    else:
+        entry["sha256"] = file_hash(path)
+    return entry
+
+
+# Function to write rows to a CSV through a temporary file, so readers never see a partial one
+def write_csv(path, header, rows):
+    partial = f"{path}.part"
+    count = 0
+    with open(partial, "w", newline="", encoding="utf-8") as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    os.replace(partial, path)
+    return count
+
+
+# Function to stream the rows of a CSV after its header
+def read_csv_rows(path):
+    with open(path, newline="", encoding="utf-8") as input_file:
+        reader = csv.reader(input_file)
+        next(reader, None)
+        yield from reader
+
+
+# Function run in a worker process: pair and clean one utterance file into its shard
+def _build_shard(job):
+    path, shard_path = job
+    pairs = clean_pairs(pair_turns(read_utterances(path)))
+    count = write_csv(
+        shard_path,
+        ["Question", "Answer", "CleanedQuestion", "CleanedAnswer"],
+        pairs,
+    )
+    return path, count
+
+
+# Function to load the manifest of the previous build
+def load_manifest(path):
+    try:
+        with open(path) as manifest_file:
+            return json.load(manifest_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+# Function to rebuild the corpus, skipping inputs that did not change
+def build_corpus(
+    swda_dir="data/raw/swda",
+    artificial_dir="data/raw/Artificially_Gernerated",
+    interim_dir="data/interim",
+    final_dir="data/final",
+    workers=None,
+    force=False,
+    deduplicate=False,
+):
+    """
+    Args:
+    - swda_dir (str): Directory searched recursively for SwDA utterance CSVs.
+    - artificial_dir (str): Directory of the artificially generated question-answer CSVs.
+    - interim_dir (str): Directory of the interim pairs, the shards and the manifest.
+    - final_dir (str): Directory of the final corpus.
+    - workers (int): Number of worker processes, or None for one per CPU.
+    - force (bool): Whether to parse every input and reassemble the outputs regardless.
+    - deduplicate (bool): Whether to drop duplicate questions from the final corpus,
+      which holds every source in memory.
+
+    Returns:
+    - dict: Counts of the inputs parsed and skipped and of the rows written.
+    """
+    utterance_files = list(find_utterance_files(swda_dir))
+    if not utterance_files:
+        raise FileNotFoundError(f"No SwDA utterance CSVs found under {swda_dir}")
+    artificial_files = sorted(
+        os.path.join(artificial_dir, name)
+        for name in os.listdir(artificial_dir)
+        if name.endswith(".csv")
+    )
+
+    shard_dir = os.path.join(interim_dir, SHARD_DIR_NAME)
+    os.makedirs(shard_dir, exist_ok=True)
+    os.makedirs(final_dir, exist_ok=True)
+    manifest_path = os.path.join(interim_dir, MANIFEST_NAME)
+    previous = load_manifest(manifest_path)
+    previous_inputs = previous.get("inputs", {})
+
+    inputs = {}
+    for path in utterance_files + artificial_files:
+        inputs[path] = fingerprint(path, previous_inputs.get(path))
+
+    # Shards are named after the content hash and the cleaning version, so an existing
+    # shard is always up to date
+    def shard_path(path):
+        return os.path.join(
+            shard_dir, f"{inputs[path]['sha256']}-v{NORMALIZATION_VERSION}.csv"
+        )
+
+    jobs = []
+    for path in utterance_files:
+        if not force and os.path.exists(shard_path(path)):
+            inputs[path]["pairs"] = previous_inputs.get(path, {}).get("pairs")
+        else:
+            jobs.append((path, shard_path(path)))
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_build_shard, job) for job in jobs]
+            for future in as_completed(futures):
+                path, count = future.result()
+                inputs[path]["pairs"] = count
+
+    # The outputs depend on the ordered input hashes, the cleaning version and whether
+    # duplicates are dropped only
+    build_key = hashlib.sha256(
+        "\0".join(
+            [str(NORMALIZATION_VERSION), f"deduplicate={deduplicate}"]
+            + [
+                f"{path}\0{inputs[path]['sha256']}"
+                for path in utterance_files + artificial_files
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+    outputs = [
+        os.path.join(interim_dir, RAW_PAIRS_NAME),
+        os.path.join(interim_dir, CLEANED_PAIRS_NAME),
+        os.path.join(final_dir, FINAL_NAME),
+    ]
+    reassemble = (
+        force
+        or previous.get("build_key") != build_key
+        or not all(os.path.exists(path) for path in outputs)
+    )
+
+    stats = {
+        "parsed": len(jobs),
+        "skipped": len(utterance_files) - len(jobs),
+        "reassembled": reassemble,
+    }
+    if reassemble:
+        stats.update(
+            assemble_outputs(
+                utterance_files, artificial_files, shard_path, *outputs, deduplicate
+            )
+        )
+
+    # Drop shards of inputs that changed or disappeared
+    keep = {os.path.basename(shard_path(path)) for path in utterance_files}
+    for name in os.listdir(shard_dir):
+        if name not in keep:
+            os.remove(os.path.join(shard_dir, name))
+
+    partial = f"{manifest_path}.part"
+    with open(partial, "w") as manifest_file:
+        json.dump({"build_key": build_key, "inputs": inputs}, manifest_file, indent=1)
+    os.replace(partial, manifest_path)
+    return stats
+
+
+# Function to stream the shards into the interim CSVs and the final one
+def assemble_outputs(
+    utterance_files,
+    artificial_files,
+    shard_path,
+    raw_path,
+    cleaned_path,
+    final_path,
+    deduplicate=False,
+):
+    def shard_rows():
+        for path in utterance_files:
+            yield from read_csv_rows(shard_path(path))
+
+    raw_pairs = write_csv(
+        raw_path, ["Question", "Answer"], (row[:2] for row in shard_rows())
+    )
+    write_csv(cleaned_path, ["Question", "Answer"], (row[2:] for row in shard_rows()))
+
+    sources = artificial_files + [cleaned_path]
+    if deduplicate:
+        merge_stats = merge_sources(sources, final_path)
+        final_rows = sum(counts["written"] for counts in merge_stats.values())
+        return {"swda_pairs": raw_pairs, "final_rows": final_rows}
+
+    def final_rows():
+        for path in sources:
+            domain = domain_for(path)
+            for row in read_csv_rows(path):
+                yield row[:2] + [domain]
+
+    # The final corpus keeps the leading index column of the original notebook output
+    final_rows_written = write_csv(
+        final_path,
+        ["", "Question", "Answer", DOMAIN_COLUMN],
+        ([number] + row for number, row in enumerate(final_rows())),
+    )
+    return {"swda_pairs": raw_pairs, "final_rows": final_rows_written}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the question-answer corpus from the SwDA utterance CSVs.")
+    parser.add_argument("--swda-dir", default="data/raw/swda")
+    parser.add_argument("--artificial-dir", default="data/raw/Artificially_Gernerated")
+    parser.add_argument("--interim-dir", default="data/interim")
+    parser.add_argument("--final-dir", default="data/final")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="Parse every input again")
+    parser.add_argument(
+        "--deduplicate",
+        action="store_true",
+        help="Drop duplicate questions from the final corpus (loads every source into memory)",
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = build_corpus(
+        args.swda_dir,
+        args.artificial_dir,
+        args.interim_dir,
+        args.final_dir,
+        args.workers,
+        args.force,
+        args.deduplicate,
+    )
+    print(
+        f"Parsed {stats['parsed']} utterance files, skipped {stats['skipped']} unchanged"
+    )
+    if stats["reassembled"]:
+        print(
+            f"Wrote {stats['swda_pairs']} SwDA pairs and {stats['final_rows']} final rows "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+    else:
+        print("Outputs are up to date")
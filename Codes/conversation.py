@@ -0,0 +1,327 @@
+"""
+AI-CallConnect Continuous Conversation
+
+Hands-free, multi-turn conversation for the local app, replacing one button press per
+question. The microphone stays open and the caller's turns are found with
+voice-activity detection (VAD) instead of a fixed listen timeout.
+
+Pipeline, one thread per stage connected by queues:
+- Capture: reads microphone frames, runs them through the TurnSegmenter and queues
+  every finished turn. Speech that starts while the agent is talking is barge-in and
+  stops the playback.
+- Recognition: transcribes turns with the configured speech-to-text backend.
+- Answer: finds the answer and synthesizes it chunk by chunk into the playback worker.
+
+While one answer is being synthesized or played, the next turn is already being
+captured and recognized. Each turn is traced with its VAD, recognition, matching and
+text-to-speech stages, plus turn_gap: the time from the end of the caller's speech to
+the first audio of the answer being queued.
+"""
+
+# numpy: A library for numerical computing in Python, used here for the frame energy.
+import numpy as np
+
+# speech_recognition: A library for performing speech recognition with support for multiple engines and APIs.
+import speech_recognition as sr
+
+# speech_to_text: The project's pluggable speech-to-text backends.
+from speech_to_text import get_stt_backend, transcribe
+
+# streaming_tts: The project's sentence-chunked speech, handing out audio as soon as the first chunk is ready.
+from streaming_tts import SpeechStream
+
+# tracing: The project's stage timing, recording how long each step of a turn takes.
+from tracing import get_tracer
+
+# collections: A Python module with specialized containers, used here for the pre-roll and transcript.
+from collections import deque, namedtuple
+
+# queue: A Python module providing thread-safe queues, used here between the pipeline stages.
+import queue
+
+# threading: A Python module for running code concurrently, used here for the pipeline threads.
+import threading
+
+# time: A Python module providing time-related functions, used here to time the turns.
+import time
+
+# logging: A Python module for emitting log messages from applications and libraries.
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Returned by TurnSegmenter.feed once a turn has lasted long enough to be speech
+SPEECH_STARTED = "speech_started"
+
+# One segmented turn: its audio, seconds of speech and when its last speech frame was read
+Turn = namedtuple("Turn", ["audio", "speech_seconds", "speech_ended"])
+
+
+# Function to measure the RMS energy of a frame, on the same scale as energy_threshold
+def frame_energy(frame, sample_width):
+    samples = np.frombuffer(frame, dtype=f"<i{sample_width}")
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float64) ** 2)))
+
+
+class TurnSegmenter:
+    """
+    Energy-based VAD that cuts a stream of frames into the caller's turns.
+
+    A frame is speech when its energy is above the Recognizer's energy_threshold, which
+    keeps adapting to the noise between turns as in Recognizer.listen. A turn starts at
+    the first speech frame, counts as speech once min_speech_seconds of it were heard,
+    and ends after silence_seconds without speech or at max_turn_seconds.
+
+    Args:
+    - recognizer (sr.Recognizer): The calibrated recognizer holding the threshold.
+    - sample_rate (int): Sample rate of the frames.
+    - sample_width (int): Bytes per sample of the frames.
+    - frame_samples (int): Samples per frame.
+    - silence_seconds (float): Silence that ends a turn.
+    - min_speech_seconds (float): Speech needed before a turn counts, so clicks are ignored.
+    - pre_roll_seconds (float): Audio kept from before the first speech frame.
+    - max_turn_seconds (float): Longest turn before it is cut.
+    """
+
+    def __init__(
+        self,
+        recognizer,
+        sample_rate,
+        sample_width,
+        frame_samples,
+        silence_seconds=0.6,
+        min_speech_seconds=0.25,
+        pre_roll_seconds=0.3,
+        max_turn_seconds=15.0,
+    ):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.frame_seconds = frame_samples / sample_rate
+
+        def frames(seconds):
+            return max(1, int(round(seconds / self.frame_seconds)))
+
+        self.silence_frames = frames(silence_seconds)
+        self.min_speech_frames = frames(min_speech_seconds)
+        self.max_turn_frames = frames(max_turn_seconds)
+        self.pre_roll = deque(maxlen=frames(pre_roll_seconds))
+        self._reset()
+
+    def _reset(self):
+        self.frames = []
+        self.speech_frames = 0
+        self.silent_frames = 0
+        self.started = False
+        self.speech_ended = None
+
+    def _adapt_threshold(self, energy):
+        # Same damped update as Recognizer.listen applies to non-speech audio
+        recognizer = self.recognizer
+        if recognizer.dynamic_energy_threshold:
+            damping = recognizer.dynamic_energy_adjustment_damping ** self.frame_seconds
+            target = energy * recognizer.dynamic_energy_ratio
+            recognizer.energy_threshold = (
+                recognizer.energy_threshold * damping + target * (1 - damping)
+            )
+
+    # Function to add one frame, returning SPEECH_STARTED, a finished Turn or None
+    def feed(self, frame, threshold_factor=1.0):
+        """
+        Args:
+        - frame (bytes): Raw audio of one frame.
+        - threshold_factor (float): Multiplier of the threshold for this frame, raised
+          while the agent speaks so its own voice is not taken for the caller's.
+        """
+        energy = frame_energy(frame, self.sample_width)
+        speech = energy > self.recognizer.energy_threshold * threshold_factor
+
+        if not self.frames:
+            if not speech:
+                self._adapt_threshold(energy)
+                self.pre_roll.append(frame)
+                return None
+            self.frames = list(self.pre_roll)
+            self.pre_roll.clear()
+
+        self.frames.append(frame)
+        if speech:
+            self.speech_frames += 1
+            self.silent_frames = 0
+            self.speech_ended = time.perf_counter()
+        else:
+            self.silent_frames += 1
+
+        if not self.started and self.speech_frames >= self.min_speech_frames:
+            self.started = True
+            return SPEECH_STARTED
+
+        if self.silent_frames >= self.silence_frames or len(self.frames) >= self.max_turn_frames:
+            turn = None
+            if self.started:
+                turn = Turn(
+                    sr.AudioData(b"".join(self.frames), self.sample_rate, self.sample_width),
+                    self.speech_frames * self.frame_seconds,
+                    self.speech_ended,
+                )
+            else:
+                # Too short to be speech, keep its tail as pre-roll of the next turn
+                self.pre_roll.extend(self.frames)
+            self._reset()
+            return turn
+        return None
+
+
+class ConversationSession:
+    """
+    Background capture, recognition and answer threads of one continuous conversation.
+
+    Args:
+    - voice_session (VoiceSession): The caller's calibrated microphone state.
+    - answer (callable): Function of (question, trace) returning the answer text. It may
+      be replaced while the session runs, for example when the topic changes.
+    - player (PlaybackWorker): The worker the answers are played by.
+    - stt_backend (object): The speech-to-text backend, or None for the configured one.
+    - pack_path (str): Path of the prebuilt audio pack, if any.
+    - barge_in_factor (float): Threshold multiplier while the agent is speaking.
+    - transcript_size (int): Number of turns kept for display.
+    """
+
+    def __init__(
+        self,
+        voice_session,
+        answer,
+        player,
+        stt_backend=None,
+        pack_path=None,
+        barge_in_factor=3.0,
+        transcript_size=50,
+    ):
+        self.voice_session = voice_session
+        self.answer = answer
+        self.player = player
+        self.stt_backend = stt_backend or get_stt_backend()
+        self.pack_path = pack_path
+        self.barge_in_factor = barge_in_factor
+        self.transcript = deque(maxlen=transcript_size)
+        self.error = None
+        self._turns = queue.Queue()
+        self._questions = queue.Queue()
+        self._stop = threading.Event()
+        # Bumped on every barge-in, so an answer still being synthesized stops queuing audio
+        self._barge_ins = 0
+        # Guards the transcript, read by the Streamlit script thread
+        self._lock = threading.Lock()
+        self._threads = []
+
+    # Function to start the pipeline threads
+    def start(self):
+        for name, target in [
+            ("conversation-capture", self._capture),
+            ("conversation-recognition", self._recognize),
+            ("conversation-answer", self._respond),
+        ]:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # Function to stop the pipeline, letting the stages drain
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    # Function to list the turns so far as question and answer rows, oldest first
+    def turns(self):
+        with self._lock:
+            return list(self.transcript)
+
+    def _capture(self):
+        trace = get_tracer().start_trace()
+        try:
+            with self.voice_session.microphone(trace) as source:
+                trace.finish(request="conversation_start")
+                segmenter = TurnSegmenter(
+                    self.voice_session.recognizer,
+                    source.SAMPLE_RATE,
+                    source.SAMPLE_WIDTH,
+                    source.CHUNK,
+                )
+                while not self._stop.is_set():
+                    frame = source.stream.read(source.CHUNK)
+                    speaking = self.player.is_busy()
+                    event = segmenter.feed(
+                        frame, self.barge_in_factor if speaking else 1.0
+                    )
+                    if event == SPEECH_STARTED:
+                        if speaking:
+                            self._barge_ins += 1
+                            self.player.cancel()
+                    elif event is not None:
+                        self._turns.put(event)
+        except Exception as e:
+            self.error = f"Microphone capture stopped: {e}"
+            logger.exception("Conversation capture failed")
+        finally:
+            self._turns.put(None)
+
+    def _recognize(self):
+        recognizer = self.voice_session.recognizer
+        while True:
+            turn = self._turns.get()
+            if turn is None:
+                self._questions.put(None)
+                return
+            trace = get_tracer().start_trace()
+            trace.record("vad_turn", turn.speech_seconds)
+            try:
+                question = transcribe(recognizer, turn.audio, self.stt_backend, trace).text
+            except sr.UnknownValueError:
+                trace.finish(request="conversation_turn", stage="not_understood")
+                continue
+            except sr.RequestError as e:
+                logger.warning("Recognition failed: %s", e)
+                trace.finish(request="conversation_turn", stage="recognition_error")
+                continue
+            except Exception as e:
+                # Any other failure only loses this turn, capture keeps queuing the next
+                logger.exception("Recognizing a turn failed")
+                self.error = f"Could not recognize a turn: {e}"
+                trace.finish(request="conversation_turn", stage="recognition_error")
+                continue
+            self._questions.put((question, turn, trace))
+
+    def _respond(self):
+        while True:
+            item = self._questions.get()
+            if item is None:
+                return
+            question, turn, trace = item
+            barge_ins = self._barge_ins
+            try:
+                with trace.span("find_answer"):
+                    answer = self.answer(question, trace)
+                with self._lock:
+                    self.transcript.append({"You Asked": question, "Response": answer})
+
+                with trace.span("speech"):
+                    stream = SpeechStream(answer, lang="en", pack_path=self.pack_path)
+                    for chunk_number, (audio_bytes, audio_format) in enumerate(stream):
+                        # The caller spoke over this answer, the rest of it is dropped
+                        if self._barge_ins != barge_ins or self._stop.is_set():
+                            break
+                        if chunk_number == 0:
+                            trace.record("turn_gap", time.perf_counter() - turn.speech_ended)
+                        self.player.play(audio_bytes, audio_format)
+                if stream.time_to_first_audio is not None:
+                    trace.record("tts_first_audio", stream.time_to_first_audio)
+            except Exception as e:
+                logger.exception("Answering a turn failed")
+                self.error = f"Could not answer {question!r}: {e}"
+            trace.finish(request="conversation_turn")
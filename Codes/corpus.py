@@ -0,0 +1,158 @@
+"""
+AI-CallConnect Corpus Loader
+
+Process-wide cache for the question-answer corpus. Streamlit re-executes the app script
+on every interaction, so the CSV is parsed and indexed once per process and shared by
+all sessions. The cache is keyed on the file's path, modification time and size, so an
+updated corpus file is picked up automatically on the next lookup.
+
+If a corpus pack exported from the current CSV sits next to it (see corpus_pack.py),
+the pack is memory-mapped instead, so neither the CSV is parsed nor the index built.
+A pack whose index cannot be loaded is ignored and the CSV is parsed as usual.
+"""
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# matching: The project's question matching engine, providing the precompiled question index and answer lookup.
+from matching import QuestionIndex
+
+# corpus_pack: The project's memory-mapped corpus format, holding the prebuilt question index.
+from corpus_pack import open_corpus_pack, pack_path_for
+
+# retrieval: The project's retrieval backends, used for the configured fuzzy stage matcher.
+from retrieval import create_backend
+
+# response_cache: The project's answer cache, one per loaded corpus.
+from response_cache import ResponseCache
+
+# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
+import os
+
+# threading: A Python module for running code concurrently, used here to guard the shared cache between sessions.
+import threading
+
+# time: A Python module providing time-related functions, used here to measure parse time.
+import time
+
+# logging: A Python module for emitting log messages from applications and libraries.
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Corpus:
+    """
+    A loaded question-answer corpus together with its prebuilt question index.
+
+    Args:
+    - file_path (str): Absolute path of the CSV file.
+    - key (tuple): (path, mtime, size, pack) the corpus was loaded from.
+    - data (DataFrame): The parsed question-answer pairs, or None when loaded from a pack.
+    - index (QuestionIndex): Index over the questions, or None for an empty corpus.
+    - backend: Retrieval backend used for the fuzzy stage, or None for an empty corpus.
+    - parse_seconds (float): Time spent reading the CSV or mapping the pack.
+    - index_seconds (float): Time spent building or mapping the question index.
+    - pack_path (str): Path of the corpus pack it was loaded from, or None for the CSV.
+
+    Every corpus has its own ResponseCache, so cached answers never outlive the file.
+    """
+
+    def __init__(
+        self,
+        file_path,
+        key,
+        data,
+        index,
+        backend,
+        parse_seconds,
+        index_seconds,
+        pack_path=None,
+    ):
+        self.file_path = file_path
+        self.key = key
+        self.data = data
+        self.index = index
+        self.backend = backend
+        self.parse_seconds = parse_seconds
+        self.index_seconds = index_seconds
+        self.pack_path = pack_path
+        self.cache = ResponseCache()
+
+
+# Loaded corpora by absolute path, shared by every session in the process
+_corpora = {}
+_corpora_lock = threading.Lock()
+
+
+# Function to build the cache key of a corpus file, including its pack if there is one
+def corpus_key(file_path):
+    stat = os.stat(file_path)
+    try:
+        pack_stat = os.stat(pack_path_for(file_path))
+        pack = (pack_stat.st_mtime_ns, pack_stat.st_size)
+    except FileNotFoundError:
+        pack = None
+    return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, pack)
+
+
+# Function to load a corpus once per process and reload it when the file changes
+def load_corpus(file_path):
+    """
+    Returns the cached Corpus for file_path, parsing the CSV only if it has not been
+    loaded yet or if its modification time or size changed since the last load.
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    key = corpus_key(file_path)
+    path = key[0]
+
+    cached = _corpora.get(path)
+    if cached is not None and cached.key == key:
+        return cached
+
+    with _corpora_lock:
+        # Another session may have loaded it while we were waiting
+        cached = _corpora.get(path)
+        if cached is not None and cached.key == key:
+            return cached
+
+        pack_path = pack_path_for(path)
+        start = time.perf_counter()
+        pack = open_corpus_pack(pack_path, path)
+        if pack is not None:
+            data = None
+            parse_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            try:
+                index = pack.load_index() if pack.rows else None
+            except Exception as e:
+                # A pack that passed the checks but cannot be read is as good as none
+                logger.warning("Ignoring corpus pack %s, its index cannot be loaded: %s", pack_path, e)
+                pack = None
+        if pack is None:
+            start = time.perf_counter()
+            pack_path = None
+            data = pd.read_csv(path)
+            parse_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            index = QuestionIndex(data) if not data.empty else None
+        backend = create_backend(index) if index is not None else None
+        index_seconds = time.perf_counter() - start
+
+        corpus = Corpus(
+            path, key, data, index, backend, parse_seconds, index_seconds, pack_path
+        )
+
+        logger.info(
+            "Loaded %d rows from %s with the %s matcher (parse %.3fs, index %.3fs)",
+            len(index) if index is not None else 0,
+            pack_path or path,
+            backend.name if backend is not None else "no",
+            corpus.parse_seconds,
+            corpus.index_seconds,
+        )
+        _corpora[path] = corpus
+        return corpus
@@ -0,0 +1,434 @@
+"""
+AI-CallConnect Corpus Pack
+
+Compact binary export of the question-answer corpus together with its prebuilt
+QuestionIndex. The app memory-maps the pack read-only instead of parsing the CSV and
+building the index, so startup no longer depends on CSV parsing and every app process
+on a machine shares the same pages instead of holding its own Python string objects.
+
+Pack Layout:
+- 4 byte magic "ACCP" and a 4 byte little-endian header length.
+- A UTF-8 JSON header with the hash of the source CSV, the index parameters and
+  {name: {offset, dtype, shape}} of every section relative to the start of the data.
+- The sections, each aligned to 8 bytes:
+  - Text columns (questions, answers, normalized, processed): a UTF-8 heap, an int64
+    array of row offsets into it and a bool array marking missing values.
+  - first_rows: the first row of every distinct processed question, sorted by text.
+  - postings: sorted fixed-width n-grams, int64 start offsets and int32 rows.
+  - The numpy arrays of the index as they are.
+- Every domain sub-index is stored the same way under the prefix "domains/<n>/",
+  together with the corpus rows of its questions.
+
+A pack is only used while the hash of the CSV still matches, otherwise the CSV is
+parsed as before.
+
+Usage:
+    python corpus_pack.py --corpus data/final/question_answer.csv
+"""
+
+# numpy: A library for numerical computing in Python, used here for the memory-mapped arrays.
+import numpy as np
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# matching: The project's question matching engine, providing the question index that is packed.
+from matching import QuestionIndex
+
+# normalization: The project's shared text normalization, whose version the packed index depends on.
+from normalization import NORMALIZATION_VERSION
+
+# hashing: The project's file hashing, used to detect a changed CSV.
+from hashing import file_hash
+
+# argparse: A Python module for parsing command-line arguments.
+import argparse
+
+# json: A Python module for encoding and decoding JSON data.
+import json
+
+# mmap: A Python module for memory-mapped file access, used here to share the pack between processes.
+import mmap
+
+# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
+import os
+
+# struct: A Python module for packing binary data, used here for the pack header.
+import struct
+
+# time: A Python module providing time-related functions, used here to report build time.
+import time
+
+# logging: A Python module for emitting log messages from applications and libraries.
+import logging
+
+logger = logging.getLogger(__name__)
+
+PACK_MAGIC = b"ACCP"
+PACK_VERSION = 2
+PACK_SUFFIX = ".corpus"
+
+# Every section starts at a multiple of this many bytes, so arrays are aligned
+ALIGNMENT = 8
+
+# Text columns of the index
+TEXT_FIELDS = ("questions", "answers", "normalized", "processed")
+
+
+# Function to get the path of the pack exported from a corpus CSV
+def pack_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + PACK_SUFFIX
+
+
+class StringColumn:
+    """
+    Read-only sequence of strings stored as one UTF-8 heap and an offset array.
+    Strings are decoded on access, so nothing is copied until a row is used.
+
+    Args:
+    - heap (ndarray): UTF-8 bytes of all rows, back to back.
+    - offsets (ndarray): Start of every row in the heap, plus the end of the last row.
+    - missing (ndarray): True for rows that were missing in the CSV, returned as None.
+    """
+
+    def __init__(self, heap, offsets, missing):
+        self.heap = heap
+        self.offsets = offsets
+        self.missing = missing
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if self.missing[row]:
+            return None
+        return self.heap[self.offsets[row] : self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+
+class FirstRows:
+    """
+    Read-only mapping from processed question to its first row, searched by bisection
+    over the rows sorted by their processed question.
+
+    Args:
+    - processed (StringColumn): The processed questions.
+    - sorted_rows (ndarray): First row of every distinct processed question, sorted by text.
+    """
+
+    def __init__(self, processed, sorted_rows):
+        self.processed = processed
+        self.sorted_rows = sorted_rows
+
+    def __len__(self):
+        return len(self.sorted_rows)
+
+    def get(self, question, default=None):
+        low, high = 0, len(self.sorted_rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.processed[self.sorted_rows[middle]] < question:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.sorted_rows):
+            row = int(self.sorted_rows[low])
+            if self.processed[row] == question:
+                return row
+        return default
+
+    def __contains__(self, question):
+        return self.get(question) is not None
+
+
+class Postings:
+    """
+    Read-only n-gram inverted index over sorted fixed-width keys.
+
+    Args:
+    - keys (ndarray): Sorted distinct n-grams.
+    - starts (ndarray): Start of the rows of every n-gram, plus the end of the last one.
+    - rows (ndarray): Rows of all n-grams, back to back.
+    """
+
+    def __init__(self, keys, starts, rows):
+        self.keys = keys
+        self.starts = starts
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _position(self, gram):
+        position = int(np.searchsorted(self.keys, gram))
+        if position < len(self.keys) and self.keys[position] == gram:
+            return position
+        return None
+
+    def __contains__(self, gram):
+        return self._position(gram) is not None
+
+    def __getitem__(self, gram):
+        position = self._position(gram)
+        if position is None:
+            raise KeyError(gram)
+        return self.rows[self.starts[position] : self.starts[position + 1]]
+
+
+class ByteHeap:
+    """
+    Read-only byte range of a memory map that can be searched without copying it.
+
+    Args:
+    - buffer (mmap): The memory map.
+    - start (int): First byte of the range.
+    - end (int): End of the range.
+    """
+
+    def __init__(self, buffer, start, end):
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+
+    def find(self, needle):
+        position = self.buffer.find(needle, self.start, self.end)
+        return position if position == -1 else position - self.start
+
+
+# Function to encode a text column as heap, offsets and missing arrays
+def _text_sections(name, values):
+    missing = np.array([not isinstance(value, str) for value in values], dtype=bool)
+    encoded = [
+        value.encode("utf-8") if isinstance(value, str) else b"" for value in values
+    ]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    return {
+        f"{name}.heap": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        f"{name}.offsets": offsets,
+        f"{name}.missing": missing,
+    }
+
+
+# Function to encode the prebuilt fields of an index, with names under prefix
+def _index_sections(index, prefix=""):
+    sections = {}
+    for name in TEXT_FIELDS:
+        sections.update(_text_sections(prefix + name, getattr(index, name)))
+    sections[prefix + "lengths"] = index.lengths
+    sections[prefix + "first_rows"] = np.array(
+        [row for _, row in sorted(index.first_rows.items())], dtype=np.int64
+    )
+    sections[prefix + "is_duplicate"] = index._is_duplicate
+    sections[prefix + "haystack"] = np.frombuffer(index._haystack, dtype=np.uint8)
+    sections[prefix + "offsets"] = index._offsets
+    sections[prefix + "char_counts"] = index._char_counts
+
+    grams = sorted(index._postings)
+    starts = np.zeros(len(grams) + 1, dtype=np.int64)
+    starts[1:] = np.cumsum([len(index._postings[gram]) for gram in grams])
+    sections[prefix + "postings.keys"] = np.array(grams, dtype=f"<U{index.ngram_size}")
+    sections[prefix + "postings.starts"] = starts
+    sections[prefix + "postings.rows"] = (
+        np.concatenate([index._postings[gram] for gram in grams]).astype(np.int32)
+        if grams
+        else np.zeros(0, dtype=np.int32)
+    )
+    if index.row_ids is not None:
+        sections[prefix + "row_ids"] = index.row_ids
+    return sections
+
+
+# Function to list the characters of an index in the order of their count columns
+def _alphabet(index):
+    return "".join(sorted(index._char_ids, key=index._char_ids.get))
+
+
+# Function to export a corpus CSV and its prebuilt index to a pack
+def write_corpus_pack(csv_path, output_path=None, ngram_size=3, shortlist_size=32):
+    output_path = output_path or pack_path_for(csv_path)
+    data = pd.read_csv(csv_path)
+    index = QuestionIndex(data, ngram_size, shortlist_size)
+
+    sections = _index_sections(index)
+    domains = []
+    for number, (domain, subindex) in enumerate(sorted(index.subindexes.items())):
+        prefix = f"domains/{number}/"
+        sections.update(_index_sections(subindex, prefix))
+        domains.append(
+            {"name": domain, "prefix": prefix, "alphabet": _alphabet(subindex)}
+        )
+
+    # Section offsets relative to the start of the data, each aligned
+    layout = {}
+    position = 0
+    for name, array in sections.items():
+        position += -position % ALIGNMENT
+        layout[name] = {
+            "offset": position,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+        }
+        position += array.nbytes
+
+    header = json.dumps(
+        {
+            "version": PACK_VERSION,
+            "normalization_version": NORMALIZATION_VERSION,
+            "source_sha256": file_hash(csv_path),
+            "rows": len(index),
+            "ngram_size": ngram_size,
+            "shortlist_size": shortlist_size,
+            "alphabet": _alphabet(index),
+            "domains": domains,
+            "sections": layout,
+        }
+    ).encode("utf-8")
+    prefix = PACK_MAGIC + struct.pack("<I", len(header)) + header
+    prefix += b"\0" * (-len(prefix) % ALIGNMENT)
+
+    # Write to a temporary name first, so processes never map a partial pack
+    partial = f"{output_path}.part"
+    with open(partial, "wb") as pack_file:
+        pack_file.write(prefix)
+        written = 0
+        for name, array in sections.items():
+            pack_file.write(b"\0" * (layout[name]["offset"] - written))
+            pack_file.write(np.ascontiguousarray(array).tobytes())
+            written = layout[name]["offset"] + array.nbytes
+    os.replace(partial, output_path)
+    return len(index)
+
+
+class CorpusPack:
+    """
+    Read-only memory map of a corpus pack.
+
+    Args:
+    - path (str): Path of the pack file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as pack_file:
+            self._mmap = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_length = struct.unpack_from("<4sI", self._mmap, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{path} is not a corpus pack")
+        self.header = json.loads(self._mmap[8 : 8 + header_length].decode("utf-8"))
+        self._data_start = 8 + header_length + (-(8 + header_length) % ALIGNMENT)
+
+    @property
+    def rows(self):
+        return self.header["rows"]
+
+    # Function to view a section as a numpy array backed by the memory map
+    def array(self, name):
+        spec = self.header["sections"][name]
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        array = np.frombuffer(
+            self._mmap, dtype=dtype, count=count, offset=self._data_start + spec["offset"]
+        )
+        return array.reshape(spec["shape"])
+
+    def _has(self, name):
+        return name in self.header["sections"]
+
+    def strings(self, name):
+        return StringColumn(
+            self.array(f"{name}.heap"),
+            self.array(f"{name}.offsets"),
+            self.array(f"{name}.missing"),
+        )
+
+    # Function to rebuild the question index on top of the memory map
+    def load_index(self):
+        subindexes = {
+            domain["name"]: self._load_fields(domain["prefix"], domain["alphabet"])
+            for domain in self.header["domains"]
+        }
+        return self._load_fields(
+            "",
+            self.header["alphabet"],
+            reopen=(open_pack_index, (self.path,)),
+            subindexes=subindexes,
+        )
+
+    # Function to rebuild one index from the sections under prefix
+    def _load_fields(self, prefix, alphabet, reopen=None, subindexes=None):
+        fields = {name: self.strings(prefix + name) for name in TEXT_FIELDS}
+        fields["lengths"] = self.array(prefix + "lengths")
+        fields["first_rows"] = FirstRows(
+            fields["processed"], self.array(prefix + "first_rows")
+        )
+        fields["_is_duplicate"] = self.array(prefix + "is_duplicate")
+
+        haystack = self.header["sections"][prefix + "haystack"]
+        start = self._data_start + haystack["offset"]
+        fields["_haystack"] = ByteHeap(self._mmap, start, start + haystack["shape"][0])
+        fields["_offsets"] = self.array(prefix + "offsets")
+
+        fields["_char_ids"] = {char: i for i, char in enumerate(alphabet)}
+        fields["_char_counts"] = self.array(prefix + "char_counts")
+        fields["_postings"] = Postings(
+            self.array(prefix + "postings.keys"),
+            self.array(prefix + "postings.starts"),
+            self.array(prefix + "postings.rows"),
+        )
+        return QuestionIndex.from_prebuilt(
+            fields,
+            self.header["ngram_size"],
+            self.header["shortlist_size"],
+            reopen=reopen,
+            row_ids=(
+                self.array(prefix + "row_ids") if self._has(prefix + "row_ids") else None
+            ),
+            subindexes=subindexes,
+        )
+
+
+# Function to open the index of a pack, used to rebuild it in worker processes
+def open_pack_index(path):
+    return CorpusPack(path).load_index()
+
+
+# Function to open the pack of a corpus CSV, or None if there is none or it is out of date
+def open_corpus_pack(pack_path, csv_path):
+    if not os.path.exists(pack_path):
+        return None
+
+    try:
+        pack = CorpusPack(pack_path)
+    except (ValueError, struct.error) as e:
+        logger.warning("Ignoring corpus pack %s: %s", pack_path, e)
+        return None
+
+    header = pack.header
+    if (
+        header.get("version") != PACK_VERSION
+        or header.get("normalization_version") != NORMALIZATION_VERSION
+        or header.get("source_sha256") != file_hash(csv_path)
+    ):
+        logger.warning("Ignoring corpus pack %s, it is out of date", pack_path)
+        return None
+    return pack
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the corpus and its prebuilt index to a memory-mappable pack.")
+    parser.add_argument("--corpus", default="data/final/question_answer.csv")
+    parser.add_argument("--output", default=None, help="Defaults to the corpus path with a .corpus suffix")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    output = args.output or pack_path_for(args.corpus)
+    rows = write_corpus_pack(args.corpus, output)
+    print(
+        f"Wrote {rows} rows to {output} "
+        f"({os.path.getsize(output) / 1024 / 1024:.1f} MB) "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
@@ -0,0 +1,19 @@
+"""
+AI-CallConnect File Hashing
+
+Content hashes of data files, shared by the corpus build, which skips unchanged inputs,
+and the corpus pack, which is only used while it matches its source CSV. Kept apart
+from both so the serving path does not import the build pipeline.
+"""
+
+# hashlib: A Python module providing secure hash functions, used here to fingerprint files.
+import hashlib
+
+
+# Function to compute the SHA-256 of a file without reading it into memory at once
+def file_hash(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as input_file:
+        for block in iter(lambda: input_file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,210 @@
+"""
+AI-CallConnect Answer Service Load Test
+
+Simulates many concurrent calls against answer_service.py. Each call opens its own
+WebSocket (or uses HTTP requests with --http) and asks a series of questions one after
+another, as a caller would. Questions are generated from the corpus with the same
+query kinds as benchmark.py (exact, typo, unrelated and long), from a fixed seed.
+
+Reports throughput, p50/p95/p99 latency of an answer as seen by the client, and the
+number of failed requests. With --per-worker it also reports how many answers each
+serving process gave during the test (from the service's /workers counters), to check
+that a pre-forked service scales with its number of workers.
+
+Usage:
+    python load_test_service.py --url http://localhost:8080 --calls 200 --questions 10
+"""
+
+# aiohttp: An asynchronous HTTP client/server framework for asyncio, used here as the load-test client.
+import aiohttp
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# benchmark: The project's matching benchmark, providing the query generator and latency percentiles.
+from benchmark import generate_queries, percentiles
+
+# argparse: A Python module for parsing command-line arguments.
+import argparse
+
+# asyncio: A Python module for asynchronous I/O, used here to run the simulated calls concurrently.
+import asyncio
+
+# itertools: A Python module of iterator building blocks, used here to interleave the query kinds.
+import itertools
+
+# json: A Python module for encoding and decoding JSON data.
+import json
+
+# random: A Python library used to generate pseudo-random numbers and make random selections, commonly used for simulations and games.
+import random
+
+# time: A Python module providing time-related functions, used here to measure latency.
+import time
+
+
+# Function to ask the questions of one call over a WebSocket, returning the latency of each answer
+async def websocket_call(session, url, questions, speech):
+    latencies = []
+    errors = 0
+    async with session.ws_connect(f"{url}/ws") as socket:
+        for number, question in enumerate(questions):
+            start = time.perf_counter()
+            await socket.send_json({"id": number, "question": question, "speech": speech})
+            reply = await socket.receive_json()
+            latencies.append(time.perf_counter() - start)
+            if "error" in reply:
+                errors += 1
+                continue
+            if speech:
+                # Drain the audio chunks up to the end marker
+                while "chunks" not in reply and "error" not in reply:
+                    message = await socket.receive()
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        reply = json.loads(message.data)
+    return latencies, errors
+
+
+# Function to ask the questions of one call as HTTP requests, returning the latency of each answer
+async def http_call(session, url, questions, speech):
+    latencies = []
+    errors = 0
+    for question in questions:
+        start = time.perf_counter()
+        async with session.post(f"{url}/answer", json={"question": question}) as response:
+            reply = await response.json()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors += 1
+        elif speech:
+            async with session.get(f"{url}/speech", params={"text": reply["answer"]}) as response:
+                await response.read()
+    return latencies, errors
+
+
+# Function to read the answer counters of every serving process
+async def worker_counters(session, url):
+    async with session.get(f"{url}/workers") as response:
+        return {row["slot"]: row for row in await response.json()}
+
+
+# Function to run the load test
+async def load_test(
+    url, question_pool, calls, questions_per_call, use_http, speech, seed, per_worker=False
+):
+    """
+    Args:
+    - url (str): Base URL of the answer service.
+    - question_pool (list): Questions the calls pick from.
+    - calls (int): Number of concurrent calls.
+    - questions_per_call (int): Questions asked one after another in every call.
+    - use_http (bool): Whether to use HTTP requests instead of a WebSocket per call.
+    - speech (bool): Whether to fetch the spoken answer as well.
+    - seed (int): Seed of the question choice.
+    - per_worker (bool): Whether to report the answers of every serving process.
+
+    Returns:
+    - dict: Requests, errors, elapsed seconds, throughput, latency percentiles and,
+      with per_worker, the answers and throughput of every serving process.
+    """
+    rng = random.Random(seed)
+    call = http_call if use_http else websocket_call
+    connector = aiohttp.TCPConnector(limit=calls)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        before = await worker_counters(session, url) if per_worker else {}
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                call(session, url, rng.sample(question_pool, questions_per_call), speech)
+                for _ in range(calls)
+            ),
+            return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - start
+        after = await worker_counters(session, url) if per_worker else {}
+
+    workers = []
+    for slot, row in sorted(after.items()):
+        answers = row["answers"] - before.get(slot, {}).get("answers", 0)
+        workers.append(
+            {
+                "slot": slot,
+                "pid": row["pid"],
+                "answers": answers,
+                "answers_per_second": answers / elapsed if elapsed else 0.0,
+                "private_mb": row["private_mb"],
+                "shared_mb": row["shared_mb"],
+            }
+        )
+
+    latencies = []
+    errors = 0
+    failed_calls = 0
+    for result in results:
+        if isinstance(result, Exception):
+            failed_calls += 1
+            continue
+        latencies.extend(result[0])
+        errors += result[1]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "failed_calls": failed_calls,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency": percentiles(latencies),
+        "workers": workers,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the answer service with concurrent calls.")
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--corpus", default="data/final/question_answer.csv")
+    parser.add_argument("--calls", type=int, default=100, help="Concurrent calls")
+    parser.add_argument("--questions", type=int, default=10, help="Questions per call")
+    parser.add_argument("--http", action="store_true", help="Use HTTP requests instead of WebSockets")
+    parser.add_argument("--speech", action="store_true", help="Fetch the spoken answers too")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--per-worker", action="store_true", help="Report the answers of every serving process")
+    args = parser.parse_args()
+
+    questions = pd.read_csv(args.corpus, usecols=["Question"])["Question"].dropna().astype(str).tolist()
+    # Every query kind equally often, at least as many questions as one call asks
+    per_kind = max(args.questions, 50)
+    question_pool = [
+        query
+        for queries in itertools.zip_longest(*generate_queries(questions, per_kind, args.seed).values())
+        for query in queries
+        if query is not None
+    ]
+
+    results = asyncio.run(
+        load_test(
+            args.url,
+            question_pool,
+            args.calls,
+            args.questions,
+            args.http,
+            args.speech,
+            args.seed,
+            args.per_worker,
+        )
+    )
+    latency = results["latency"]
+    print(
+        f"{results['requests']} answers from {args.calls} concurrent calls in "
+        f"{results['elapsed_seconds']:.1f}s ({results['throughput_rps']:.0f} answers/s), "
+        f"{results['errors']} errors, {results['failed_calls']} failed calls"
+    )
+    if latency:
+        print(
+            f"Latency p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms, "
+            f"p99 {latency['p99_ms']:.1f} ms"
+        )
+    for worker in results["workers"]:
+        print(
+            f"  worker {worker['slot']:<3} pid {worker['pid']:<8} {worker['answers']:7} answers "
+            f"{worker['answers_per_second']:8.1f} answers/s  "
+            f"private {worker['private_mb']} MB, shared {worker['shared_mb']} MB"
+        )
@@ -0,0 +1,665 @@
+"""
+AI-CallConnect Matching Engine
+
+Shared question matching used by both Streamlit apps. The question-answer corpus is
+turned into a QuestionIndex once, so every query only runs the full fuzzy scorer on a
+small shortlist of candidates instead of the whole ~11.7k row dataset.
+
+Questions in the corpus and the user's text are both normalized with the shared
+normalization module (mojibake, Switchboard markup, punctuation and case) before any
+comparison.
+
+If the corpus has a Domain column, every domain also gets its own sub-index, and a
+domain hint restricts a query to the rows of that domain.
+
+Matching Stages:
+- Exact: the first question containing the user's normalized text literally.
+- Fuzzy: the best fuzz.ratio match above the score threshold, identical to running
+  process.extractOne over every normalized question.
+- Fallback: the closest fallback message, or a random one.
+
+match_top_k returns the k best candidates of the same stages instead of only the best.
+
+With a ResponseCache (see response_cache.py), the result of these stages is cached per
+normalized question. A question without a match is cached as such, but its random
+fallback message is still drawn anew every time.
+"""
+
+# numpy: A library for numerical computing in Python, used here for the vectorized candidate bounds.
+import numpy as np
+
+# fuzzywuzzy: A library for string matching and comparison, utilizing Levenshtein Distance to calculate differences between sequences.
+from fuzzywuzzy import process
+from fuzzywuzzy import fuzz
+from fuzzywuzzy import utils
+
+# normalization: The project's shared text normalization, applied to the corpus and to every query.
+from normalization import normalize_series, normalize_text
+
+# concurrent.futures: A Python module for running tasks in pools of threads or processes.
+from concurrent.futures import ProcessPoolExecutor
+
+# collections: A Python module with specialized containers, used here for the match result type.
+from collections import namedtuple
+
+# time: A Python module providing time-related functions, used here for per-stage timings.
+import time
+
+# bisect: A Python module for binary search over sorted sequences, used here to keep the top-k candidates in order.
+import bisect
+
+# random: A Python library used to generate pseudo-random numbers and make random selections, commonly used for simulations and games.
+import random
+
+# Minimum fuzzy score (exclusive) for a match to be accepted
+SCORE_THRESHOLD = 70
+
+# Column of the corpus naming the source domain of every row
+DOMAIN_COLUMN = "Domain"
+
+# Separator between questions in the exact match buffer, so no match can span two rows
+EXACT_SEPARATOR = "\x00"
+
+# Greeting spoken when a caller opens the app
+GREETING = (
+    "Welcome to AI Call Connect. "
+    "Our motto is Connecting Conversations, Driving Results. "
+    "Your assistant is here to help. "
+    "Ask any question, and I will provide an appropriate response."
+)
+
+# Result of matching one question
+# stage is "exact", "fuzzy", "fallback" (closest fallback message) or "random"
+# row is the matched corpus row, or None for fallback messages
+Match = namedtuple("Match", ["answer", "score", "row", "stage"])
+
+# Fallback messages for no match
+FALLBACK_MESSAGES = [
+    "How can I help you?",
+    "Please ask me something else.",
+    "I'm here to assist you.",
+    "Can I help with anything?",
+    "Ask any question you have.",
+    "Feel free to ask me anything.",
+    "I'm ready to answer your questions.",
+    "What do you want to know?",
+    "Need any assistance?",
+    "Go ahead, I'm listening.",
+]
+
+# Fallback messages by their normalized text, so the fallback stage scores exactly what
+# the exact and fuzzy stages and the response cache key see
+NORMALIZED_FALLBACKS = {message: normalize_text(message) for message in FALLBACK_MESSAGES}
+
+
+class QuestionIndex:
+    """
+    Precompiled index over the questions of a question-answer DataFrame.
+
+    Questions are normalized once with normalize_series, the same steps normalize_text
+    applies to every query.
+
+    For the exact stage, the normalized questions are concatenated into one UTF-8 buffer
+    with a byte offset per row, so a literal substring search is a single find call.
+
+    For the fuzzy stage, normalized questions are processed once more with the same
+    processor process.extractOne applies (fuzzywuzzy.utils.full_process). A character n-gram
+    inverted index proposes a shortlist of likely matches, and a per-row character
+    count matrix gives an upper bound on fuzz.ratio for every row. Rows are only scored
+    in full while their bound can still beat the best score found, so the result is the
+    same as a full scan. Before any of that, rows whose length alone keeps fuzz.ratio
+    below the threshold are cut off with a binary search over the sorted lengths.
+
+    Duplicate questions resolve first-wins: of all rows whose normalized question is
+    the same, only the first is ever returned, which is also the row extractOne and
+    the old boolean-mask lookup picked. Later duplicates are never scored, and
+    first_rows maps each normalized question to its row in O(1).
+
+    With a Domain column, subindexes holds one QuestionIndex per domain over just its
+    rows, and row_ids of a sub-index maps its rows back to rows of the whole corpus.
+
+    The arrays and sequences listed in PREBUILT_FIELDS are everything a query needs.
+    corpus_pack.py saves them to a memory-mapped file and rebuilds the index with
+    from_prebuilt, so other processes skip both CSV parsing and index construction.
+
+    Args:
+    - data (DataFrame): Question-answer pairs with "Question" and "Answer" columns.
+    - ngram_size (int): Length of the character n-grams in the inverted index.
+    - shortlist_size (int): Number of n-gram candidates scored before the bound check.
+    - partition (bool): Whether to build the per-domain sub-indexes.
+    """
+
+    # Attributes saved by corpus_pack.py and restored by from_prebuilt
+    PREBUILT_FIELDS = (
+        "questions",
+        "answers",
+        "normalized",
+        "processed",
+        "lengths",
+        "first_rows",
+        "_is_duplicate",
+        "_haystack",
+        "_offsets",
+        "_char_ids",
+        "_char_counts",
+        "_postings",
+    )
+
+    def __init__(self, data, ngram_size=3, shortlist_size=32, partition=True):
+        self.questions = data["Question"].tolist()
+        self.answers = data["Answer"].tolist()
+        self.ngram_size = ngram_size
+        self.shortlist_size = shortlist_size
+        self.reopen = None
+
+        # Normalized questions, with missing questions as ""
+        self.normalized = normalize_series(data["Question"]).tolist()
+
+        # Normalized questions joined into one searchable buffer, with row start offsets
+        encoded = [text.encode("utf-8") for text in self.normalized]
+        self._offsets = np.zeros(len(encoded), dtype=np.int64)
+        if encoded:
+            self._offsets[1:] = np.cumsum([len(text) + 1 for text in encoded[:-1]])
+        self._haystack = EXACT_SEPARATOR.encode("utf-8").join(encoded)
+
+        # Process every question once, exactly as extractOne would per query
+        self.processed = [utils.full_process(text) for text in self.normalized]
+        self.lengths = np.array([len(q) for q in self.processed], dtype=np.int32)
+        self._sort_lengths()
+
+        # First row of every normalized question; later duplicates are skipped
+        self.first_rows = {}
+        self._is_duplicate = np.zeros(len(self.processed), dtype=bool)
+        for row, question in enumerate(self.processed):
+            if question in self.first_rows:
+                self._is_duplicate[row] = True
+            else:
+                self.first_rows[question] = row
+
+        # Character count matrix used for the fuzz.ratio upper bound, filled in one
+        # vectorized pass over the code points of all questions
+        joined = "".join(self.processed)
+        code_points = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+        alphabet, char_ids = np.unique(code_points, return_inverse=True)
+        self._char_ids = {chr(char): i for i, char in enumerate(alphabet)}
+        self._char_counts = np.zeros(
+            (len(self.processed), len(alphabet)), dtype=np.int32
+        )
+        rows = np.repeat(np.arange(len(self.processed)), self.lengths)
+        np.add.at(self._char_counts, (rows, char_ids), 1)
+
+        # Inverted index from character n-gram to the distinct questions containing it
+        postings = {}
+        for question, row in self.first_rows.items():
+            for gram in self._ngrams(question):
+                postings.setdefault(gram, []).append(row)
+        self._postings = {
+            gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()
+        }
+
+        # One sub-index per domain, over the corpus rows of that domain
+        self.row_ids = None
+        self.subindexes = {}
+        if partition and DOMAIN_COLUMN in data.columns:
+            domains = data[DOMAIN_COLUMN].fillna("").astype(str)
+            for domain, rows in sorted(domains.groupby(domains).indices.items()):
+                if not domain:
+                    continue
+                subindex = QuestionIndex(
+                    data.iloc[rows].reset_index(drop=True),
+                    ngram_size,
+                    shortlist_size,
+                    partition=False,
+                )
+                subindex.row_ids = np.asarray(rows, dtype=np.int64)
+                self.subindexes[domain] = subindex
+
+    # Function to rebuild an index from its saved attributes without recomputing them
+    @classmethod
+    def from_prebuilt(
+        cls,
+        fields,
+        ngram_size=3,
+        shortlist_size=32,
+        reopen=None,
+        row_ids=None,
+        subindexes=None,
+    ):
+        """
+        Args:
+        - fields (dict): A value for every name in PREBUILT_FIELDS. Sequences only need
+          len() and indexing, first_rows only get(), _postings only "in" and indexing,
+          and _haystack only find().
+        - ngram_size (int): n-gram length the postings were built with.
+        - shortlist_size (int): Number of n-gram candidates scored before the bound check.
+        - reopen (tuple): (function, args) that rebuilds the index in another process,
+          used instead of pickling the fields.
+        - row_ids (ndarray): Corpus rows of a sub-index, or None for the whole corpus.
+        - subindexes (dict): Prebuilt sub-index of every domain.
+        """
+        index = cls.__new__(cls)
+        for name in cls.PREBUILT_FIELDS:
+            setattr(index, name, fields[name])
+        index.ngram_size = ngram_size
+        index.shortlist_size = shortlist_size
+        index.reopen = reopen
+        index.row_ids = row_ids
+        index.subindexes = subindexes or {}
+        index._sort_lengths()
+        return index
+
+    # Function to order the rows by question length, for the length window
+    def _sort_lengths(self):
+        self._length_order = np.argsort(self.lengths, kind="stable")
+        self._sorted_lengths = np.asarray(self.lengths)[self._length_order]
+
+    # Function to pickle a memory-mapped index as a way to reopen it, for process pools
+    def __reduce_ex__(self, protocol):
+        if self.reopen is not None:
+            return self.reopen
+        return super().__reduce_ex__(protocol)
+
+    def __len__(self):
+        return len(self.questions)
+
+    # Function to list the domains that have a sub-index
+    @property
+    def domain_names(self):
+        return sorted(self.subindexes)
+
+    # Function to get the index to search for a domain hint
+    def subindex(self, domain=None):
+        """
+        Returns the sub-index of domain, or the whole index when there is no hint. An
+        unknown domain also searches every row, so a stale hint never hides answers.
+        """
+        if domain is None:
+            return self
+        return self.subindexes.get(domain, self)
+
+    # Function to map a row of this index to its row in the whole corpus
+    def corpus_row(self, row):
+        return row if self.row_ids is None else int(self.row_ids[row])
+
+    # Function to split a normalized string into its distinct padded n-grams
+    def _ngrams(self, text):
+        if not text:
+            return set()
+        padded = f" {text} "
+        if len(padded) <= self.ngram_size:
+            return {padded}
+        return {
+            padded[i : i + self.ngram_size]
+            for i in range(len(padded) - self.ngram_size + 1)
+        }
+
+    # Function to compute an upper bound of fuzz.ratio against every row
+    def _score_bounds(self, processed_query, rows=None):
+        """
+        The ratio is 2 * M / T, where M is the number of matched characters and T the
+        combined length. M can never exceed the characters the two strings share, so
+        the shared character counts give a bound that is never below the real score.
+
+        With rows, only the bounds of those rows are computed, in the same order.
+        """
+        if rows is None:
+            rows = slice(None)
+        query_counts = np.zeros(self._char_counts.shape[1], dtype=np.int32)
+        for char in processed_query:
+            char_id = self._char_ids.get(char)
+            if char_id is not None:
+                query_counts[char_id] += 1
+
+        lengths = self.lengths[rows]
+        shared = np.minimum(self._char_counts[rows], query_counts).sum(axis=1)
+        total = lengths + len(processed_query)
+        bounds = np.floor(200.0 * shared / np.maximum(total, 1) + 0.5)
+        # fuzz.ratio scores empty strings as 0, and duplicates never need scoring
+        bounds[lengths == 0] = 0
+        bounds[self._is_duplicate[rows]] = -1
+        return bounds.astype(np.int32)
+
+    # Function to propose likely matches from the n-gram inverted index
+    def _shortlist(self, processed_query):
+        rows = [
+            self._postings[gram]
+            for gram in self._ngrams(processed_query)
+            if gram in self._postings
+        ]
+        if not rows:
+            return np.array([], dtype=np.int64)
+
+        shared = np.bincount(np.concatenate(rows), minlength=len(self.processed))
+        size = min(self.shortlist_size, len(shared))
+        top = np.argpartition(-shared, size - 1)[:size]
+        return top[shared[top] > 0]
+
+    # Function to look up the first row of a question without any scanning
+    def find_question(self, question):
+        return self.first_rows.get(utils.full_process(normalize_text(question)))
+
+    # Function to look up the answer of a question, first-wins on duplicates
+    def answer_for(self, question):
+        row = self.find_question(question)
+        return self.answers[row] if row is not None else None
+
+    # Function to find the first question containing the user's text
+    def find_exact(self, user_question):
+        """
+        Returns the first row whose normalized question contains the normalized
+        user_question as a literal substring, or None. The text is never treated as a
+        regular expression. Text that normalizes to nothing, such as "?", never matches.
+        """
+        needle = normalize_text(user_question).encode("utf-8")
+        if not needle:
+            return None
+
+        position = self._haystack.find(needle)
+        if position == -1:
+            return None
+        return int(np.searchsorted(self._offsets, position, side="right")) - 1
+
+    # Function to list the rows whose length still allows a score of at least minimum
+    def _length_window(self, length, minimum):
+        """
+        fuzz.ratio can never exceed 200 * min(len1, len2) / (len1 + len2), rounded. That
+        bound rises with the row length up to the query length and falls after it, so
+        the lengths that can reach minimum form one range, found by binary search.
+        """
+        if len(self._sorted_lengths) == 0:
+            return self._length_order
+        lengths = np.arange(int(self._sorted_lengths[-1]) + 1)
+        bounds = np.floor(
+            200.0 * np.minimum(lengths, length) / np.maximum(lengths + length, 1) + 0.5
+        )
+        allowed = np.flatnonzero(bounds >= minimum)
+        if len(allowed) == 0:
+            return self._length_order[:0]
+        first = np.searchsorted(self._sorted_lengths, allowed[0], side="left")
+        last = np.searchsorted(self._sorted_lengths, allowed[-1], side="right")
+        return self._length_order[first:last]
+
+    # Function to find the k best fuzzy matches above the score threshold
+    def find_top_k(self, user_question, k=5, threshold=SCORE_THRESHOLD, stats=None):
+        """
+        Returns up to k (row, score) pairs of distinct questions scoring above threshold,
+        best first and earliest row first on ties, exactly as a full scan would.
+
+        Rows outside the length window are never looked at. The character count bound
+        is only computed for the rows inside it, and rows are scored in order of that
+        bound until it can no longer beat or tie the k-th best score. If stats is a
+        dict, it gets the number of rows, of rows in the length window and of rows
+        scored in full.
+        """
+        processed_query = utils.full_process(normalize_text(user_question))
+        if not processed_query:
+            # fuzz.ratio scores two empty strings as identical and anything else as 0
+            empty_row = self.first_rows.get("")
+            if empty_row is not None and 100 > threshold and k > 0:
+                return [(empty_row, 100)]
+            return []
+
+        # Best (-score, row) pairs so far, in result order
+        best = []
+        scored = set()
+
+        def minimum():
+            # A row can only enter the result with a score above threshold that beats
+            # or ties the k-th best score
+            if len(best) < k:
+                return threshold + 1
+            return max(-best[-1][0], threshold + 1)
+
+        def score(row):
+            scored.add(row)
+            # Same argument order as extractOne, since SequenceMatcher is asymmetric
+            row_score = fuzz.ratio(processed_query, self.processed[row])
+            if row_score > threshold:
+                bisect.insort(best, (-row_score, row))
+                del best[k:]
+
+        window = self._length_window(len(processed_query), threshold + 1)
+        if stats is not None:
+            stats.update(rows=len(self.processed), window=len(window))
+        lowest, highest = (
+            (self.lengths[window[0]], self.lengths[window[-1]]) if len(window) else (1, 0)
+        )
+
+        # A question identical after normalization scores 100, so try it first
+        identical_row = self.first_rows.get(processed_query)
+        if identical_row is not None and k > 0:
+            score(identical_row)
+
+        for row in self._shortlist(processed_query):
+            row = int(row)
+            if row not in scored and lowest <= self.lengths[row] <= highest:
+                score(row)
+
+        # Score the rest of the window while its bound could still enter the result
+        if len(window) and k > 0:
+            bounds = self._score_bounds(processed_query, window)
+            keep = bounds >= minimum()
+            window, bounds = window[keep], bounds[keep]
+            for position in np.argsort(-bounds, kind="stable"):
+                if bounds[position] < minimum():
+                    break
+                row = int(window[position])
+                if row not in scored:
+                    score(row)
+
+        if stats is not None:
+            stats["scored"] = len(scored)
+        return [(row, -negative_score) for negative_score, row in best]
+
+    # Function to find the best fuzzy match above the score threshold
+    def find_fuzzy(self, user_question, threshold=SCORE_THRESHOLD):
+        """
+        Returns (row, score) for the highest fuzz.ratio score, preferring the earliest
+        row on ties just like process.extractOne, or None if no score beats threshold.
+        """
+        best = self.find_top_k(user_question, 1, threshold)
+        return best[0] if best else None
+
+    # Function to find every distinct question scoring at least threshold
+    def find_all(self, user_question, threshold):
+        """
+        Returns (row, score) in row order for every first occurrence of a question whose
+        fuzz.ratio is at least threshold. fuzz.ratio can never exceed
+        200 * min(len1, len2) / (len1 + len2), so rows whose length alone rules them out
+        are dropped before the character count bound is computed.
+        """
+        processed_query = utils.full_process(normalize_text(user_question))
+        if not processed_query:
+            return []
+
+        rows = np.sort(self._length_window(len(processed_query), threshold))
+        rows = rows[self._score_bounds(processed_query, rows) >= threshold]
+
+        matches = []
+        for row in rows:
+            score = fuzz.ratio(processed_query, self.processed[row])
+            if score >= threshold:
+                matches.append((int(row), score))
+        return matches
+
+
+# Function to run the deterministic matching stages, returning None if only a random fallback is left
+# If timings is a dict, the seconds spent in each stage that ran are stored in it
+# If domain names a domain of the corpus, only its rows are searched
+def _match_stages(index, user_question, backend=None, timings=None, domain=None):
+    search = index.subindex(domain)
+
+    # Exact match search
+    start = time.perf_counter()
+    row = search.find_exact(user_question)
+    if timings is not None:
+        timings["exact"] = time.perf_counter() - start
+    if row is not None:
+        row = search.corpus_row(row)
+        return Match(index.answers[row], 100, row, "exact")
+
+    # Fuzzy matching, with rows of the whole corpus
+    start = time.perf_counter()
+    if backend is not None:
+        best_match = backend.find_best(user_question, domain)
+    else:
+        best_match = search.find_fuzzy(user_question)
+        if best_match:
+            best_match = (search.corpus_row(best_match[0]), best_match[1])
+    if timings is not None:
+        timings["fuzzy"] = time.perf_counter() - start
+    if best_match:  # Ensure a valid match with a score threshold
+        row, score = best_match
+        return Match(index.answers[row], score, row, "fuzzy")
+
+    return _fallback_match(user_question, timings)
+
+
+# Function to find the closest fallback message, or None if none is close enough
+def _fallback_match(user_question, timings=None):
+    start = time.perf_counter()
+    # With a dict of choices, extractOne returns (normalized text, score, message)
+    best_fallback = process.extractOne(
+        normalize_text(user_question), NORMALIZED_FALLBACKS, scorer=fuzz.ratio
+    )
+    if timings is not None:
+        timings["fallback"] = time.perf_counter() - start
+    if best_fallback and best_fallback[1] > SCORE_THRESHOLD:
+        return Match(best_fallback[2], best_fallback[1], None, "fallback")
+    return None
+
+
+# Function to pick a random fallback message
+def _random_fallback():
+    return Match(random.choice(FALLBACK_MESSAGES), 0, None, "random")
+
+
+# Cached in place of a match for questions that only get a random fallback
+NO_MATCH = "no_match"
+
+
+# Function to find the best match with its score, row and matching stage
+# With a cache, a repeated question skips the stages and timings gets a "cache" entry
+def match_question(
+    index, user_question, backend=None, timings=None, domain=None, cache=None
+):
+    if cache is not None:
+        start = time.perf_counter()
+        key = (normalize_text(user_question), domain)
+        match = cache.get(key)
+        if match is not None:
+            if timings is not None:
+                timings["cache"] = time.perf_counter() - start
+            return _random_fallback() if match is NO_MATCH else match
+
+    match = _match_stages(index, user_question, backend, timings, domain)
+    if cache is not None:
+        cache.put(key, NO_MATCH if match is None else match)
+    if match is None:
+        # Return a random fallback message
+        match = _random_fallback()
+    return match
+
+
+# Function to find the k best candidates with their scores, rows and matching stages
+def match_top_k(index, user_question, k=5, backend=None, timings=None, domain=None):
+    """
+    Returns up to k Match (answer, score, row, stage), best first. The first one is
+    always the Match that match_question returns: the exact match if there is one,
+    followed by the best fuzzy candidates of other rows. When nothing in the corpus
+    matches, the only result is the closest or a random fallback message.
+    """
+    if k <= 0:
+        return []
+    search = index.subindex(domain)
+
+    # Exact match search
+    start = time.perf_counter()
+    exact_row = search.find_exact(user_question)
+    if timings is not None:
+        timings["exact"] = time.perf_counter() - start
+    matches = []
+    if exact_row is not None:
+        exact_row = search.corpus_row(exact_row)
+        matches.append(Match(index.answers[exact_row], 100, exact_row, "exact"))
+
+    # Fuzzy candidates, with rows of the whole corpus
+    start = time.perf_counter()
+    if backend is not None:
+        candidates = [
+            (row, score)
+            for row, score in backend.top_k(user_question, k, domain)
+            if score > backend.threshold
+        ]
+    else:
+        candidates = [
+            (search.corpus_row(row), score)
+            for row, score in search.find_top_k(user_question, k)
+        ]
+    if timings is not None:
+        timings["fuzzy"] = time.perf_counter() - start
+    for row, score in candidates:
+        if row != exact_row:
+            matches.append(Match(index.answers[row], score, row, "fuzzy"))
+    if matches:
+        return matches[:k]
+
+    return [_fallback_match(user_question, timings) or _random_fallback()]
+
+
+# Function to find the best match using exact or fuzzy matching
+# The fuzzy stage can be replaced by a retrieval backend, see retrieval.py
+# The optional domain hint restricts the search to the rows of one domain
+def find_answer(index, user_question, backend=None, domain=None):
+    return match_question(index, user_question, backend, domain=domain).answer
+
+
+# Index, backend and domain of a batch worker process, set once by the pool initializer
+_worker_index = None
+_worker_backend = None
+_worker_domain = None
+
+
+def _init_batch_worker(index, backend, domain):
+    global _worker_index, _worker_backend, _worker_domain
+    _worker_index, _worker_backend, _worker_domain = index, backend, domain
+
+
+def _match_in_worker(user_question):
+    return _match_stages(
+        _worker_index, user_question, _worker_backend, domain=_worker_domain
+    )
+
+
+# Function to match many questions at once
+def find_answers(
+    index, questions, backend=None, workers=None, chunksize=64, domain=None
+):
+    """
+    Batch version of match_question for replaying transcripts and regression sets.
+
+    Each distinct question is matched once, however often it repeats in the batch.
+    With workers > 1 the distinct questions are spread over a process pool that
+    receives the index once per worker. Random fallbacks are drawn separately for every
+    question, so the results are the same as calling match_question one by one.
+
+    Returns a list of Match in the order of questions.
+    """
+    questions = list(questions)
+    distinct = list(dict.fromkeys(questions))
+
+    if workers and workers > 1 and len(distinct) > chunksize:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_batch_worker,
+            initargs=(index, backend, domain),
+        ) as pool:
+            matches = list(pool.map(_match_in_worker, distinct, chunksize=chunksize))
+    else:
+        matches = [
+            _match_stages(index, question, backend, domain=domain)
+            for question in distinct
+        ]
+
+    by_question = dict(zip(distinct, matches))
+    return [by_question[question] or _random_fallback() for question in questions]
@@ -0,0 +1,158 @@
+"""
+AI-CallConnect Corpus Merge
+
+Merges the domain question-answer CSVs into the final corpus, replacing the manual
+concatenation in Dataset_Preprocessing.ipynb.
+
+For every source file:
+- Rows are tagged with the source domain in a Domain column, so the app can build one
+  sub-index per domain and restrict a query to it.
+- Rows whose question is blank after normalization are dropped.
+- Exact duplicates (the same question after normalization) are dropped, keeping the
+  first occurrence.
+- Near duplicates (a fuzz.ratio of at least the threshold against an earlier kept
+  question) are dropped as well.
+
+Duplicates are only looked for within a domain, since different domains may answer
+the same question differently.
+
+Usage:
+    python merge_corpus.py --output data/final/question_answer.csv
+"""
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# matching: The project's question matching engine, used here to find duplicate questions.
+from matching import DOMAIN_COLUMN, QuestionIndex
+
+# argparse: A Python module for parsing command-line arguments.
+import argparse
+
+# glob: A Python module for finding files by pattern, used here to collect the domain datasets.
+import glob
+
+# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
+import os
+
+# time: A Python module providing time-related functions, used here to report merge time.
+import time
+
+# Minimum fuzz.ratio at which a question counts as a near duplicate of an earlier one
+NEAR_DUPLICATE_SCORE = 95
+
+# Domain names of the shipped datasets, by file name without extension
+DOMAIN_NAMES = {
+    "electronic_items_qa": "electronics",
+    "sales_dataset": "sales",
+    "telephone_fashion_conversations": "fashion",
+    "telephone_conversations_books_novels": "books",
+    "telephone_conversation_shopping_complex": "shopping",
+    "telephone_conversations": "telephone",
+    "cleaned_question_answer": "switchboard",
+}
+
+# Data directory next to this module, where the default sources live
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+# Function to list the sources merged when none are given, in the order of the original final corpus
+def default_sources(data_dir=DATA_DIR):
+    return sorted(
+        glob.glob(os.path.join(data_dir, "raw", "Artificially_Gernerated", "*.csv"))
+    ) + [os.path.join(data_dir, "interim", "cleaned_question_answer.csv")]
+
+
+# Function to name the domain of a source file
+def domain_for(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return DOMAIN_NAMES.get(name, name)
+
+
+# Function to drop exact and near duplicate questions, keeping the first occurrence
+def deduplicate(data, threshold=NEAR_DUPLICATE_SCORE):
+    """
+    Args:
+    - data (DataFrame): Question-answer pairs of one domain.
+    - threshold (int): Minimum fuzz.ratio of a near duplicate.
+
+    Returns:
+    - tuple: (DataFrame of the kept rows, {"blank", "exact", "near"} counts of dropped rows).
+    """
+    data = data.reset_index(drop=True)
+    index = QuestionIndex(data, partition=False)
+
+    keep = []
+    dropped = {"blank": 0, "exact": 0, "near": 0}
+    for row, question in enumerate(index.processed):
+        if not question:
+            # Nothing left to match on after normalization
+            reason = "blank"
+        elif index.first_rows[question] != row:
+            reason = "exact"
+        elif any(
+            other < row and keep[other]
+            for other, _ in index.find_all(index.normalized[row], threshold)
+        ):
+            reason = "near"
+        else:
+            reason = None
+        keep.append(reason is None)
+        if reason is not None:
+            dropped[reason] += 1
+    return data[keep].reset_index(drop=True), dropped
+
+
+# Function to merge source CSVs into one corpus with a Domain column
+def merge_sources(sources, output_path, threshold=NEAR_DUPLICATE_SCORE):
+    """
+    Args:
+    - sources (list): Paths of the source CSVs, each with Question and Answer columns.
+    - output_path (str): Path of the merged CSV.
+    - threshold (int): Minimum fuzz.ratio of a near duplicate.
+
+    Returns:
+    - dict: Rows read, blank, exact and near duplicate rows dropped and rows written per domain.
+    """
+    frames = []
+    stats = {}
+    for path in sources:
+        domain = domain_for(path)
+        data = pd.read_csv(path, usecols=["Question", "Answer"])
+        kept, dropped = deduplicate(data, threshold)
+        kept[DOMAIN_COLUMN] = domain
+        frames.append(kept)
+
+        domain_stats = stats.setdefault(
+            domain, {"read": 0, "blank": 0, "exact": 0, "near": 0, "written": 0}
+        )
+        domain_stats["read"] += len(data)
+        for reason, count in dropped.items():
+            domain_stats[reason] += count
+        domain_stats["written"] += len(kept)
+
+    merged = pd.concat(frames, ignore_index=True)
+
+    # Write to a temporary name first, so the app never loads a partial corpus
+    partial = f"{output_path}.part"
+    merged.to_csv(partial)
+    os.replace(partial, output_path)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge and deduplicate the domain datasets into the final corpus.")
+    parser.add_argument("--sources", nargs="+", default=None, help="Source CSVs, the shipped datasets by default")
+    parser.add_argument("--output", default="data/final/question_answer.csv")
+    parser.add_argument("--threshold", type=int, default=NEAR_DUPLICATE_SCORE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = merge_sources(args.sources or default_sources(), args.output, args.threshold)
+    print(f"  {'domain':<12} {'read':>7} {'blank':>7} {'exact':>7} {'near':>7} {'written':>8}")
+    for domain, counts in stats.items():
+        print(
+            f"  {domain:<12} {counts['read']:7} {counts['blank']:7} {counts['exact']:7} "
+            f"{counts['near']:7} {counts['written']:8}"
+        )
+    print(f"Wrote {args.output} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,166 @@
+"""
+AI-CallConnect Text Normalization
+
+Shared text cleaning for the corpus build and for matching, so questions in the corpus
+and questions asked by a caller go through exactly the same steps.
+
+Steps:
+- Mojibake: UTF-8 text that was decoded as Windows-1252 (such as "â€™" for "'") is
+  repaired, and typographic quotes and dashes are mapped to plain ASCII.
+- Switchboard markup: non-verbal tokens (<laughter>), filled pauses ({F um, }), the
+  other disfluency codes ({D ...}, {C ...}, {E ...}, {A ...}), restart brackets
+  ([ I, + I ]), partial word dashes (t-), and the # and / annotations are stripped.
+- Matching only: punctuation is removed, text is lowercased and whitespace is collapsed.
+
+Every step is a precompiled regular expression or translation table. The scalar
+functions run them on one string. The Series functions join the whole column into a
+single buffer with a separator no step can cross, run the same steps once over the
+buffer and split it again, so a column costs a handful of C-level passes instead of
+one Python call per row.
+"""
+
+# re: A Python module for regular expressions, used here for the precompiled cleaning patterns.
+import re
+
+# string: A Python module of common string constants, used here for the punctuation table.
+import string
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# Bumped whenever the steps change, so cached build outputs are regenerated
+NORMALIZATION_VERSION = 1
+
+# UTF-8 sequences as they appear after being decoded as Windows-1252
+MOJIBAKE = {
+    "â€™": "'",
+    "â€˜": "'",
+    "â€œ": '"',
+    "â€\x9d": '"',
+    "â€": '"',
+    "â€“": "-",
+    "â€”": "-",
+    "â€¦": "...",
+    "â€¢": "-",
+    "Ã©": "é",
+    "Ã¨": "è",
+    "Ã¡": "á",
+    "Ã³": "ó",
+    "Ãº": "ú",
+    "Ã±": "ñ",
+    "Ã¶": "ö",
+    "Ã¼": "ü",
+    "Ã¤": "ä",
+    "Â\xa0": " ",
+}
+
+# Longest sequences first, so "â€™" is not read as "â€" followed by "™"
+MOJIBAKE_PATTERN = re.compile(
+    "|".join(re.escape(key) for key in sorted(MOJIBAKE, key=len, reverse=True))
+)
+
+# Typographic punctuation mapped to ASCII
+TYPOGRAPHIC_TABLE = str.maketrans(
+    {
+        "‘": "'",
+        "’": "'",
+        "“": '"',
+        "”": '"',
+        "–": "-",
+        "—": "-",
+        "…": "...",
+        "\xa0": " ",
+    }
+)
+
+# Separator between rows in the buffer of the Series functions, never matched by a step
+ROW_SEPARATOR = "\x00"
+
+# Switchboard markup, as (pattern, replacement) applied in order
+MARKUP_STEPS = [
+    # Non-verbal tokens such as <laughter> or <throat_clearing>
+    (re.compile(r"<[^<>\x00]*>"), " "),
+    # Filled pauses such as {F uh, }
+    (re.compile(r"\{F [^{}\x00]*\}"), " "),
+    # Opening of the other disfluency codes, keeping their words
+    (re.compile(r"\{[A-Z] "), " "),
+    # Dash of a partial word such as "t-" in "[ t-, + I ]", matched on the dash first
+    (re.compile(r"-(?<=\w-)(?=[\s,/\x00]|$)"), ""),
+    # Dashes of interrupted utterances
+    (re.compile(r"--"), " "),
+]
+
+# Restart brackets, closing braces, overlap and slash-unit annotations
+MARKUP_TABLE = str.maketrans({char: " " for char in "[]{}+#/"})
+
+# Space left before punctuation where markup was removed, as in "Really <laughter>?"
+SPACE_BEFORE_PUNCTUATION = re.compile(r" (?=[,.?!;:])")
+
+# Spaces left around row separators once whitespace is collapsed
+SEPARATOR_SPACES = re.compile(r" ?\x00 ?")
+
+# Punctuation other than apostrophes splits words; apostrophes are dropped so "it's"
+# and "its" match. One character to one character, so str.translate stays fast.
+PUNCTUATION_TABLE = str.maketrans(
+    {char: " " for char in string.punctuation if char != "'"}
+)
+
+# First characters of every mojibake sequence, to skip the search on clean text
+MOJIBAKE_LEADS = frozenset(key[0] for key in MOJIBAKE)
+
+
+# Function to collapse runs of whitespace into one space, trimming the ends
+def _collapse(text):
+    return " ".join(text.split())
+
+
+# Function to repair mojibake and strip Switchboard markup
+def _clean(text):
+    if not MOJIBAKE_LEADS.isdisjoint(text):
+        text = MOJIBAKE_PATTERN.sub(lambda match: MOJIBAKE[match.group()], text)
+    text = text.translate(TYPOGRAPHIC_TABLE)
+    for pattern, replacement in MARKUP_STEPS:
+        text = pattern.sub(replacement, text)
+    return SPACE_BEFORE_PUNCTUATION.sub("", _collapse(text.translate(MARKUP_TABLE)))
+
+
+# Function to lowercase cleaned text and remove its punctuation
+def _normalize(text):
+    text = _clean(text).replace("'", "")
+    return _collapse(text.translate(PUNCTUATION_TABLE).lower())
+
+
+# Function to repair mojibake and strip Switchboard markup, keeping case and punctuation
+def clean_text(text):
+    return _clean(text.replace(ROW_SEPARATOR, " "))
+
+
+# Function to normalize text for matching
+def normalize_text(text):
+    return _normalize(text.replace(ROW_SEPARATOR, " "))
+
+
+# Function to run one of the steps above over a whole Series in a single buffer
+def _apply_to_series(steps, series):
+    rows = series.fillna("").astype(str).tolist()
+    buffer = ROW_SEPARATOR.join(rows)
+    if buffer.count(ROW_SEPARATOR) != max(len(rows) - 1, 0):
+        # Some rows contain the separator themselves, which is treated as whitespace
+        buffer = ROW_SEPARATOR.join(row.replace(ROW_SEPARATOR, " ") for row in rows)
+
+    buffer = SEPARATOR_SPACES.sub(ROW_SEPARATOR, steps(buffer))
+    return pd.Series(buffer.split(ROW_SEPARATOR), index=series.index, dtype=object)
+
+
+# Function to run clean_text over a pandas Series of text, with missing values as ""
+def clean_series(series):
+    if series.empty:
+        return series.astype(object)
+    return _apply_to_series(_clean, series)
+
+
+# Function to run normalize_text over a pandas Series of text, with missing values as ""
+def normalize_series(series):
+    if series.empty:
+        return series.astype(object)
+    return _apply_to_series(_normalize, series)
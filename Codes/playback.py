@@ -0,0 +1,150 @@
+"""
+AI-CallConnect Playback Worker
+
+Non-blocking speech playback for the local app. Clips are queued to a background thread
+that owns a pygame mixer initialized once per process, so the Streamlit script thread
+returns immediately and the next question can be captured while an answer is playing.
+Queued and playing clips can be cancelled at any time (barge-in).
+
+If the mixer cannot be initialized, for example without an audio device, the worker
+records the error and play() raises it instead of queuing clips nobody will play.
+"""
+
+# pygame: A set of Python modules designed for writing video games, offering functionalities for handling graphics, sounds, and events.
+import pygame
+
+# io: A Python module for in-memory binary streams, used here to play audio bytes without temp files.
+import io
+
+# queue: A Python module providing thread-safe queues, used here to hand clips to the worker.
+import queue
+
+# threading: A Python module for running code concurrently, used here for the background playback thread.
+import threading
+
+# time: A Python module providing time-related functions, used here to time playback.
+import time
+
+# tracing: The project's stage timing, used here to record how long clips play.
+from tracing import get_tracer
+
+# logging: A Python module for emitting log messages from applications and libraries.
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How often the worker checks whether the current clip finished or was cancelled
+POLL_SECONDS = 0.02
+
+
+class PlaybackWorker:
+    """
+    Background thread that plays queued clips one after another.
+
+    Every clip is tagged with the generation it was queued in. cancel() moves to a new
+    generation, which stops the current clip and makes the worker skip the older ones.
+
+    error holds the reason the mixer could not be initialized, or None.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        # Set once the worker tried to initialize the mixer, whether it worked or not
+        self._ready = threading.Event()
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._run, name="playback-worker", daemon=True
+        )
+        self._thread.start()
+
+    # Function to queue a clip, optionally interrupting whatever is playing
+    def play(self, audio, audio_format="mp3", interrupt=False):
+        self._ready.wait()
+        with self._lock:
+            if self.error is not None:
+                raise RuntimeError(f"Audio playback is not available: {self.error}")
+            if interrupt:
+                self._cancel_locked()
+            self._idle.clear()
+            self._queue.put((self._generation, bytes(audio), audio_format))
+
+    # Function to stop the current clip and drop everything still queued
+    def cancel(self):
+        with self._lock:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        self._generation += 1
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+        if self._queue.unfinished_tasks == 0:
+            self._idle.set()
+
+    # Function to check whether a clip is playing or waiting to be played
+    def is_busy(self):
+        return not self._idle.is_set()
+
+    # Function to block until the queue has been played out, used by scripts and tests
+    def wait(self, timeout=None):
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        # The mixer is initialized once and kept open for the lifetime of the process
+        try:
+            pygame.mixer.init()
+        except pygame.error as e:
+            logger.error("Audio playback is not available: %s", e)
+            with self._lock:
+                self.error = str(e)
+                self._cancel_locked()
+            return
+        finally:
+            self._ready.set()
+
+        while True:
+            generation, audio, audio_format = self._queue.get()
+            try:
+                if generation == self._generation:
+                    self._play_clip(generation, audio, audio_format)
+            except Exception:
+                logger.exception("Error during playback")
+            finally:
+                with self._lock:
+                    self._queue.task_done()
+                    if self._queue.unfinished_tasks == 0:
+                        self._idle.set()
+
+    def _play_clip(self, generation, audio, audio_format):
+        start = time.perf_counter()
+        pygame.mixer.music.load(io.BytesIO(audio), audio_format)
+        pygame.mixer.music.play()
+        clock = pygame.time.Clock()
+        while pygame.mixer.music.get_busy():
+            if generation != self._generation:
+                pygame.mixer.music.stop()
+                break
+            clock.tick(1 / POLL_SECONDS)
+        pygame.mixer.music.unload()
+        get_tracer().observe("playback", time.perf_counter() - start)
+
+
+# Worker shared by every session in the process
+_worker = None
+_worker_lock = threading.Lock()
+
+
+# Function to get the process-wide playback worker, starting it on first use
+def get_playback_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = PlaybackWorker()
+        return _worker
@@ -0,0 +1,91 @@
+"""
+AI-CallConnect Response Cache
+
+Bounded cache of match results in front of the matching stages. Callers keep asking
+the same things (price, shipping, returns, greetings), so the result of the exact,
+fuzzy and fallback cascade is remembered per normalized question and served from
+memory the next time.
+
+Entries are dropped least recently used first once max_entries is reached, and
+expire after ttl_seconds. Every Corpus owns its own cache, so a changed corpus file,
+which is loaded into a new Corpus, starts with an empty one.
+
+Hits, misses, evictions and expirations are counted for the debug panel.
+"""
+
+# collections: A Python module with specialized containers, used here for the LRU ordering.
+from collections import OrderedDict
+
+# threading: A Python module for running code concurrently, used here to guard the cache shared by sessions.
+import threading
+
+# time: A Python module providing time-related functions, used here for entry expiry.
+import time
+
+
+class ResponseCache:
+    """
+    LRU cache with a time to live, safe to share between threads.
+
+    Args:
+    - max_entries (int): Upper bound on the number of cached results.
+    - ttl_seconds (float): Age after which an entry is matched again, or None to keep it.
+    """
+
+    def __init__(self, max_entries=2048, ttl_seconds=3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        # key -> (time stored, value), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Function to look up a value, returning None when it is missing or expired
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None:
+                if time.monotonic() - entry[0] > self.ttl_seconds:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    # Function to store a value, evicting the least recently used entries
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Function to drop every entry, keeping the counters
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Function to report the counters and the hit rate
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
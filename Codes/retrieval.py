@@ -0,0 +1,215 @@
+"""
+AI-CallConnect Retrieval Backends
+
+Pluggable backends for the fuzzy stage of find_answer. Every backend is built once from
+a QuestionIndex and answers find_best(user_question, domain) with (row, score) or None,
+where row is a row of the whole corpus and domain optionally restricts the search to
+the rows of one domain.
+
+Backends:
+- fuzzy: fuzz.ratio over the QuestionIndex, the default and the reference for accuracy.
+- tfidf: cosine similarity of character and word n-gram TF-IDF vectors. Questions are
+  precomputed into one L2-normalized sparse matrix, so a query is a single sparse
+  matrix-vector product followed by a top-k selection.
+
+The backend is picked with the AI_CALLCONNECT_MATCHER environment variable.
+"""
+
+# numpy: A library for numerical computing in Python, used here for the score vectors.
+import numpy as np
+
+# scipy: A library for scientific computing in Python, used here for the sparse TF-IDF matrix.
+from scipy import sparse
+
+# fuzzywuzzy: A library for string matching and comparison, used here for the same text normalization as the fuzzy stage.
+from fuzzywuzzy import utils
+
+# normalization: The project's shared text normalization, applied to every query as it was to the corpus.
+from normalization import normalize_text
+
+# matching: The project's question matching engine, providing the fuzzy score threshold.
+from matching import SCORE_THRESHOLD
+
+# os: A Python module that provides a way of interacting with the operating system, used here to read the configuration.
+import os
+
+# Backend used when none is configured
+DEFAULT_BACKEND = "fuzzy"
+
+
+# Function to read the configured backend name
+def configured_backend():
+    return os.environ.get("AI_CALLCONNECT_MATCHER", DEFAULT_BACKEND)
+
+
+class FuzzyBackend:
+    """
+    fuzz.ratio matching over a QuestionIndex, identical to process.extractOne over
+    the normalized questions.
+
+    Args:
+    - index (QuestionIndex): The question index to search.
+    - threshold (int): Scores must be above this value to count as a match.
+    """
+
+    name = "fuzzy"
+
+    def __init__(self, index, threshold=SCORE_THRESHOLD):
+        self.index = index
+        self.threshold = threshold
+
+    def find_best(self, user_question, domain=None):
+        search = self.index.subindex(domain)
+        best = search.find_fuzzy(user_question, self.threshold)
+        if best is None:
+            return None
+        return search.corpus_row(best[0]), best[1]
+
+    # Function to return the k best (row, score) pairs above the threshold, best first, with corpus rows
+    def top_k(self, user_question, k=5, domain=None):
+        search = self.index.subindex(domain)
+        return [
+            (search.corpus_row(row), score)
+            for row, score in search.find_top_k(user_question, k, self.threshold)
+        ]
+
+
+class TfidfBackend:
+    """
+    Cosine similarity over character and word n-gram TF-IDF vectors.
+
+    Scores are cosine similarities scaled to 0-100. They are not on the same scale as
+    fuzz.ratio, so this backend has its own threshold.
+
+    Args:
+    - index (QuestionIndex): The question index whose processed questions are vectorized.
+    - threshold (int): Scores must be above this value to count as a match.
+    - char_ngrams (tuple): Smallest and largest character n-gram length.
+    - word_ngrams (tuple): Smallest and largest word n-gram length.
+    """
+
+    name = "tfidf"
+
+    def __init__(self, index, threshold=50, char_ngrams=(3, 5), word_ngrams=(1, 2)):
+        self.index = index
+        self.threshold = threshold
+        self.char_ngrams = char_ngrams
+        self.word_ngrams = word_ngrams
+
+        # Term counts per question, with terms numbered in order of first appearance
+        self.vocabulary = {}
+        rows, columns, counts = [], [], []
+        for row, text in enumerate(index.processed):
+            for term_id, count in self._term_counts(text, grow=True).items():
+                rows.append(row)
+                columns.append(term_id)
+                counts.append(count)
+
+        shape = (len(index.processed), len(self.vocabulary))
+        term_frequency = sparse.csr_matrix(
+            (np.array(counts, dtype=np.float64), (rows, columns)), shape=shape
+        )
+
+        # Smoothed inverse document frequency, as in scikit-learn's TfidfVectorizer
+        document_frequency = np.bincount(columns, minlength=shape[1])
+        self.idf = np.log((1 + shape[0]) / (1 + document_frequency)) + 1
+
+        # Sublinear term frequency, weighted by idf and L2-normalized per question
+        term_frequency.data = 1 + np.log(term_frequency.data)
+        matrix = term_frequency.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        self.matrix = (sparse.diags(1 / norms) @ matrix).tocsr()
+
+        # Rows of the matrix and their corpus rows for every domain
+        self.partitions = {
+            domain: (self.matrix[subindex.row_ids], subindex.row_ids)
+            for domain, subindex in index.subindexes.items()
+        }
+
+    # Function to count the n-gram terms of a normalized text by term id
+    def _term_counts(self, text, grow=False):
+        terms = []
+        padded = f" {text} "
+        for size in range(self.char_ngrams[0], self.char_ngrams[1] + 1):
+            terms.extend(
+                "c:" + padded[i : i + size] for i in range(len(padded) - size + 1)
+            )
+        words = text.split()
+        for size in range(self.word_ngrams[0], self.word_ngrams[1] + 1):
+            terms.extend(
+                "w:" + " ".join(words[i : i + size])
+                for i in range(len(words) - size + 1)
+            )
+
+        counts = {}
+        for term in terms:
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                if not grow:
+                    continue
+                term_id = self.vocabulary[term] = len(self.vocabulary)
+            counts[term_id] = counts.get(term_id, 0) + 1
+        return counts
+
+    # Function to get the matrix to search for a domain hint and its corpus rows
+    def _partition(self, domain):
+        if domain in self.partitions:
+            return self.partitions[domain]
+        return self.matrix, None
+
+    # Function to score every question of the domain, or of the corpus, against the user's text
+    def scores(self, user_question, domain=None):
+        matrix, _ = self._partition(domain)
+        counts = self._term_counts(utils.full_process(normalize_text(user_question)))
+        if not counts:
+            return np.zeros(matrix.shape[0])
+
+        term_ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        term_counts = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        weights = (1 + np.log(term_counts)) * self.idf[term_ids]
+        weights /= np.linalg.norm(weights)
+        query = sparse.csr_matrix(
+            (weights, (term_ids, np.zeros(len(term_ids), dtype=np.int64))),
+            shape=(matrix.shape[1], 1),
+        )
+        return (matrix @ query).toarray().ravel() * 100
+
+    # Function to return the k best (row, score) pairs, best first, with corpus rows
+    def top_k(self, user_question, k=5, domain=None):
+        _, row_ids = self._partition(domain)
+        scores = self.scores(user_question, domain)
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        # Keep every row tied with the k-th best score, so ties resolve to the earliest row
+        kth_best = np.partition(scores, len(scores) - k)[len(scores) - k]
+        top = np.flatnonzero(scores >= kth_best)
+        top = top[np.lexsort((top, -scores[top]))][:k]
+        return [
+            (int(row if row_ids is None else row_ids[row]), int(round(scores[row])))
+            for row in top
+        ]
+
+    def find_best(self, user_question, domain=None):
+        best = self.top_k(user_question, k=1, domain=domain)
+        if best and best[0][1] > self.threshold:
+            return best[0]
+        return None
+
+
+# Retrieval backends by name
+BACKENDS = {
+    "fuzzy": FuzzyBackend,
+    "tfidf": TfidfBackend,
+}
+
+
+# Function to build a backend over a question index
+def create_backend(index, name=None):
+    name = name or configured_backend()
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown matcher backend {name!r}, expected one of {sorted(BACKENDS)}"
+        )
+    return BACKENDS[name](index)
@@ -0,0 +1,247 @@
+"""
+AI-CallConnect Speech-to-Text Backends
+
+Pluggable recognizers for the voice input of the Connect Now page. Every backend turns
+a speech_recognition AudioData into text with recognize(recognizer, audio) and raises
+the same sr.UnknownValueError and sr.RequestError as the Recognizer methods, so the
+apps handle every backend the same way.
+
+Backends:
+- google: the Google Web Speech API through recognize_google, the default. Needs a
+  network connection.
+- sphinx: CMU PocketSphinx through recognize_sphinx, fully offline.
+- vosk: a local Vosk (Kaldi) model, fully offline. The model directory is set with the
+  AI_CALLCONNECT_VOSK_MODEL environment variable.
+- stub: deterministic transcripts read from a JSON file, keyed by the SHA-256 of the
+  audio (see audio_digest), for tests and for machines without any engine.
+
+The backend is picked with the AI_CALLCONNECT_STT environment variable, and each call
+goes through transcribe(), which times the recognition and records it in the trace.
+The offline engines are optional packages (see requirements_local.txt). They are
+imported when the backend is built, so a missing engine raises an ImportError naming
+the package at startup rather than on the first utterance.
+"""
+
+# speech_recognition: A library for performing speech recognition with support for multiple engines and APIs.
+import speech_recognition as sr
+
+# tracing: The project's stage timing, used here to report the latency of each recognition.
+from tracing import get_tracer
+
+# collections: A Python module with specialized containers, used here for the recognition result.
+from collections import namedtuple
+
+# hashlib: A Python module providing secure hash functions, used here to key the stub transcripts.
+import hashlib
+
+# json: A Python module for encoding and decoding JSON data, used here to read the stub transcripts.
+import json
+
+# os: A Python module that provides a way of interacting with the operating system, used here to read the configuration.
+import os
+
+# importlib: A Python module for importing modules by name, used here for the optional engines.
+import importlib
+
+# threading: A Python module for running code concurrently, used here to guard the shared backends.
+import threading
+
+# time: A Python module providing time-related functions, used here to time each recognition.
+import time
+
+# Backend used when none is configured
+DEFAULT_STT_BACKEND = "google"
+
+# Default location of the Vosk model and of the stub transcripts
+DEFAULT_VOSK_MODEL = "models/vosk-model-small-en-us"
+DEFAULT_STUB_TRANSCRIPTS = "data/stt_transcripts.json"
+
+# Key of the stub transcript returned for audio that has no entry of its own
+STUB_DEFAULT_KEY = "*"
+
+# Text of one recognition, the backend that produced it and the time it took in seconds
+Recognition = namedtuple("Recognition", ["text", "backend", "seconds"])
+
+
+# Function to read the configured backend name
+def configured_stt_backend():
+    return os.environ.get("AI_CALLCONNECT_STT", DEFAULT_STT_BACKEND)
+
+
+# Function to import the package of an optional engine, naming it when it is missing
+def _import_engine(package, backend_name):
+    try:
+        return importlib.import_module(package)
+    except ImportError as e:
+        raise ImportError(
+            f"The {backend_name} speech-to-text backend needs the {package} package "
+            f"(pip install {package})"
+        ) from e
+
+
+# Function to hash the audio samples, the key of the stub transcripts
+def audio_digest(audio):
+    return hashlib.sha256(audio.get_raw_data(convert_rate=16000, convert_width=2)).hexdigest()
+
+
+class GoogleBackend:
+    """
+    Online recognition with the Google Web Speech API.
+
+    Args:
+    - language (str): Language tag of the speech.
+    """
+
+    name = "google"
+
+    def __init__(self, language="en-US"):
+        self.language = language
+
+    def recognize(self, recognizer, audio):
+        return recognizer.recognize_google(audio, language=self.language)
+
+
+class SphinxBackend:
+    """
+    Offline recognition with CMU PocketSphinx. Needs the pocketsphinx package.
+
+    Args:
+    - language (str): Language tag of the installed PocketSphinx model.
+    """
+
+    name = "sphinx"
+
+    def __init__(self, language="en-US"):
+        # recognize_sphinx imports it on every call, so check for it up front
+        _import_engine("pocketsphinx", self.name)
+        self.language = language
+
+    def recognize(self, recognizer, audio):
+        return recognizer.recognize_sphinx(audio, language=self.language)
+
+
+class VoskBackend:
+    """
+    Offline recognition with a local Vosk model. Needs the vosk package and a model
+    downloaded from https://alphacephei.com/vosk/models.
+
+    Args:
+    - model_path (str): Directory of the Vosk model, loaded once per backend.
+    - sample_rate (int): Sample rate the audio is converted to before recognition.
+    """
+
+    name = "vosk"
+
+    def __init__(self, model_path=None, sample_rate=16000):
+        # Imported here because vosk is an optional dependency
+        vosk = _import_engine("vosk", self.name)
+
+        model_path = model_path or os.environ.get(
+            "AI_CALLCONNECT_VOSK_MODEL", DEFAULT_VOSK_MODEL
+        )
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"No Vosk model found at {model_path}")
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+        self.sample_rate = sample_rate
+
+    def recognize(self, recognizer, audio):
+        # A recognizer holds the state of one utterance, so each call gets its own
+        kaldi = self.vosk.KaldiRecognizer(self.model, self.sample_rate)
+        kaldi.AcceptWaveform(
+            audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2)
+        )
+        text = json.loads(kaldi.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class StubBackend:
+    """
+    Deterministic recognition from a JSON file mapping audio_digest(audio) to the
+    transcript. Audio without an entry gets the "*" entry, or is not understood
+    when there is none, just like an engine that heard nothing.
+
+    Args:
+    - transcripts_path (str): Path of the JSON transcripts.
+    """
+
+    name = "stub"
+
+    def __init__(self, transcripts_path=None):
+        transcripts_path = transcripts_path or os.environ.get(
+            "AI_CALLCONNECT_STT_TRANSCRIPTS", DEFAULT_STUB_TRANSCRIPTS
+        )
+        with open(transcripts_path, encoding="utf-8") as transcripts_file:
+            self.transcripts = json.load(transcripts_file)
+
+    def recognize(self, recognizer, audio):
+        text = self.transcripts.get(
+            audio_digest(audio), self.transcripts.get(STUB_DEFAULT_KEY)
+        )
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+# Speech-to-text backends by name
+STT_BACKENDS = {
+    "google": GoogleBackend,
+    "sphinx": SphinxBackend,
+    "vosk": VoskBackend,
+    "stub": StubBackend,
+}
+
+
+# Function to build a speech-to-text backend
+def create_stt_backend(name=None):
+    name = name or configured_stt_backend()
+    if name not in STT_BACKENDS:
+        raise ValueError(
+            f"Unknown speech-to-text backend {name!r}, expected one of {sorted(STT_BACKENDS)}"
+        )
+    return STT_BACKENDS[name]()
+
+
+# Shared backends by name, so offline models are loaded once per process
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+# Function to get the process-wide speech-to-text backend
+def get_stt_backend(name=None):
+    name = name or configured_stt_backend()
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            backend = create_stt_backend(name)
+            _backends[name] = backend
+        return backend
+
+
+# Function to recognize speech with a backend and report how long it took
+def transcribe(recognizer, audio, backend=None, trace=None):
+    """
+    Args:
+    - recognizer (sr.Recognizer): The recognizer the audio was captured with.
+    - audio (sr.AudioData): The captured speech.
+    - backend (object): The speech-to-text backend, or None for the configured one.
+    - trace (Trace): The request trace the latency is recorded in, if any.
+
+    Returns:
+    - Recognition: The recognized text, the backend name and the latency in seconds.
+      Failed recognitions raise as the backend does, after their latency is recorded.
+    """
+    backend = backend or get_stt_backend()
+    start = time.perf_counter()
+    try:
+        text = backend.recognize(recognizer, audio)
+    finally:
+        seconds = time.perf_counter() - start
+        if trace is not None:
+            trace.record("recognition", seconds)
+            trace.attributes["stt_backend"] = backend.name
+        # Per-backend histogram, so engines can be compared on the same dashboard
+        get_tracer().observe(f"recognition_{backend.name}", seconds)
+    return Recognition(text, backend.name, seconds)
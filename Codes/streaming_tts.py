@@ -0,0 +1,265 @@
+"""
+AI-CallConnect Streaming Text-to-Speech
+
+Sentence-chunked speech for long answers. Instead of waiting for the whole answer to be
+synthesized, the text is split into sentences and clauses that are synthesized in a
+small pipeline, and each chunk is handed out as soon as it is ready. Playback of the
+first chunk overlaps with synthesis of the rest, so time-to-first-audio no longer grows
+with answer length.
+
+Answers that are already prebuilt in the audio pack or cached whole are not split.
+
+Players with a queue, such as the local playback worker, take the chunks one by one.
+The browser has none, so the web app plays the first chunk as soon as it is ready and
+then swaps in the whole answer joined by join_clips, resuming at the position the first
+chunk has reached (see audio_duration).
+"""
+
+# audio_pack: The project's prebuilt response audio, falling back to the text-to-speech cache for other text.
+from audio_pack import get_audio_pack, get_speech
+
+# audio_cache: The project's text-to-speech cache, used here to check whether an answer is cached whole.
+from audio_cache import ENGINE_FORMATS, get_audio_cache
+
+# concurrent.futures: A Python module for running tasks in pools of threads or processes.
+from concurrent.futures import ThreadPoolExecutor
+
+# collections: A Python module with specialized containers, used here for the pipeline and metric windows.
+from collections import deque
+
+# io: A Python module for in-memory binary streams, used here to read and join WAV clips.
+import io
+
+# re: A Python module for regular expressions, used here to split text into sentences and clauses.
+import re
+
+# time: A Python module providing time-related functions, used here to measure time-to-first-audio.
+import time
+
+# wave: A Python module for reading and writing WAV files, used here to measure and join WAV clips.
+import wave
+
+# logging: A Python module for emitting log messages from applications and libraries.
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sentence and clause boundaries used to split long answers
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+CLAUSE_BREAK = re.compile(r"(?<=[,;:])\s+")
+
+# Recent time-to-first-audio measurements in seconds, newest last
+time_to_first_audio = deque(maxlen=1000)
+
+
+# Function to split an answer into speakable chunks
+def split_chunks(text, max_chars=120, min_chars=24):
+    """
+    Splits text on sentence boundaries, splits sentences longer than max_chars on
+    clause boundaries, and merges pieces shorter than min_chars into their neighbour
+    so the pipeline does not synthesize choppy fragments.
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    pieces = []
+    for sentence in SENTENCE_BREAK.split(text):
+        if len(sentence) > max_chars:
+            pieces.extend(CLAUSE_BREAK.split(sentence))
+        else:
+            pieces.append(sentence)
+
+    chunks = []
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        if chunks and (len(chunks[-1]) < min_chars or len(piece) < min_chars):
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+class SpeechStream:
+    """
+    Iterable of (audio, format) chunks for one answer, in speaking order.
+
+    Up to lookahead chunks are synthesized ahead of the one being handed out.
+    time_to_first_audio is set once the first chunk is ready.
+
+    Args:
+    - text (str): The answer to speak.
+    - lang (str): Language of the speech.
+    - pack_path (str): Path of the prebuilt audio pack, if any.
+    - engine (str): Text-to-speech engine for text that is not in the pack.
+    - lookahead (int): Number of chunks synthesized concurrently.
+    - chunked (bool): Whether to split the text at all.
+    """
+
+    def __init__(
+        self, text, lang="en", pack_path=None, engine="gtts", lookahead=2, chunked=True
+    ):
+        self.text = text
+        self.lang = lang
+        self.pack_path = pack_path
+        self.engine = engine
+        self.lookahead = lookahead
+        self.time_to_first_audio = None
+
+        pack = get_audio_pack(pack_path) if pack_path else None
+        in_pack = pack is not None and pack.lang == lang and text in pack
+        if not chunked or in_pack or get_audio_cache().contains(text, lang, engine):
+            self.chunks = [text]
+        else:
+            self.chunks = split_chunks(text)
+
+    def _speech(self, chunk):
+        return get_speech(chunk, self.lang, self.pack_path, self.engine)
+
+    # Function to bring the chunks handed out by this stream to one format
+    def uniform(self, clips):
+        """
+        Chunks found in the audio pack come in the pack's format. When that differs from
+        the engine's, only those chunks are synthesized again with the engine, and every
+        other chunk is reused, so the chunks can be joined into one clip.
+
+        Args:
+        - clips (list): The (audio, format) chunks of this stream, in speaking order.
+        """
+        if len({audio_format for _, audio_format in clips}) <= 1:
+            return clips
+        engine_format = ENGINE_FORMATS[self.engine]
+        return [
+            (audio, audio_format)
+            if audio_format == engine_format
+            else (
+                get_audio_cache().get_or_synthesize(chunk, self.lang, self.engine),
+                engine_format,
+            )
+            for chunk, (audio, audio_format) in zip(self.chunks, clips)
+        ]
+
+    def __iter__(self):
+        start = time.perf_counter()
+        remaining = iter(self.chunks)
+        with ThreadPoolExecutor(max_workers=self.lookahead) as pool:
+            pending = deque(
+                pool.submit(self._speech, chunk)
+                for _, chunk in zip(range(self.lookahead), remaining)
+            )
+            while pending:
+                audio, audio_format = pending.popleft().result()
+                following = next(remaining, None)
+                if following is not None:
+                    pending.append(pool.submit(self._speech, following))
+
+                if self.time_to_first_audio is None:
+                    self.time_to_first_audio = time.perf_counter() - start
+                    time_to_first_audio.append(self.time_to_first_audio)
+                    logger.info(
+                        "Time to first audio %.3fs (%d chunks)",
+                        self.time_to_first_audio,
+                        len(self.chunks),
+                    )
+                yield audio, audio_format
+
+
+# Function to drop a leading ID3v2 tag from an MP3 clip, whose size is a 28 bit syncsafe integer
+def _strip_id3(audio):
+    data = bytes(audio)
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return data[10 + size :]
+    return data
+
+
+# MPEG audio layer III tables, indexed by the version bits of the frame header
+MP3_BITRATES = {
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    0: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+
+# Function to measure the playing time of an MP3 clip by walking its frame headers
+def _mp3_duration(audio):
+    data = _strip_id3(audio)
+    position = 0
+
+    seconds = 0.0
+    while position + 4 <= len(data):
+        header = int.from_bytes(data[position : position + 4], "big")
+        version = (header >> 19) & 3
+        layer = (header >> 17) & 3
+        bitrate_index = (header >> 12) & 15
+        rate_index = (header >> 10) & 3
+        if (
+            (header >> 21) & 0x7FF != 0x7FF
+            or version == 1
+            or layer != 1
+            or bitrate_index in (0, 15)
+            or rate_index == 3
+        ):
+            # Not a layer III frame, resynchronize on the next byte
+            position += 1
+            continue
+
+        bitrate = MP3_BITRATES[version][bitrate_index] * 1000
+        sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+        samples = 1152 if version == 3 else 576
+        padding = (header >> 9) & 1
+        position += samples // 8 * bitrate // sample_rate + padding
+        seconds += samples / sample_rate
+    return seconds
+
+
+# Function to measure the playing time of a clip in seconds
+def audio_duration(audio, audio_format):
+    if audio_format == "wav":
+        with wave.open(io.BytesIO(bytes(audio)), "rb") as wav_file:
+            return wav_file.getnframes() / wav_file.getframerate()
+    return _mp3_duration(audio)
+
+
+# Function to join the chunks of one answer into a single clip that plays them back to back
+def join_clips(clips):
+    """
+    For players without a queue, such as an autoplaying <audio> element in the browser,
+    the chunks are handed over as one clip instead of being released one by one as the
+    previous ones finish. MP3 frames are concatenated, with the ID3 tags of the later
+    chunks dropped, and WAV chunks are joined when their sample format matches.
+
+    Returns (audio, format), or None when the chunks cannot be joined.
+    """
+    formats = {audio_format for _, audio_format in clips}
+    if len(formats) != 1:
+        return None
+    audio_format = formats.pop()
+    if len(clips) == 1:
+        return bytes(clips[0][0]), audio_format
+
+    if audio_format == "mp3":
+        first = bytes(clips[0][0])
+        return first + b"".join(_strip_id3(audio) for audio, _ in clips[1:]), audio_format
+
+    if audio_format == "wav":
+        output = io.BytesIO()
+        with wave.open(output, "wb") as joined:
+            sample_format = None
+            for audio, _ in clips:
+                with wave.open(io.BytesIO(bytes(audio)), "rb") as clip:
+                    if sample_format is None:
+                        sample_format = clip.getparams()[:3]
+                        joined.setparams(clip.getparams())
+                    elif clip.getparams()[:3] != sample_format:
+                        return None
+                    joined.writeframes(clip.readframes(clip.getnframes()))
+        return output.getvalue(), audio_format
+    return None
@@ -22,34 +22,36 @@ Technologies Used:
 This project aims to provide an intuitive voice interface for interactive cold calling and customer engagement.
 """
 
-# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
-import pandas as pd
+# matching: The project's question matching engine, providing the precompiled question index and answer lookup.
+from matching import GREETING, match_question
 
-# fuzzywuzzy: A library for string matching and comparison, utilizing Levenshtein Distance to calculate differences between sequences.
-from fuzzywuzzy import process
-from fuzzywuzzy import fuzz
+# tracing: The project's stage timing, recording how long each step of a request takes.
+from tracing import get_tracer
+
+# speech_to_text: The project's pluggable speech-to-text backends, online or offline.
+from speech_to_text import get_stt_backend, transcribe
+
+# voice_session: The project's per-session microphone state, keeping the noise calibration between questions.
+from voice_session import VoiceSession
+
+# corpus: The project's corpus loader, caching the parsed question-answer data once per process.
+from corpus import load_corpus
 
 # streamlit: An open-source app framework for building interactive web applications in Python with minimal effort.
 import streamlit as st
 
-# gTTS: Google Text-to-Speech (gTTS) is a Python library and CLI tool to convert text into speech using Google's TTS API.
-from gtts import gTTS
+# streaming_tts: The project's sentence-chunked speech, handing out audio as soon as the first chunk is ready.
+from streaming_tts import SpeechStream, audio_duration, join_clips
 
-# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
-import os
+# audio_cache: The project's text-to-speech cache, providing the MIME type of each audio format.
+from audio_cache import AUDIO_MIME_TYPES
 
-# uuid: A library used to generate universally unique identifiers (UUIDs) for creating unique IDs in applications.
-import uuid
+# time: A Python module providing time-related functions, used here to time audio embedding.
+import time
 
 # speech_recognition: A library for performing speech recognition, converting audio to text using various speech recognition engines.
 import speech_recognition as sr
 
-# random: A Python library used to generate pseudo-random numbers and make random selections, commonly used for simulations and games.
-import random
-
-# base64: A Python module used for encoding and decoding data in a format that is safe to use in URLs and filenames.
-import base64
-
 # Setting the page title
 # This title will only be visible when running the app locally.
 # In the deployed app, the title will be displayed as "Title - Streamlit," where "Title" is the one we provide.
@@ -84,105 +86,102 @@ def display_background_image(url, opacity):
     )
 
 
-# Fallback messages for no match
-FALLBACK_MESSAGES = [
-    "How can I help you?",
-    "Please ask me something else.",
-    "I'm here to assist you.",
-    "Can I help with anything?",
-    "Ask any question you have.",
-    "Feel free to ask me anything.",
-    "I'm ready to answer your questions.",
-    "What do you want to know?",
-    "Need any assistance?",
-    "Go ahead, I'm listening.",
-]
+# Prebuilt audio for every response, created with: python audio_pack.py
+AUDIO_PACK_PATH = "Codes/data/final/answers.pack"
+
+# Question-answer corpus the app answers from
+CORPUS_PATH = "Codes/data/final/question_answer.csv"
 
 
 # Function to speak text and play it automatically
-def speak_text(text):
-    filename = f"temp_{uuid.uuid4().hex}.mp3"
+# Chunked speech holds the script until the answer has been handed to the browser,
+# so text that must not delay the rest of the page is spoken in one piece
+def speak_text(text, trace, chunked=True):
     try:
-        # Generate TTS audio
-        tts = gTTS(text=text, lang="en")
-        tts.save(filename)
-
-        # Embed audio as HTML with autoplay enabled
-        audio_html = f"""
-        <audio autoplay style="display:none">
-            <source src="data:audio/mpeg;base64,{encode_audio(filename)}" type="audio/mpeg">
-        </audio>
-        """
-        st.markdown(audio_html, unsafe_allow_html=True)
+        hide_audio_players()
+
+        # Long answers are synthesized in sentence chunks concurrently. The bytes are served
+        # by Streamlit's media endpoint instead of being inlined into the page as base64,
+        # and st.audio needs bytes rather than the memoryview slices of the audio pack
+        speech_start = time.perf_counter()
+        player = st.empty()
+        stream = SpeechStream(text, lang="en", pack_path=AUDIO_PACK_PATH, chunked=chunked)
+        clips = []
+        first_played = None
+        for audio_bytes, audio_format in stream:
+            clips.append((audio_bytes, audio_format))
+            if first_played is None:
+                # The first chunk plays as soon as it is ready
+                start = time.perf_counter()
+                player.audio(bytes(audio_bytes), format=AUDIO_MIME_TYPES[audio_format], autoplay=True)
+                first_played = time.perf_counter()
+                trace.record("audio_embed", first_played - start)
+
+        if stream.time_to_first_audio is not None:
+            trace.record("tts_first_audio", stream.time_to_first_audio)
+
+        if len(clips) > 1:
+            # The browser has no queue to play separate clips back to back, and waiting
+            # for each one to finish would block the script thread. The first chunk is
+            # replaced by the whole answer instead, resuming where the first chunk has got
+            # to, or at the start of the second one if it already finished
+            clips = stream.uniform(clips)
+            joined = join_clips(clips)
+            if joined is None:
+                raise ValueError("the speech chunks could not be joined")
+            audio_bytes, audio_format = joined
+            position = min(time.perf_counter() - first_played, audio_duration(*clips[0]))
+            start = time.perf_counter()
+            player.audio(
+                audio_bytes,
+                format=AUDIO_MIME_TYPES[audio_format],
+                autoplay=True,
+                start_time=position,
+            )
+            trace.record("audio_embed", time.perf_counter() - start)
+        trace.record("tts_total", time.perf_counter() - speech_start)
 
     except Exception as e:
         st.error(f"Error during text-to-speech: {e}")
 
-    finally:
-        # Ensure the temporary file is deleted
-        if os.path.exists(filename):
-            os.remove(filename)
-
 
-# Helper function to encode audio file to base64
-def encode_audio(file_path):
-
-    with open(file_path, "rb") as audio_file:
-        audio_bytes = audio_file.read()
-        return base64.b64encode(audio_bytes).decode()
+# Helper function to hide the audio players, so speech plays in the background as before
+def hide_audio_players():
+    st.markdown("<style>audio { display: none; }</style>", unsafe_allow_html=True)
 
 
 # Function to load the CSV file
+# The corpus is parsed once per process and shared by all sessions until the file changes
 def load_data(file_path):
     try:
-        return pd.read_csv(file_path)
+        return load_corpus(file_path)
     except FileNotFoundError:
         st.error(f"File not found at {file_path}")
         return None
 
 
-# Function to find the best match using exact or fuzzy matching
-def find_answer(data, user_question):
-    # Exact match search
-    exact_match = data[
-        data["Question"].str.contains(user_question, case=False, na=False)
-    ]
-    if not exact_match.empty:
-        return exact_match["Answer"].iloc[0]
-
-    # Fuzzy matching
-    questions = data["Question"].tolist()
-    best_match = process.extractOne(user_question, questions, scorer=fuzz.ratio)
-
-    if best_match and best_match[1] > 70:  # Ensure a valid match with a score threshold
-        matched_question = best_match[0]
-        matched_row = data[data["Question"] == matched_question]
-        return matched_row["Answer"].iloc[0]
-
-    # Fuzzy matching with fallback messages
-    best_fallback = process.extractOne(
-        user_question, FALLBACK_MESSAGES, scorer=fuzz.ratio
-    )
-    if best_fallback and best_fallback[1] > 70:
-        return best_fallback[0]
-
-    # Return a random fallback message
-    return random.choice(FALLBACK_MESSAGES)
-
-
 # Function to take voice input from the user
 # This is not used in the deployment as streamlit is not allowing voice input libraries and system libraries like pyaudio
-def take_voice_input():
-    recognizer = sr.Recognizer()
-    mic = sr.Microphone()
+def take_voice_input(trace):
+    try:
+        backend = get_stt_backend()
+    except (ImportError, OSError, ValueError) as e:
+        st.error(f"Speech-to-text backend is not available: {e}")
+        return "Speech recognition is not available."
+
+    # Calibrated once per session instead of before every question
+    if "voice_session" not in st.session_state:
+        st.session_state.voice_session = VoiceSession()
+    voice_session = st.session_state.voice_session
+    recognizer = voice_session.recognizer
     st.write("Listening for your question... Please speak now.")
 
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source)
+    with voice_session.microphone(trace) as source:
         try:
-            audio = recognizer.listen(source, timeout=5)
-            user_question = recognizer.recognize_google(audio)
-            return user_question
+            with trace.span("listen"):
+                audio = recognizer.listen(source, timeout=5)
+            # Recognition latency is recorded in the trace by transcribe
+            return transcribe(recognizer, audio, backend, trace).text
         except sr.WaitTimeoutError:
             return "No input detected."
         except sr.UnknownValueError:
@@ -197,37 +196,56 @@ def display_home_page():
     if "greeting_spoken" not in st.session_state:
         st.session_state.greeting_spoken = False
 
-    # Greeting text
-    greeting = (
-        "Welcome to AI Call Connect. "
-        "Our motto is Connecting Conversations, Driving Results. "
-        "Your assistant is here to help. "
-        "Ask any question, and I will provide an appropriate response."
-    )
-
     st.write("Our motto is Connecting Conversations, Driving Results.")
     st.write("Your assistant is here to help.")
     st.write("Ask any question, and I will provide an appropriate response.")
 
     # Display the greeting and speak it only if it hasn't been spoken
     if not st.session_state.greeting_spoken:
-        speak_text(greeting)
+        trace = get_tracer().start_trace()
+        with trace.span("speech"):
+            speak_text(GREETING, trace, chunked=False)
+        trace.finish(request="greeting")
         # Mark greeting as spoken so it won't be spoken again
         st.session_state.greeting_spoken = True
 
     # Load the data
-    file_path = "Codes/data/final/question_answer.csv"
-    data = load_data(file_path)
+    corpus = load_data(CORPUS_PATH)
+
+    if corpus is not None and corpus.index is not None:
+        # Optional topic, so only the questions of that domain are searched
+        domain = None
+        if corpus.index.domain_names:
+            topic = st.selectbox(
+                "Topic of your question:", ["All topics"] + corpus.index.domain_names
+            )
+            if topic != "All topics":
+                domain = topic
 
-    if data is not None and not data.empty:
         # Take text input from the user
         user_question = st.text_input("Enter your question here:")
         if st.button("Submit"):
             if user_question:
+                trace = get_tracer().start_trace()
                 st.write(f"**You Asked:** {user_question}")
-                answer = find_answer(data, user_question)
-                st.write(f"**Response:** {answer}")
-                speak_text(answer)
+
+                timings = {}
+                with trace.span("find_answer"):
+                    match = match_question(
+                        corpus.index,
+                        user_question,
+                        corpus.backend,
+                        timings,
+                        domain,
+                        corpus.cache,
+                    )
+                for stage, seconds in timings.items():
+                    trace.record(f"match_{stage}", seconds)
+
+                st.write(f"**Response:** {match.answer}")
+                with trace.span("speech"):
+                    speak_text(match.answer, trace)
+                trace.finish(request="question", stage=match.stage, score=match.score)
             else:
                 st.warning("Please enter a question to get a response.")
     else:
@@ -404,6 +422,29 @@ def display_resources_information():
     )
 
 
+# Function to display recent per-stage timings in the sidebar
+def display_stage_timings():
+    tracer = get_tracer()
+    st.sidebar.markdown("### Stage Timings")
+
+    corpus = load_data(CORPUS_PATH)
+    if corpus is not None:
+        cache = corpus.cache.stats()
+        st.sidebar.write(
+            f"Response cache: {cache['hits']} hits, {cache['misses']} misses "
+            f"({cache['hit_rate']:.0%} hit rate), {cache['entries']} entries"
+        )
+
+    traces = tracer.recent_traces()
+    if traces:
+        st.sidebar.dataframe(traces)
+    else:
+        st.sidebar.write("No requests timed yet.")
+
+    with st.sidebar.expander("Prometheus metrics"):
+        st.code(tracer.prometheus_text(), language="text")
+
+
 # Main code to initialize Streamlit
 if __name__ == "__main__":
 
@@ -428,6 +469,9 @@ if __name__ == "__main__":
         ],
     )
 
+    # Optional debug panel with the timings of recent requests
+    show_stage_timings = st.sidebar.checkbox("Show stage timings")
+
     if selected_section == "Connect Now":
         display_home_page()
 
@@ -452,6 +496,9 @@ if __name__ == "__main__":
         """
         display_resources_information()
 
+    if show_stage_timings:
+        display_stage_timings()
+
     # Using Font Awesome icons for links
     st.sidebar.markdown(
         """
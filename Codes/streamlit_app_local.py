@@ -22,27 +22,32 @@ Technologies Used:
 This project aims to provide an intuitive voice interface for interactive cold calling and customer engagement.
 """
 
-# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
-import pandas as pd
+# matching: The project's question matching engine, providing the precompiled question index and answer lookup.
+from matching import GREETING, match_question
 
-# fuzzywuzzy: A library for string matching and comparison, utilizing Levenshtein Distance to calculate differences between sequences.
-from fuzzywuzzy import process
-from fuzzywuzzy import fuzz
+# tracing: The project's stage timing, recording how long each step of a request takes.
+from tracing import get_tracer
 
-# streamlit: An open-source app framework for building interactive web applications in Python with minimal effort.
-import streamlit as st
+# speech_to_text: The project's pluggable speech-to-text backends, online or offline.
+from speech_to_text import get_stt_backend, transcribe
 
-# gTTS: Google Text-to-Speech (gTTS) is a Python library and CLI tool to convert text into speech using Google's TTS API.
-from gtts import gTTS
+# voice_session: The project's per-session microphone state, keeping the noise calibration between questions.
+from voice_session import VoiceSession
 
-# pygame: A set of Python modules designed for writing video games, offering functionalities for handling graphics, sounds, and events.
-import pygame
+# conversation: The project's continuous conversation mode, segmenting the caller's turns with voice-activity detection.
+from conversation import ConversationSession
 
-# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
-import os
+# corpus: The project's corpus loader, caching the parsed question-answer data once per process.
+from corpus import load_corpus
+
+# streamlit: An open-source app framework for building interactive web applications in Python with minimal effort.
+import streamlit as st
+
+# streaming_tts: The project's sentence-chunked speech, handing out audio as soon as the first chunk is ready.
+from streaming_tts import SpeechStream
 
-# uuid: A library used to generate universally unique identifiers (UUIDs) for creating unique IDs in applications.
-import uuid
+# playback: The project's background playback worker, playing speech through a persistent pygame mixer.
+from playback import get_playback_worker
 
 # speech_recognition: A library for performing speech recognition, converting audio to text using various speech recognition engines.
 import speech_recognition as sr
@@ -50,12 +55,15 @@ import speech_recognition as sr
 # pyttsx3: A Python library that allows text-to-speech conversion, supporting multiple speech engines and offline functionality.
 import pyttsx3
 
-# random: A Python library used to generate pseudo-random numbers and make random selections, commonly used for simulations and games.
-import random
-
 # base64: A Python module used for encoding and decoding data in a format that is safe to use in URLs and filenames.
 import base64
 
+# functools: A Python module of higher-order functions, used here to cache the encoded images.
+import functools
+
+# os: A Python module that provides a way of interacting with the operating system, used here to detect changed images.
+import os
+
 # Setting the page title
 # This title will only be visible when running the app locally.
 # In the deployed app, the title will be displayed as "Title - Streamlit," where "Title" is the one we provide.
@@ -66,6 +74,29 @@ st.set_page_config(
 )
 
 
+# MIME types of the images embedded in the page
+IMAGE_MIME_TYPES = {
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+}
+
+
+# Function to read and base64-encode an image, once per process and version of the file
+@functools.lru_cache(maxsize=16)
+def _encode_image(image_path, mtime_ns):
+    extension = os.path.splitext(image_path)[1].lower()
+    with open(image_path, "rb") as img_file:
+        encoded_string = base64.b64encode(img_file.read()).decode()
+    return f"data:{IMAGE_MIME_TYPES.get(extension, 'image/png')};base64,{encoded_string}"
+
+
+# Function to get an image as a data URI, re-encoding it only when the file changes
+def image_data_uri(image_path):
+    return _encode_image(image_path, os.stat(image_path).st_mtime_ns)
+
+
 # Function to include background image and opacity
 def display_background_image(image_path, opacity):
     """
@@ -75,12 +106,8 @@ def display_background_image(image_path, opacity):
     - image_path (str): Path to the local background image.
     - opacity (float): Opacity level of the background image.
     """
-    # Read the image and encode it in base64
-    with open(image_path, "rb") as img_file:
-        encoded_string = base64.b64encode(img_file.read()).decode()
-
     # Construct the URL for the background image
-    img_url = f"url(data:image/png;base64,{encoded_string})"
+    img_url = f"url({image_data_uri(image_path)})"
 
     # Apply the background image with the given opacity
     st.markdown(
@@ -104,106 +131,67 @@ engine = pyttsx3.init()
 engine.setProperty("rate", 150)
 engine.setProperty("volume", 0.9)
 
-# Fallback messages for no match
-FALLBACK_MESSAGES = [
-    "How can I help you?",
-    "Please ask me something else.",
-    "I'm here to assist you.",
-    "Can I help with anything?",
-    "Ask any question you have.",
-    "Feel free to ask me anything.",
-    "I'm ready to answer your questions.",
-    "What do you want to know?",
-    "Need any assistance?",
-    "Go ahead, I'm listening.",
-]
+# Prebuilt audio for every response, created with: python audio_pack.py
+AUDIO_PACK_PATH = "data/final/answers.pack"
+
+# Question-answer corpus the app answers from
+CORPUS_PATH = "data/final/question_answer.csv"
 
 
 # Function to speak the text
-def speak_text(text):
-    filename = None  # Initialize filename variable
+# Playback runs on a background worker, so this returns as soon as the audio is queued
+def speak_text(text, trace, interrupt=True):
     try:
-        # Generate a unique filename
-        filename = f"temp_{uuid.uuid4().hex}.mp3"
-        tts = gTTS(text=text, lang="en")
-        tts.save(filename)
+        # Long answers are synthesized in sentence chunks, and playback starts with the first one
+        stream = SpeechStream(text, lang="en", pack_path=AUDIO_PACK_PATH)
+        for chunk_number, (audio_bytes, audio_format) in enumerate(stream):
+            get_playback_worker().play(
+                audio_bytes, audio_format, interrupt=interrupt and chunk_number == 0
+            )
 
-        # Initialize pygame mixer
-        pygame.mixer.init()
-        pygame.mixer.music.load(filename)
-        pygame.mixer.music.play()
-
-        # Wait for the playback to finish
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
+        if stream.time_to_first_audio is not None:
+            trace.record("tts_first_audio", stream.time_to_first_audio)
 
     except Exception as e:
         print(f"Error during text-to-speech: {e}")
 
-    finally:
-        # Ensure the file is deleted even if there was an error or interruption
-        if filename and os.path.exists(filename):
-            try:
-                # Stop the music if it's still playing
-                pygame.mixer.music.stop()
-                # Allow time for the system to release the file
-                pygame.mixer.quit()
-                os.remove(filename)
-            except Exception as cleanup_error:
-                print(f"Error during cleanup: {cleanup_error}")
-
 
 # Function to load the CSV file
+# The corpus is parsed once per process and shared by all sessions until the file changes
 def load_data(file_path):
     try:
-        data = pd.read_csv(file_path)
-        return data
+        return load_corpus(file_path)
     except FileNotFoundError:
         st.error(f"File not found at {file_path}")
         return None
 
 
-# Function to find the best match using exact or fuzzy matching
-def find_answer(data, user_question):
-    # Exact match search
-    exact_match = data[
-        data["Question"].str.contains(user_question, case=False, na=False)
-    ]
-    if not exact_match.empty:
-        return exact_match["Answer"].iloc[0]
-
-    # Fuzzy matching
-    questions = data["Question"].tolist()
-    best_match = process.extractOne(user_question, questions, scorer=fuzz.ratio)
-
-    if best_match and best_match[1] > 70:  # Ensure a valid match with a score threshold
-        matched_question = best_match[0]
-        matched_row = data[data["Question"] == matched_question]
-        return matched_row["Answer"].iloc[0]
-
-    # Fuzzy matching with fallback messages
-    best_fallback = process.extractOne(
-        user_question, FALLBACK_MESSAGES, scorer=fuzz.ratio
-    )
-    if best_fallback and best_fallback[1] > 70:
-        return best_fallback[0]
-
-    # Return a random fallback message
-    return random.choice(FALLBACK_MESSAGES)
+# Function to get the calibrated microphone state of this session
+def get_voice_session():
+    if "voice_session" not in st.session_state:
+        st.session_state.voice_session = VoiceSession()
+    return st.session_state.voice_session
 
 
 # Function to take voice input from the user
-def take_voice_input():
-    recognizer = sr.Recognizer()
-    mic = sr.Microphone()
+def take_voice_input(trace):
+    try:
+        backend = get_stt_backend()
+    except (ImportError, OSError, ValueError) as e:
+        print(f"Speech-to-text backend is not available: {e}")
+        return "Speech recognition is not available."
+
+    # Calibrated once per session instead of before every question
+    voice_session = get_voice_session()
+    recognizer = voice_session.recognizer
     st.write("Listening for your question... Please speak now.")
 
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source)
+    with voice_session.microphone(trace) as source:
         try:
-            audio = recognizer.listen(source, timeout=5)
-            user_question = recognizer.recognize_google(audio)
-            return user_question
+            with trace.span("listen"):
+                audio = recognizer.listen(source, timeout=5)
+            # Recognition latency is recorded in the trace by transcribe
+            return transcribe(recognizer, audio, backend, trace).text
         except sr.WaitTimeoutError:
             return "No input detected."
         except sr.UnknownValueError:
@@ -218,61 +206,143 @@ def display_home_page():
     if "greeting_spoken" not in st.session_state:
         st.session_state.greeting_spoken = False
 
-    # Greeting text
-    greeting = (
-        "Welcome to AI Call Connect. "
-        "Our motto is Connecting Conversations, Driving Results. "
-        "Your assistant is here to help. "
-        "Ask any question, and I will provide an appropriate response."
-    )
-
     st.write("Our motto is Connecting Conversations, Driving Results.")
     st.write("Your assistant is here to help.")
     st.write("Ask any question, and I will provide an appropriate response.")
 
     # Display the greeting and speak it only if it hasn't been spoken
     if not st.session_state.greeting_spoken:
-        speak_text(greeting)
+        trace = get_tracer().start_trace()
+        with trace.span("speech"):
+            speak_text(GREETING, trace)
+        trace.finish(request="greeting")
         # Mark greeting as spoken so it won't be spoken again
         st.session_state.greeting_spoken = True
 
     # Load the data
-    file_path = "data/final/question_answer.csv"
-    data = load_data(file_path)
+    corpus = load_data(CORPUS_PATH)
+
+    if corpus is not None and corpus.index is not None:
+        # Optional topic, so only the questions of that domain are searched
+        domain = None
+        if corpus.index.domain_names:
+            topic = st.selectbox(
+                "Topic of your question:", ["All topics"] + corpus.index.domain_names
+            )
+            if topic != "All topics":
+                domain = topic
+
+        mode = st.radio(
+            "Conversation mode:", ["Push to talk", "Continuous"], horizontal=True
+        )
+        if mode == "Continuous":
+            display_continuous_conversation(corpus, domain)
+            return
+        stop_continuous_conversation()
 
-    if data is not None and not data.empty:
         # Take voice input from the user
         if st.button("Speak Now"):
-            user_question = take_voice_input()
+            # Barge-in: stop the previous answer so the caller can be heard
+            get_playback_worker().cancel()
+            trace = get_tracer().start_trace()
+            with trace.span("voice_input"):
+                user_question = take_voice_input(trace)
             st.write(f"**You Asked:** {user_question}")
 
             if user_question:
-                answer = find_answer(data, user_question)
-                st.write(f"**Response:** {answer}")
-                speak_text(answer)
+                timings = {}
+                with trace.span("find_answer"):
+                    match = match_question(
+                        corpus.index,
+                        user_question,
+                        corpus.backend,
+                        timings,
+                        domain,
+                        corpus.cache,
+                    )
+                for stage, seconds in timings.items():
+                    trace.record(f"match_{stage}", seconds)
+
+                st.write(f"**Response:** {match.answer}")
+                with trace.span("speech"):
+                    speak_text(match.answer, trace)
+                trace.finish(request="question", stage=match.stage, score=match.score)
     else:
         st.error("No data available to process your questions.")
 
 
-def display_project_description():
-
-    image_path_logo = "images/Logo.webp"
-
-    # Read the image and encode it in base64
-    with open(image_path_logo, "rb") as img_file:
-        encoded_string = base64.b64encode(img_file.read()).decode()
-
-    # Construct the URL for the background image
-    img_url_logo = f"data:image/png;base64,{encoded_string}"
+# Function to build the answer step of the continuous conversation
+def conversation_answer(corpus, domain):
+    def answer(question, trace):
+        timings = {}
+        match = match_question(
+            corpus.index, question, corpus.backend, timings, domain, corpus.cache
+        )
+        for stage, seconds in timings.items():
+            trace.record(f"match_{stage}", seconds)
+        trace.attributes.update(stage=match.stage, score=match.score)
+        return match.answer
+
+    return answer
+
+
+# Function to stop the continuous conversation of this session, if one is running
+def stop_continuous_conversation():
+    conversation = st.session_state.get("conversation")
+    if conversation is not None:
+        conversation.stop()
+        get_playback_worker().cancel()
+        st.session_state.conversation = None
+
+
+# Function to run the hands-free conversation, answering every turn of the caller
+def display_continuous_conversation(corpus, domain):
+    conversation = st.session_state.get("conversation")
+    if conversation is not None and not conversation.running:
+        # The capture thread stopped on its own, for example when the microphone failed
+        if conversation.error:
+            st.error(conversation.error)
+        st.session_state.conversation = conversation = None
+
+    if conversation is None:
+        st.write("The agent listens continuously and answers each question as you finish it.")
+        if st.button("Start Conversation"):
+            try:
+                conversation = ConversationSession(
+                    get_voice_session(),
+                    conversation_answer(corpus, domain),
+                    get_playback_worker(),
+                    pack_path=AUDIO_PACK_PATH,
+                )
+            except (ImportError, OSError, ValueError) as e:
+                st.error(f"Speech-to-text backend is not available: {e}")
+                return
+            conversation.start()
+            st.session_state.conversation = conversation
+            st.rerun()
+        return
+
+    # Picks up a topic chosen while the conversation runs
+    conversation.answer = conversation_answer(corpus, domain)
+    st.write("Listening... Speak whenever you are ready, you can interrupt the agent.")
+    col1, col2 = st.columns(2)
+    if col1.button("Stop Conversation"):
+        stop_continuous_conversation()
+        st.rerun()
+    col2.button("Refresh Transcript")
+
+    if conversation.error:
+        st.error(conversation.error)
+    for turn in conversation.turns():
+        st.write(f"**You Asked:** {turn['You Asked']}")
+        st.write(f"**Response:** {turn['Response']}")
 
-    image_path_architecture = "images/System_Architecture.png"
 
-    # Read the image and encode it in base64
-    with open(image_path_architecture, "rb") as img_file:
-        encoded_string = base64.b64encode(img_file.read()).decode()
+def display_project_description():
 
-    # Construct the URL for the background image
-    img_url_architecture = f"data:image/png;base64,{encoded_string}"
+    # Encoded once per process, not on every rerun
+    img_url_logo = image_data_uri("images/Logo.webp")
+    img_url_architecture = image_data_uri("images/System_Architecture.png")
 
     st.markdown(
         f"""
@@ -438,6 +508,29 @@ def display_resources_information():
     )
 
 
+# Function to display recent per-stage timings in the sidebar
+def display_stage_timings():
+    tracer = get_tracer()
+    st.sidebar.markdown("### Stage Timings")
+
+    corpus = load_data(CORPUS_PATH)
+    if corpus is not None:
+        cache = corpus.cache.stats()
+        st.sidebar.write(
+            f"Response cache: {cache['hits']} hits, {cache['misses']} misses "
+            f"({cache['hit_rate']:.0%} hit rate), {cache['entries']} entries"
+        )
+
+    traces = tracer.recent_traces()
+    if traces:
+        st.sidebar.dataframe(traces)
+    else:
+        st.sidebar.write("No requests timed yet.")
+
+    with st.sidebar.expander("Prometheus metrics"):
+        st.code(tracer.prometheus_text(), language="text")
+
+
 # Main code to initialize Streamlit
 if __name__ == "__main__":
 
@@ -462,6 +555,15 @@ if __name__ == "__main__":
         ],
     )
 
+    # Optional debug panel with the timings of recent requests
+    show_stage_timings = st.sidebar.checkbox("Show stage timings")
+
+    # Report a configured speech-to-text engine that is not installed before anyone speaks
+    try:
+        get_stt_backend()
+    except (ImportError, OSError, ValueError) as e:
+        st.sidebar.warning(f"Speech-to-text backend is not available: {e}")
+
     if selected_section == "Connect Now":
         display_home_page()
 
@@ -486,6 +588,13 @@ if __name__ == "__main__":
         """
         display_resources_information()
 
+    # Leaving the page hangs up the hands-free conversation
+    if selected_section != "Connect Now":
+        stop_continuous_conversation()
+
+    if show_stage_timings:
+        display_stage_timings()
+
     # Using Font Awesome icons for links
     st.sidebar.markdown(
         """
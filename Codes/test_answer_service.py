@@ -0,0 +1,164 @@
+"""
+Tests of the HTTP and WebSocket handlers of the answer service.
+
+The service runs in process on a small corpus, matching on its own thread, with an
+audio pack synthesized by the stub engine, so no network or microphone is needed.
+
+Run from the Codes folder:
+    python -m pytest -q
+"""
+
+# asyncio: A Python module for asynchronous I/O, used here to run the test client.
+import asyncio
+
+# aiohttp: An asynchronous HTTP client/server framework for asyncio, used here for its test client.
+from aiohttp.test_utils import TestClient, TestServer
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# pytest: A Python testing framework, used here for fixtures.
+import pytest
+
+# answer_service: The project's headless answering service, under test.
+from answer_service import MAX_QUESTION_CHARS, AnswerService, create_app
+
+# audio_pack: The project's prebuilt response audio, used here to serve speech without synthesis.
+from audio_pack import AudioPack, build_pack
+
+# matching: The project's question matching engine, providing the fixed responses.
+from matching import FALLBACK_MESSAGES, GREETING
+
+# Corpus rows of the test service: question, answer and domain
+QUESTIONS = [
+    ("What is the price of the Samsung Galaxy S22?", "It is priced at $799.", "electronics"),
+    ("Do you ship internationally?", "Yes, we ship to over forty countries.", "sales"),
+    ("Who wrote Pride and Prejudice?", "Jane Austen wrote it.", "books"),
+]
+
+
+@pytest.fixture(scope="module")
+def paths(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("service")
+    corpus_path = str(directory / "question_answer.csv")
+    pd.DataFrame(QUESTIONS, columns=["Question", "Answer", "Domain"]).to_csv(corpus_path)
+    pack_path = str(directory / "answers.pack")
+    responses = [answer for _, answer, _ in QUESTIONS] + FALLBACK_MESSAGES + [GREETING]
+    build_pack(responses, pack_path, engine="stub", workers=1)
+    return corpus_path, pack_path
+
+
+# Function to run one test body against a fresh service
+def run(paths, body, service=None):
+    corpus_path, pack_path = paths
+
+    async def main():
+        app = create_app(service or AnswerService(corpus_path, workers=0, pack_path=pack_path))
+        async with TestClient(TestServer(app)) as client:
+            return await body(client)
+
+    return asyncio.run(main())
+
+
+def test_answer_returns_the_match(paths):
+    async def body(client):
+        response = await client.post("/answer", json={"question": QUESTIONS[1][0]})
+        assert response.status == 200
+        result = await response.json()
+        assert (result["answer"], result["stage"], result["row"]) == (QUESTIONS[1][1], "exact", 1)
+
+        response = await client.post(
+            "/answer", json={"question": "who wrote pride and prejudice", "domain": "books"}
+        )
+        assert (await response.json())["answer"] == QUESTIONS[2][1]
+
+    run(paths, body)
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b"not json",
+        b"[1, 2]",
+        b'{"question": "   "}',
+        b'{"question": "Hello?", "domain": 3}',
+        ('{"question": "%s"}' % ("a" * (MAX_QUESTION_CHARS + 1))).encode(),
+    ],
+)
+def test_answer_rejects_bad_requests(paths, payload):
+    async def body(client):
+        response = await client.post("/answer", data=payload)
+        assert response.status == 400
+        assert "error" in await response.json()
+
+    run(paths, body)
+
+
+def test_speech_serves_known_responses_from_the_pack(paths):
+    expected = bytes(AudioPack(paths[1]).get(QUESTIONS[0][1]))
+
+    async def body(client):
+        response = await client.get("/speech", params={"text": QUESTIONS[0][1]})
+        assert response.status == 200
+        assert response.content_type == "audio/wav"
+        assert await response.read() == expected
+
+    run(paths, body)
+
+
+@pytest.mark.parametrize(
+    "text, status",
+    [("", 400), ("Say something of my own choosing.", 404), ("a" * (MAX_QUESTION_CHARS + 1), 400)],
+)
+def test_speech_rejects_other_text(paths, text, status):
+    async def body(client):
+        response = await client.get("/speech", params={"text": text})
+        assert response.status == status
+
+    run(paths, body)
+
+
+def test_websocket_answers_every_question_of_a_call(paths):
+    async def body(client):
+        async with client.ws_connect("/ws") as socket:
+            await socket.send_json({"id": 1, "question": QUESTIONS[0][0], "speech": True})
+            answer = await socket.receive_json()
+            assert (answer["id"], answer["answer"]) == (1, QUESTIONS[0][1])
+            assert await socket.receive_json() == {"id": 1, "chunk": 0, "audio_format": "wav"}
+            assert (await socket.receive_bytes())[:4] == b"RIFF"
+            assert await socket.receive_json() == {"id": 1, "chunks": 1}
+
+            await socket.send_str("not json")
+            assert "error" in await socket.receive_json()
+
+            await socket.send_json({"id": 2, "question": QUESTIONS[2][0]})
+            answer = await socket.receive_json()
+            assert (answer["id"], answer["answer"]) == (2, QUESTIONS[2][1])
+
+    run(paths, body)
+
+
+def test_websocket_survives_a_failed_match(paths):
+    corpus_path, pack_path = paths
+    service = AnswerService(corpus_path, workers=0, pack_path=pack_path)
+    answer = service.answer
+    failures = [RuntimeError("worker pool is broken")]
+
+    async def flaky_answer(question, domain=None):
+        if failures:
+            raise failures.pop()
+        return await answer(question, domain)
+
+    service.answer = flaky_answer
+
+    async def body(client):
+        async with client.ws_connect("/ws") as socket:
+            await socket.send_json({"id": 1, "question": QUESTIONS[0][0]})
+            reply = await socket.receive_json()
+            assert reply["id"] == 1
+            assert "worker pool is broken" in reply["error"]
+
+            await socket.send_json({"id": 2, "question": QUESTIONS[0][0]})
+            assert (await socket.receive_json())["answer"] == QUESTIONS[0][1]
+
+    run(paths, body, service)
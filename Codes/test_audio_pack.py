@@ -0,0 +1,89 @@
+"""
+Tests of the prebuilt response audio pack: building, reopening and rebuilding it.
+
+Clips are rendered by the stub engine, which writes silent WAV without a network or
+speech engine, so every clip can be compared with the bytes the engine gives directly.
+
+Run from the Codes folder:
+    python -m pytest -q
+"""
+
+# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
+import os
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# pytest: A Python testing framework, used here for fixtures and expected errors.
+import pytest
+
+# audio_pack: The project's prebuilt response audio, under test.
+from audio_pack import AudioPack, build_pack, collect_responses, get_audio_pack
+
+# audio_cache: The project's text-to-speech engines, used here to render the expected clips.
+from audio_cache import synthesize_stub
+
+# matching: The project's question matching engine, providing the fallback messages and greeting.
+from matching import FALLBACK_MESSAGES, GREETING
+
+# Responses of the test packs, with a duplicate the build must skip
+TEXTS = ["Hello there.", "It is priced at $799.", "Yes, we ship worldwide.", "Hello there."]
+
+
+def test_pack_round_trip(tmp_path):
+    path = str(tmp_path / "answers.pack")
+    assert build_pack(TEXTS, path, engine="stub", workers=1) == 3
+    assert sorted(os.listdir(tmp_path)) == ["answers.pack"]
+
+    pack = AudioPack(path)
+    assert (len(pack), pack.engine, pack.lang, pack.format) == (3, "stub", "en", "wav")
+    for text in TEXTS:
+        assert text in pack
+        assert bytes(pack.get(text)) == synthesize_stub(text)
+    assert "Not in the pack." not in pack
+    assert pack.get("Not in the pack.") is None
+    assert pack.get(TEXTS[0], lang="fr") is None
+
+
+def test_get_audio_pack_reopens_a_rebuilt_pack(tmp_path):
+    path = str(tmp_path / "answers.pack")
+    assert get_audio_pack(path) is None
+
+    build_pack(TEXTS[:2], path, engine="stub", workers=1)
+    pack = get_audio_pack(path)
+    assert len(pack) == 2
+    assert get_audio_pack(path) is pack
+    clip = pack.get(TEXTS[0])
+
+    build_pack(TEXTS, path, engine="stub", workers=1)
+    rebuilt = get_audio_pack(path)
+    assert rebuilt is not pack
+    assert len(rebuilt) == 3
+    assert bytes(rebuilt.get(TEXTS[2])) == synthesize_stub(TEXTS[2])
+    # A clip sliced from the old pack stays readable while it is played out
+    assert bytes(clip) == synthesize_stub(TEXTS[0])
+
+
+def test_failed_build_leaves_no_files(tmp_path):
+    path = str(tmp_path / "answers.pack")
+    with pytest.raises(KeyError):
+        build_pack(TEXTS, path, engine="no-such-engine", workers=1)
+    assert os.listdir(tmp_path) == []
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "answers.pack"
+    path.write_bytes(b"RIFF not a pack")
+    with pytest.raises(ValueError, match="not an audio pack"):
+        AudioPack(str(path))
+
+
+def test_collect_responses_lists_each_response_once(tmp_path):
+    corpus_path = str(tmp_path / "question_answer.csv")
+    pd.DataFrame(
+        {
+            "Question": ["a?", "b?", "c?", "d?"],
+            "Answer": ["First.", None, "  ", "First."],
+        }
+    ).to_csv(corpus_path)
+    assert collect_responses(corpus_path) == [GREETING] + FALLBACK_MESSAGES + ["First."]
@@ -0,0 +1,104 @@
+"""
+Tests of the energy-based turn segmentation of continuous conversations.
+
+Frames are synthetic 16-bit samples of constant amplitude, whose RMS energy is that
+amplitude, against a fixed energy threshold.
+
+Run from the Codes folder:
+    python -m pytest -q
+"""
+
+# numpy: A library for numerical computing in Python, used here to build the frames.
+import numpy as np
+
+# speech_recognition: A library for performing speech recognition with support for multiple engines and APIs.
+import speech_recognition as sr
+
+# pytest: A Python testing framework, used here for fixtures.
+import pytest
+
+# conversation: The project's continuous conversation, under test.
+from conversation import SPEECH_STARTED, Turn, TurnSegmenter, frame_energy
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FRAME_SAMPLES = 1600  # 0.1 seconds
+
+THRESHOLD = 300
+
+
+# Function to build one frame of constant amplitude
+def frame(amplitude):
+    return np.full(FRAME_SAMPLES, amplitude, dtype="<i2").tobytes()
+
+
+SILENCE = frame(10)
+SPEECH = frame(2000)
+
+
+@pytest.fixture
+def segmenter():
+    recognizer = sr.Recognizer()
+    recognizer.energy_threshold = THRESHOLD
+    recognizer.dynamic_energy_threshold = False
+    # 0.6 s of silence ends a turn, 0.3 s of speech starts one, 0.3 s of pre-roll
+    return TurnSegmenter(
+        recognizer,
+        SAMPLE_RATE,
+        SAMPLE_WIDTH,
+        FRAME_SAMPLES,
+        silence_seconds=0.6,
+        min_speech_seconds=0.3,
+        pre_roll_seconds=0.3,
+        max_turn_seconds=2.0,
+    )
+
+
+# Function to feed frames, returning every event that is not None
+def feed(segmenter, frames, threshold_factor=1.0):
+    events = [segmenter.feed(frame, threshold_factor) for frame in frames]
+    return [event for event in events if event is not None]
+
+
+def test_frame_energy_is_the_rms_of_the_samples():
+    assert frame_energy(SPEECH, SAMPLE_WIDTH) == pytest.approx(2000)
+    assert frame_energy(b"", SAMPLE_WIDTH) == 0.0
+
+
+def test_turn_is_cut_after_the_silence(segmenter):
+    events = feed(segmenter, [SILENCE] * 10 + [SPEECH] * 8 + [SILENCE] * 6)
+    assert events[0] == SPEECH_STARTED
+    assert len(events) == 2
+
+    turn = events[1]
+    assert isinstance(turn, Turn)
+    assert turn.speech_seconds == pytest.approx(0.8)
+    # Pre-roll, the speech and the silence that ended it
+    assert len(turn.audio.frame_data) == (3 + 8 + 6) * len(SPEECH)
+    assert turn.audio.sample_rate == SAMPLE_RATE
+
+
+def test_short_noise_is_not_a_turn(segmenter):
+    assert feed(segmenter, [SILENCE] * 5 + [SPEECH] * 2 + [SILENCE] * 20) == []
+
+
+def test_long_speech_is_cut_at_the_longest_turn(segmenter):
+    events = feed(segmenter, [SPEECH] * 25)
+    turns = [event for event in events if isinstance(event, Turn)]
+    assert len(turns) == 1
+    assert len(turns[0].audio.frame_data) == 20 * len(SPEECH)
+
+
+def test_raised_threshold_ignores_quieter_speech(segmenter):
+    quiet = frame(600)
+    assert feed(segmenter, [quiet] * 10 + [SILENCE] * 10, threshold_factor=3.0) == []
+    assert feed(segmenter, [quiet] * 10 + [SILENCE] * 10)[0] == SPEECH_STARTED
+
+
+def test_threshold_adapts_to_the_noise_between_turns(segmenter):
+    recognizer = segmenter.recognizer
+    recognizer.dynamic_energy_threshold = True
+    feed(segmenter, [frame(100)] * 100)
+    # Converges towards the noise energy times dynamic_energy_ratio
+    target = 100 * recognizer.dynamic_energy_ratio
+    assert abs(recognizer.energy_threshold - target) < abs(THRESHOLD - target)
@@ -0,0 +1,73 @@
+"""
+Tests of the process-wide corpus loader and its use of the corpus pack.
+
+Run from the Codes folder:
+    python -m pytest -q
+"""
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# pytest: A Python testing framework, used here for fixtures.
+import pytest
+
+# corpus: The project's corpus loader, under test.
+from corpus import load_corpus
+
+# corpus_pack: The project's memory-mapped corpus format, written next to the test CSV.
+from corpus_pack import CorpusPack, pack_path_for, write_corpus_pack
+
+# matching: The project's question matching engine, used here to query the loaded index.
+from matching import match_question
+
+# Corpus rows of the tests: question, answer and domain
+QUESTIONS = [
+    ("What is the price of the Samsung Galaxy S22?", "It is priced at $799.", "electronics"),
+    ("Do you ship internationally?", "Yes, we ship to over forty countries.", "sales"),
+    ("Who wrote Pride and Prejudice?", "Jane Austen wrote it.", "books"),
+]
+
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    path = str(tmp_path / "question_answer.csv")
+    pd.DataFrame(QUESTIONS, columns=["Question", "Answer", "Domain"]).to_csv(path)
+    return path
+
+
+def test_csv_is_loaded_once(corpus_path):
+    corpus = load_corpus(corpus_path)
+    assert corpus.pack_path is None
+    assert len(corpus.data) == len(QUESTIONS)
+    assert load_corpus(corpus_path) is corpus
+    assert match_question(corpus.index, QUESTIONS[1][0]).answer == QUESTIONS[1][1]
+
+
+def test_pack_is_used_when_present(corpus_path):
+    write_corpus_pack(corpus_path, pack_path_for(corpus_path))
+    corpus = load_corpus(corpus_path)
+    assert corpus.pack_path == pack_path_for(corpus_path)
+    assert corpus.data is None
+    assert match_question(corpus.index, QUESTIONS[2][0]).answer == QUESTIONS[2][1]
+
+
+def test_unreadable_pack_index_falls_back_to_the_csv(corpus_path, monkeypatch, caplog):
+    write_corpus_pack(corpus_path, pack_path_for(corpus_path))
+
+    def broken_index(self):
+        raise KeyError("postings.keys")
+
+    monkeypatch.setattr(CorpusPack, "load_index", broken_index)
+    corpus = load_corpus(corpus_path)
+    assert corpus.pack_path is None
+    assert len(corpus.data) == len(QUESTIONS)
+    assert match_question(corpus.index, QUESTIONS[0][0]).answer == QUESTIONS[0][1]
+    assert "its index cannot be loaded" in caplog.text
+
+
+def test_changed_csv_is_reloaded(corpus_path):
+    corpus = load_corpus(corpus_path)
+    pd.DataFrame(QUESTIONS[:2], columns=["Question", "Answer", "Domain"]).to_csv(corpus_path)
+    reloaded = load_corpus(corpus_path)
+    assert reloaded is not corpus
+    assert len(reloaded.data) == 2
@@ -0,0 +1,199 @@
+"""
+Tests of the question index and matching stages against fuzzywuzzy's own full scan.
+
+The index prunes candidates with score bounds, a shortlist and a length window, and
+every one of those must leave the results exactly as process.extractOne over every
+distinct question would give them.
+
+Run from the Codes folder:
+    python -m pytest -q
+"""
+
+# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
+import os
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# pytest: A Python testing framework, used here for fixtures and parametrized tests.
+import pytest
+
+# fuzzywuzzy: A library for fuzzy string matching, used here as the reference full scan.
+from fuzzywuzzy import fuzz, process, utils
+
+# matching: The project's question matching engine, under test.
+from matching import (
+    SCORE_THRESHOLD,
+    QuestionIndex,
+    match_question,
+    match_top_k,
+)
+
+# normalization: The project's shared text normalization, the same steps the index applies.
+from normalization import normalize_text
+
+# corpus_pack: The project's memory-mapped corpus format, whose index must match the CSV one.
+from corpus_pack import open_corpus_pack, write_corpus_pack
+
+# response_cache: The project's answer cache, used here to check the cache key.
+from response_cache import ResponseCache
+
+# benchmark: The project's matching benchmark, providing the query generator.
+from benchmark import generate_queries
+
+# Shipped corpus the tests take their questions from
+CORPUS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "final", "question_answer.csv"
+)
+
+# Rows taken from the start of every domain, enough for near duplicates and ties
+ROWS_PER_DOMAIN = 60
+
+
+@pytest.fixture(scope="module")
+def data():
+    corpus = pd.read_csv(CORPUS_PATH, index_col=0)
+    sample = corpus.groupby("Domain", sort=False).head(ROWS_PER_DOMAIN)
+    # Duplicate, blank and punctuation-only questions, which the index must skip or merge
+    extra = pd.DataFrame(
+        {
+            "Question": [sample["Question"].iloc[0], "", "?!", sample["Question"].iloc[3].upper()],
+            "Answer": ["Duplicate.", "Blank.", "Punctuation.", "Shouted duplicate."],
+            "Domain": ["electronics"] * 4,
+        }
+    )
+    return pd.concat([sample, extra], ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def index(data):
+    return QuestionIndex(data)
+
+
+@pytest.fixture(scope="module")
+def queries(data):
+    questions = data["Question"].dropna().astype(str).tolist()
+    generated = generate_queries(questions, 12, seed=3)
+    # A prefix of a question scores exactly the length bound against it, so these sit
+    # on the edge of the length window
+    prefixes = [
+        question[: int(len(question) * fraction)]
+        for question in questions[::40]
+        for fraction in (0.55, 0.6, 0.7, 0.85)
+    ]
+    return [query for kind in generated.values() for query in kind] + prefixes + [
+        "",
+        "?",
+        "price",
+        "What is the price of the Samsung Galaxy S22",
+    ]
+
+
+# Function to score every distinct question in full, best first and earliest row first on ties
+def full_scan(index, query, threshold=SCORE_THRESHOLD):
+    processed_query = utils.full_process(normalize_text(query))
+    rows = sorted(set(index.first_rows.values()))
+    scores = [(row, fuzz.ratio(processed_query, index.processed[row])) for row in rows]
+    return sorted(
+        ((row, score) for row, score in scores if score > threshold),
+        key=lambda pair: (-pair[1], pair[0]),
+    )
+
+
+def test_find_fuzzy_matches_extract_one(index, queries):
+    for query in queries:
+        processed_query = utils.full_process(normalize_text(query))
+        choices = {row: index.processed[row] for row in sorted(set(index.first_rows.values()))}
+        expected = process.extractOne(
+            processed_query,
+            choices,
+            processor=None,
+            scorer=fuzz.ratio,
+            score_cutoff=SCORE_THRESHOLD + 1,
+        )
+        expected = (expected[2], expected[1]) if expected else None
+        assert index.find_fuzzy(query) == expected, query
+
+
+@pytest.mark.parametrize("k", [1, 3, 10])
+def test_find_top_k_matches_full_scan(index, queries, k):
+    for query in queries:
+        assert index.find_top_k(query, k) == full_scan(index, query)[:k], query
+
+
+def test_find_top_k_scores_fewer_rows_than_a_full_scan(index, data):
+    stats = {}
+    index.find_top_k(data["Question"].iloc[5], 1, stats=stats)
+    assert stats["scored"] < stats["window"] <= stats["rows"]
+
+
+def test_find_top_k_with_lower_threshold(index, queries):
+    for query in queries[:12]:
+        assert index.find_top_k(query, 5, threshold=40) == full_scan(index, query, 40)[:5]
+
+
+def test_match_top_k_starts_with_match_question(index, queries):
+    for query in queries:
+        top = match_top_k(index, query, 5)
+        best = match_question(index, query)
+        if best.stage == "random":
+            assert len(top) == 1 and top[0].stage == "random"
+        else:
+            assert top[0] == best, query
+        rows = [match.row for match in top if match.row is not None]
+        assert len(rows) == len(set(rows))
+
+
+def test_domain_search_only_returns_rows_of_the_domain(index, data):
+    question = data.loc[data["Domain"] == "sales", "Question"].iloc[2]
+    for match in match_top_k(index, question, 5, domain="sales"):
+        assert data["Domain"].iloc[match.row] == "sales"
+
+
+def test_pack_index_matches_csv_index(data, queries, tmp_path):
+    csv_path = str(tmp_path / "question_answer.csv")
+    data.to_csv(csv_path)
+    pack_path = str(tmp_path / "question_answer.corpus")
+    write_corpus_pack(csv_path, pack_path)
+
+    csv_index = QuestionIndex(pd.read_csv(csv_path))
+    pack_index = open_corpus_pack(pack_path, csv_path).load_index()
+    for query in queries:
+        assert pack_index.find_exact(query) == csv_index.find_exact(query), query
+        assert pack_index.find_top_k(query, 3) == csv_index.find_top_k(query, 3), query
+        assert pack_index.find_top_k(query, 3) == full_scan(csv_index, query)[:3], query
+        for domain in ("sales", "books"):
+            assert match_question(pack_index, query, domain=domain)[1:] == match_question(
+                csv_index, query, domain=domain
+            )[1:]
+
+
+def test_cache_is_shared_by_questions_with_the_same_normalized_text(index):
+    cache = ResponseCache()
+    spellings = ["Im here to assist you", "I'm here to assist you", "  I'M HERE, to assist you!"]
+    uncached = [match_question(index, question) for question in spellings]
+    cached = [match_question(index, question, cache=cache) for question in spellings]
+
+    assert cached == uncached
+    assert len(cache) == 1
+    assert cache.stats()["hits"] == len(spellings) - 1
+
+
+def test_cache_keeps_domains_apart(index, data):
+    cache = ResponseCache()
+    question = data.loc[data["Domain"] == "sales", "Question"].iloc[0]
+    match_question(index, question, cache=cache, domain="sales")
+    match_question(index, question, cache=cache, domain="books")
+    assert len(cache) == 2
+
+
+def test_cache_draws_random_fallbacks_fresh(index):
+    cache = ResponseCache()
+    timings = {}
+    answers = set()
+    for _ in range(30):
+        match = match_question(index, "zebra quantum lasagna", cache=cache, timings=timings)
+        assert match.stage == "random"
+        answers.add(match.answer)
+    assert "cache" in timings
+    assert len(answers) > 1
@@ -0,0 +1,84 @@
+"""
+Tests of the vectorized Series normalization against the scalar functions.
+
+normalize_series joins a whole column into one buffer, so every row must still come out
+exactly as normalize_text gives it, whatever markup, mojibake or separators it holds.
+
+Run from the Codes folder:
+    python -m pytest -q
+"""
+
+# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
+import os
+
+# numpy: A library for numerical computing in Python, used here for missing values.
+import numpy as np
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# pytest: A Python testing framework, used here for parametrized tests.
+import pytest
+
+# normalization: The project's shared text normalization, under test.
+from normalization import (
+    ROW_SEPARATOR,
+    clean_series,
+    clean_text,
+    normalize_series,
+    normalize_text,
+)
+
+# Rows that exercise every step, and the edges of the row buffer
+TRICKY_ROWS = [
+    "What's the price of the iPhone 14?",
+    "  Leading and   trailing   spaces  ",
+    "Itâ€™s â€œquotedâ€\x9d â€“ and cafÃ©",
+    "It’s “typographic” — too…",
+    "{F Uh, } I think <laughter> [ I, + I ] t- told you -- really <throat_clearing>?",
+    "{D Well, } {C and } {E I mean } it's # fine # /",
+    "Punctuation!!! only??? ,,,",
+    "?!",
+    "",
+    "-",
+    "t-",
+    "<",
+    "{F",
+    f"Contains the{ROW_SEPARATOR}row separator",
+    ROW_SEPARATOR,
+    f"{ROW_SEPARATOR} at the start",
+    "Ünïcödé and ÄÖÜ stay letters",
+    "Tabs\tand\nnewlines",
+]
+
+
+@pytest.mark.parametrize(
+    "series_function, text_function",
+    [(normalize_series, normalize_text), (clean_series, clean_text)],
+)
+def test_series_matches_scalar(series_function, text_function):
+    series = pd.Series(TRICKY_ROWS, index=range(10, 10 + len(TRICKY_ROWS)))
+    result = series_function(series)
+    assert list(result.index) == list(series.index)
+    assert result.tolist() == [text_function(row) for row in TRICKY_ROWS]
+
+
+@pytest.mark.parametrize("series_function", [normalize_series, clean_series])
+def test_missing_values_become_empty_strings(series_function):
+    result = series_function(pd.Series(["A question?", None, np.nan, 42]))
+    assert result.tolist()[1:3] == ["", ""]
+    assert result.tolist()[3] == "42"
+
+
+@pytest.mark.parametrize("series_function", [normalize_series, clean_series])
+def test_empty_series(series_function):
+    assert series_function(pd.Series([], dtype=object)).tolist() == []
+
+
+def test_series_matches_scalar_on_the_corpus():
+    path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "data", "final", "question_answer.csv"
+    )
+    questions = pd.read_csv(path)["Question"]
+    expected = [normalize_text(text) if isinstance(text, str) else "" for text in questions]
+    assert normalize_series(questions).tolist() == expected
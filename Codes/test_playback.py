@@ -0,0 +1,113 @@
+"""
+Tests of the playback worker's queueing and generation-based cancel.
+
+The mixer is replaced by a fake clip player that plays until it is released or its
+generation is cancelled, so the tests need no audio device.
+
+Run from the Codes folder:
+    python -m pytest -q
+"""
+
+# threading: A Python module for running code concurrently, used here to hold clips playing.
+import threading
+
+# pygame: A set of Python modules designed for writing video games, used here for its mixer error type.
+import pygame
+
+# pytest: A Python testing framework, used here for fixtures.
+import pytest
+
+# playback: The project's background playback worker, under test.
+import playback
+
+# Longest a test waits for the worker before failing
+TIMEOUT = 5
+
+
+class FakeWorker(playback.PlaybackWorker):
+    """
+    Playback worker whose clips play until released or cancelled.
+
+    played lists the clips in the order they started, stopped the ones cut off by cancel().
+    """
+
+    def __init__(self):
+        self.played = []
+        self.stopped = []
+        self.started = threading.Event()
+        self.cut = threading.Event()
+        self.release = threading.Event()
+        super().__init__()
+
+    def _play_clip(self, generation, audio, audio_format):
+        self.played.append(audio)
+        self.started.set()
+        while not self.release.wait(0.01):
+            if generation != self._generation:
+                self.stopped.append(audio)
+                self.cut.set()
+                return
+        if audio == b"broken":
+            raise ValueError("unreadable clip")
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(playback.pygame.mixer, "init", lambda: None)
+    return FakeWorker()
+
+
+def test_clips_play_in_order(worker):
+    worker.release.set()
+    for clip in (b"one", b"two", b"three"):
+        worker.play(clip, "wav")
+    assert worker.wait(TIMEOUT)
+    assert worker.played == [b"one", b"two", b"three"]
+    assert not worker.is_busy()
+
+
+def test_cancel_stops_the_clip_and_drops_the_queue(worker):
+    for clip in (b"one", b"two", b"three"):
+        worker.play(clip, "wav")
+    assert worker.started.wait(TIMEOUT)
+    assert worker.is_busy()
+
+    worker.cancel()
+    assert worker.wait(TIMEOUT)
+    assert worker.played == [b"one"]
+    assert worker.stopped == [b"one"]
+    assert not worker.is_busy()
+
+
+def test_interrupt_replaces_what_is_queued(worker):
+    worker.play(b"one", "wav")
+    worker.play(b"two", "wav")
+    assert worker.started.wait(TIMEOUT)
+
+    worker.play(b"answer", "wav", interrupt=True)
+    assert worker.cut.wait(TIMEOUT)
+    worker.release.set()
+    assert worker.wait(TIMEOUT)
+    assert worker.played == [b"one", b"answer"]
+    assert worker.stopped == [b"one"]
+
+
+def test_failed_clip_is_logged_and_the_worker_goes_on(worker, caplog):
+    worker.release.set()
+    worker.play(b"broken", "wav")
+    worker.play(b"two", "wav")
+    assert worker.wait(TIMEOUT)
+    assert worker.played == [b"broken", b"two"]
+    assert "Error during playback" in caplog.text
+    assert "unreadable clip" in caplog.text
+
+
+def test_play_raises_without_a_mixer(monkeypatch):
+    def fail():
+        raise pygame.error("No available audio device")
+
+    monkeypatch.setattr(playback.pygame.mixer, "init", fail)
+    worker = FakeWorker()
+    with pytest.raises(RuntimeError, match="No available audio device"):
+        worker.play(b"one", "wav")
+    assert not worker.is_busy()
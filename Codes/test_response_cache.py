@@ -0,0 +1,65 @@
+"""
+Tests of the LRU and expiry behaviour of the response cache.
+
+Run from the Codes folder:
+    python -m pytest -q
+"""
+
+# response_cache: The project's answer cache, under test.
+import response_cache
+from response_cache import ResponseCache
+
+
+def test_hits_and_misses_are_counted():
+    cache = ResponseCache()
+    assert cache.get("price") is None
+    cache.put("price", "It costs $799.")
+    assert cache.get("price") == "It costs $799."
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_time_to_live(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl_seconds=60)
+    cache.put("a", 1)
+
+    now[0] += 59
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_entries_never_expire_without_a_time_to_live(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl_seconds=None)
+    cache.put("a", 1)
+    now[0] += 10**9
+    assert cache.get("a") == 1
+
+
+def test_clear_keeps_the_counters():
+    cache = ResponseCache()
+    cache.put("a", 1)
+    cache.get("a")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 1
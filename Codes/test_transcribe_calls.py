@@ -0,0 +1,161 @@
+"""
+Tests of the batch call transcription: statuses, resuming and retrying failed calls.
+
+Calls are short WAV files told apart by their samples, transcribed by the stub
+speech-to-text backend from a JSON file keyed by the digest of each recording, and
+processed in this process (workers=1).
+
+Run from the Codes folder:
+    python -m pytest -q
+"""
+
+# json: A Python module for encoding and decoding JSON data, used here for the stub transcripts.
+import json
+
+# wave: A Python module for reading and writing WAV files, used here to write the test calls.
+import wave
+
+# pandas: A powerful data manipulation and analysis library for Python, providing data structures like DataFrames for easy handling of data.
+import pandas as pd
+
+# pytest: A Python testing framework, used here for fixtures and parametrized tests.
+import pytest
+
+# speech_recognition: A library for performing speech recognition, used here to read back the test calls.
+import speech_recognition as sr
+
+# speech_to_text: The project's speech-to-text backends, providing the stub backend.
+import speech_to_text
+from speech_to_text import StubBackend, audio_digest
+
+# transcribe_calls: The project's batch call transcription, under test.
+from transcribe_calls import find_recordings, read_results, transcribe_calls
+
+# Corpus rows of the tests: question, answer and domain
+QUESTIONS = [
+    ("What is the price of the Samsung Galaxy S22?", "It is priced at $799.", "electronics"),
+    ("Do you ship internationally?", "Yes, we ship to over forty countries.", "sales"),
+]
+
+# Transcript of every test call by file name, None for a call nobody understands
+TRANSCRIPTS = {
+    "a.wav": QUESTIONS[0][0],
+    "b.wav": QUESTIONS[1][0],
+    "c.wav": None,
+    "d.wav": "crash",
+}
+
+
+class CrashingBackend(StubBackend):
+    """
+    Stub backend that fails with an unexpected error on the transcript "crash" until
+    crashes is cleared.
+    """
+
+    crashes = True
+
+    def recognize(self, recognizer, audio):
+        text = super().recognize(recognizer, audio)
+        if text == "crash" and self.crashes:
+            raise RuntimeError("engine crashed")
+        return text
+
+
+# Function to write a short mono WAV file whose samples all have the given value
+def write_call(path, value):
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(8000)
+        wav_file.writeframes(value.to_bytes(2, "little", signed=True) * 4000)
+
+
+@pytest.fixture
+def calls(tmp_path, monkeypatch):
+    audio_dir = tmp_path / "recordings"
+    audio_dir.mkdir()
+    transcripts = {}
+    for value, (name, text) in enumerate(TRANSCRIPTS.items(), start=1):
+        write_call(audio_dir / name, value * 100)
+        with sr.AudioFile(str(audio_dir / name)) as source:
+            audio = sr.Recognizer().record(source)
+        if text is not None:
+            transcripts[audio_digest(audio)] = text
+    (audio_dir / "e.wav").write_bytes(b"not audio")
+
+    transcripts_path = tmp_path / "transcripts.json"
+    transcripts_path.write_text(json.dumps(transcripts), encoding="utf-8")
+    backend = CrashingBackend(str(transcripts_path))
+    monkeypatch.setattr(speech_to_text, "_backends", {"stub": backend})
+
+    corpus_path = str(tmp_path / "question_answer.csv")
+    pd.DataFrame(QUESTIONS, columns=["Question", "Answer", "Domain"]).to_csv(corpus_path)
+    return {"dir": str(audio_dir), "corpus": corpus_path, "backend": backend}
+
+
+# Function to run the transcription over every test call
+def run(calls, output_path):
+    return transcribe_calls(
+        find_recordings(calls["dir"]), output_path, calls["corpus"], workers=1, stt_name="stub"
+    )
+
+
+@pytest.mark.parametrize("extension", [".jsonl", ".csv"])
+def test_every_call_gets_a_row(calls, tmp_path, extension):
+    output_path = str(tmp_path / f"results{extension}")
+    stats = run(calls, output_path)
+    assert stats["ok"] == 2 and stats["not_understood"] == 1
+    assert stats["error"] == 1 and stats["unreadable"] == 1
+
+    rows = {row["id"]: row for row in read_results(output_path)}
+    assert sorted(rows) == ["a.wav", "b.wav", "c.wav", "d.wav", "e.wav"]
+    assert rows["a.wav"]["answer"] == QUESTIONS[0][1]
+    assert rows["b.wav"]["answer"] == QUESTIONS[1][1]
+    assert rows["c.wav"]["status"] == "not_understood"
+    assert rows["d.wav"]["status"] == "error"
+    assert "engine crashed" in rows["d.wav"]["error"]
+    assert rows["e.wav"]["status"] == "unreadable"
+
+
+def test_resume_skips_calls_already_done(calls, tmp_path):
+    output_path = str(tmp_path / "results.jsonl")
+    calls["backend"].crashes = False
+    run(calls, output_path)
+    write_call(f"{calls['dir']}/f.wav", 900)
+
+    stats = run(calls, output_path)
+    assert stats["skipped"] == 5
+    assert stats["not_understood"] == 1
+    ids = [row["id"] for row in read_results(output_path)]
+    assert ids == ["a.wav", "b.wav", "c.wav", "d.wav", "e.wav", "f.wav"]
+
+
+def test_cut_off_row_is_processed_again(calls, tmp_path):
+    output_path = tmp_path / "results.jsonl"
+    calls["backend"].crashes = False
+    run(calls, str(output_path))
+    content = output_path.read_bytes()
+    # Cut the file in the middle of the last row, as an interruption would
+    output_path.write_bytes(content[: content.rstrip(b"\n").rfind(b"\n") + 12])
+
+    stats = run(calls, str(output_path))
+    assert stats["skipped"] == 4
+    assert stats["unreadable"] == 1
+    ids = [row["id"] for row in read_results(str(output_path))]
+    assert ids == ["a.wav", "b.wav", "c.wav", "d.wav", "e.wav"]
+
+
+@pytest.mark.parametrize("extension", [".jsonl", ".csv"])
+def test_failed_calls_are_retried_and_their_old_rows_removed(calls, tmp_path, extension):
+    output_path = str(tmp_path / f"results{extension}")
+    run(calls, output_path)
+
+    calls["backend"].crashes = False
+    stats = run(calls, output_path)
+    assert stats["skipped"] == 4
+    assert stats["ok"] == 1
+
+    rows = list(read_results(output_path))
+    assert [row["id"] for row in rows] == ["a.wav", "b.wav", "c.wav", "e.wav", "d.wav"]
+    assert rows[-1]["status"] == "ok"
+    assert rows[-1]["transcript"] == "crash"
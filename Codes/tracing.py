@@ -0,0 +1,181 @@
+"""
+AI-CallConnect Stage Tracing
+
+Lightweight per-request timing for the Connect Now pipeline: voice input (ambient noise
+calibration, listening, recognition), matching, speech synthesis, audio embedding and
+playback. Each request gets a Trace whose stage timings use the monotonic
+time.perf_counter clock. Finished traces are logged as one JSON line, added to
+fixed-size histograms and kept in a short window of recent traces.
+
+Exports:
+- JSON: every finished trace is logged by the "tracing" logger.
+- Prometheus: prometheus_text() renders the histograms in the text exposition format.
+- Streamlit: recent_traces() feeds the optional debug panel in the sidebar.
+"""
+
+# bisect: A Python module for binary search over sorted sequences, used here to pick histogram buckets.
+import bisect
+
+# collections: A Python module with specialized containers, used here for the recent trace window.
+from collections import deque
+
+# contextlib: A Python module of context manager utilities, used here for timing spans.
+from contextlib import contextmanager
+
+# itertools: A Python module of iterator building blocks, used here for trace ids.
+import itertools
+
+# json: A Python module for encoding and decoding JSON data.
+import json
+
+# threading: A Python module for running code concurrently, used here to guard the shared histograms.
+import threading
+
+# time: A Python module providing time-related functions, used here for the monotonic timers.
+import time
+
+# logging: A Python module for emitting log messages from applications and libraries.
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    """
+    Fixed-size latency histogram with cumulative bucket counts, as Prometheus expects.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        return list(itertools.accumulate(self.counts))
+
+
+class Trace:
+    """
+    Timings of the stages of one request, in seconds.
+
+    Args:
+    - tracer (Tracer): The tracer the trace is reported to when finished.
+    - trace_id (int): Sequential id of the request.
+    """
+
+    def __init__(self, tracer, trace_id):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.attributes = {}
+
+    # Function to time a block of code as a stage
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    # Function to add an externally measured duration to a stage
+    def record(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    # Function to report the trace to its tracer
+    def finish(self, **attributes):
+        self.attributes.update(attributes)
+        self.record("total", time.perf_counter() - self.started)
+        self.tracer.report(self)
+
+
+class Tracer:
+    """
+    Process-wide collection of stage histograms and recent traces.
+
+    Args:
+    - recent_size (int): Number of finished traces kept for the debug panel.
+    """
+
+    def __init__(self, recent_size=50):
+        self.histograms = {}
+        self.recent = deque(maxlen=recent_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # Function to start timing a new request
+    def start_trace(self):
+        return Trace(self, next(self._ids))
+
+    # Function to add a single duration to a stage histogram, outside of any trace
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.histograms.setdefault(stage, Histogram()).observe(seconds)
+
+    def report(self, trace):
+        with self._lock:
+            for stage, seconds in trace.stages.items():
+                self.histograms.setdefault(stage, Histogram()).observe(seconds)
+            self.recent.append(trace)
+        logger.info(
+            json.dumps(
+                {
+                    "trace_id": trace.trace_id,
+                    "stages_ms": {
+                        stage: round(seconds * 1000, 3)
+                        for stage, seconds in trace.stages.items()
+                    },
+                    **trace.attributes,
+                }
+            )
+        )
+
+    # Function to list recent traces as rows of milliseconds per stage, newest first
+    def recent_traces(self):
+        with self._lock:
+            traces = list(self.recent)
+        return [
+            {
+                "trace": trace.trace_id,
+                **{
+                    f"{stage} (ms)": round(seconds * 1000, 1)
+                    for stage, seconds in trace.stages.items()
+                },
+            }
+            for trace in reversed(traces)
+        ]
+
+    # Function to render the histograms in the Prometheus text exposition format
+    def prometheus_text(self, metric="ai_callconnect_stage_seconds"):
+        lines = [
+            f"# HELP {metric} Time spent in each stage of the Connect Now pipeline.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, histogram.cumulative()):
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+# Tracer shared by every session in the process
+_tracer = Tracer()
+
+
+# Function to get the process-wide tracer
+def get_tracer():
+    return _tracer
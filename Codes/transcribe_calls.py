@@ -0,0 +1,369 @@
+"""
+AI-CallConnect Batch Call Transcription
+
+Scores recorded calls in bulk instead of through the live microphone. Every WAV, FLAC
+or AIFF recording in a directory, or listed in a manifest, is read with sr.AudioFile,
+transcribed with the configured speech-to-text backend (see speech_to_text.py) and
+answered with match_question, across a pool of worker processes.
+
+Results are streamed to a JSONL or CSV file (by extension) as each call finishes, one
+row per call with the transcript, answer, matching stage and score and the time spent
+decoding, recognizing and matching. Results are not kept in memory, only the ids of
+calls already in the output, so thousands of calls can be scored overnight.
+
+Resuming:
+- Calls already in the output file are skipped when the command is run again, so an
+  interrupted run continues where it stopped.
+- A row cut off by the interruption is dropped and its call processed again.
+- Calls that failed with a recognition service error or an unexpected error are
+  retried on the next run, and once the run finishes the rows of their failed attempts
+  are removed, so the output holds one row per call.
+
+Manifests are CSV files with a path column (relative to the manifest) and an optional
+id column.
+
+Usage:
+    python transcribe_calls.py --audio-dir recordings --output results.jsonl --workers 4
+"""
+
+# speech_recognition: A library for performing speech recognition with support for multiple engines and APIs.
+import speech_recognition as sr
+
+# matching: The project's question matching engine, providing the answer lookup.
+from matching import match_question
+
+# corpus: The project's corpus loader, mapping the corpus pack when there is one.
+from corpus import load_corpus
+
+# speech_to_text: The project's pluggable speech-to-text backends.
+from speech_to_text import get_stt_backend, transcribe
+
+# concurrent.futures: A Python module for running tasks in pools of threads or processes.
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# argparse: A Python module for parsing command-line arguments.
+import argparse
+
+# csv: A Python module for reading and writing CSV files, used here for manifests and CSV results.
+import csv
+
+# json: A Python module for encoding and decoding JSON data, used here for JSONL results.
+import json
+
+# os: A Python module that provides a way of interacting with the operating system, including file and directory manipulation.
+import os
+
+# time: A Python module providing time-related functions, used here to time every stage.
+import time
+
+# logging: A Python module for emitting log messages from applications and libraries.
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Extensions sr.AudioFile can read
+AUDIO_EXTENSIONS = (".wav", ".flac", ".aif", ".aiff")
+
+# Columns of every result row, in output order
+RESULT_FIELDS = [
+    "id",
+    "path",
+    "status",
+    "transcript",
+    "answer",
+    "stage",
+    "score",
+    "audio_seconds",
+    "decode_ms",
+    "recognition_ms",
+    "match_cache_ms",
+    "match_exact_ms",
+    "match_fuzzy_ms",
+    "match_fallback_ms",
+    "total_ms",
+    "error",
+]
+
+# Statuses retried when the command is run again
+RETRY_STATUSES = {"request_error", "error"}
+
+# Calls queued per worker, so an interruption loses little work and memory stays flat
+QUEUE_PER_WORKER = 4
+
+
+# Function to list the (id, path) of every recording under a directory, in a stable order
+def find_recordings(audio_dir):
+    for root, dirs, files in os.walk(audio_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, audio_dir), path
+
+
+# Function to list the (id, path) of every recording in a manifest CSV
+def read_manifest(manifest_path):
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline="", encoding="utf-8") as manifest_file:
+        for row in csv.DictReader(manifest_file):
+            path = row["path"]
+            yield row.get("id") or path, os.path.join(base, path)
+
+
+# Function to stream the result rows of an output file
+def read_results(output_path):
+    with open(output_path, newline="", encoding="utf-8") as output_file:
+        if output_path.endswith(".csv"):
+            yield from csv.DictReader(output_file)
+        else:
+            yield from (json.loads(line) for line in output_file if line.strip())
+
+
+# Function to read the progress of an earlier run, dropping a cut-off last row
+def read_progress(output_path):
+    """
+    Returns:
+    - tuple: (ids of calls done, ids of calls to retry, number of rows in the file).
+    """
+    if not os.path.exists(output_path):
+        return set(), set(), 0
+
+    with open(output_path, "rb+") as output_file:
+        content = output_file.read()
+        end = content.rfind(b"\n") + 1
+        if end != len(content):
+            output_file.truncate(end)
+
+    done = set()
+    retry = set()
+    rows = 0
+    for row in read_results(output_path):
+        rows += 1
+        if row["status"] in RETRY_STATUSES:
+            retry.add(row["id"])
+        else:
+            done.add(row["id"])
+    return done, retry - done, rows
+
+
+# Function to remove the rows of earlier attempts at calls that were retried
+def compact_retries(output_path, previous_rows, retried):
+    """
+    Args:
+    - output_path (str): Path of the JSONL or CSV results.
+    - previous_rows (int): Number of rows written before this run.
+    - retried (set): Ids of the calls that got a new row in this run.
+    """
+    base, extension = os.path.splitext(output_path)
+    partial = f"{base}.part{extension}"
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    writer = ResultWriter(partial)
+    try:
+        for number, row in enumerate(read_results(output_path)):
+            if number < previous_rows and row["id"] in retried:
+                continue
+            writer.write(row)
+    finally:
+        writer.close()
+    os.replace(partial, output_path)
+
+
+class ResultWriter:
+    """
+    Appends result rows to a JSONL or CSV file, flushing every row.
+
+    Args:
+    - output_path (str): Path of the results; .csv writes CSV, anything else JSONL.
+    """
+
+    def __init__(self, output_path):
+        self.is_csv = output_path.endswith(".csv")
+        new_file = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self.output_file = open(output_path, "a", newline="", encoding="utf-8")
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.output_file, fieldnames=RESULT_FIELDS)
+            if new_file:
+                self.writer.writeheader()
+
+    def write(self, row):
+        if self.is_csv:
+            self.writer.writerow(row)
+        else:
+            self.output_file.write(json.dumps(row) + "\n")
+        self.output_file.flush()
+
+    def close(self):
+        self.output_file.close()
+
+
+# Corpus, speech-to-text backend and domain of a worker process, set once by the pool initializer
+_worker_corpus = None
+_worker_stt = None
+_worker_domain = None
+
+
+def _init_worker(corpus_path, stt_name, domain):
+    global _worker_corpus, _worker_stt, _worker_domain
+    # Each worker maps the corpus pack or parses the CSV once, not once per call
+    _worker_corpus = load_corpus(corpus_path)
+    _worker_stt = get_stt_backend(stt_name)
+    _worker_domain = domain
+
+
+# Function to transcribe and answer one recording, returning its result row
+def process_call(job):
+    call_id, path = job
+    row = {field: None for field in RESULT_FIELDS}
+    row.update(id=call_id, path=path)
+    start = time.perf_counter()
+    try:
+        recognizer = sr.Recognizer()
+        with sr.AudioFile(path) as source:
+            audio = recognizer.record(source)
+        row["decode_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        row["audio_seconds"] = round(
+            len(audio.frame_data) / (audio.sample_rate * audio.sample_width), 3
+        )
+
+        recognition = transcribe(recognizer, audio, _worker_stt)
+        row["recognition_ms"] = round(recognition.seconds * 1000, 3)
+        row["transcript"] = recognition.text
+
+        timings = {}
+        match = match_question(
+            _worker_corpus.index,
+            recognition.text,
+            _worker_corpus.backend,
+            timings,
+            _worker_domain,
+            _worker_corpus.cache,
+        )
+        for stage, seconds in timings.items():
+            row[f"match_{stage}_ms"] = round(seconds * 1000, 3)
+        row.update(status="ok", answer=match.answer, stage=match.stage, score=match.score)
+    except sr.UnknownValueError:
+        row["status"] = "not_understood"
+    except sr.RequestError as e:
+        row.update(status="request_error", error=str(e))
+    except (OSError, ValueError, EOFError) as e:
+        # Missing files and audio sr.AudioFile cannot decode
+        row.update(status="unreadable", error=str(e))
+    except Exception as e:
+        # Anything else fails only this call, so the rest of the run goes on
+        logger.exception("Failed to process call %s", call_id)
+        row.update(status="error", error=f"{type(e).__name__}: {e}")
+    row["total_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return row
+
+
+# Function to transcribe and answer every recording not yet in the output file
+def transcribe_calls(
+    recordings,
+    output_path,
+    corpus_path="data/final/question_answer.csv",
+    workers=None,
+    stt_name=None,
+    domain=None,
+):
+    """
+    Args:
+    - recordings (iterable): (id, path) of every recording, as from find_recordings.
+    - output_path (str): Path of the JSONL or CSV results, appended to when it exists.
+    - corpus_path (str): Path of the question-answer corpus.
+    - workers (int): Number of worker processes, or None for one per CPU.
+    - stt_name (str): Speech-to-text backend, or None for the configured one.
+    - domain (str): Domain the questions are restricted to, or None for all.
+
+    Returns:
+    - dict: Number of calls skipped and processed, by status, and seconds of audio.
+    """
+    done, retry, previous_rows = read_progress(output_path)
+    stats = {"skipped": 0, "audio_seconds": 0.0}
+    jobs = []
+    for call_id, path in recordings:
+        if call_id in done:
+            stats["skipped"] += 1
+        else:
+            jobs.append((call_id, path))
+
+    # Calls retried in this run that got a new row
+    retried = set()
+
+    # Build the backend before any worker starts, so a missing engine or model fails
+    # here once instead of in every worker
+    get_stt_backend(stt_name)
+
+    writer = ResultWriter(output_path)
+
+    def record(row):
+        writer.write(row)
+        if row["id"] in retry:
+            retried.add(row["id"])
+        stats[row["status"]] = stats.get(row["status"], 0) + 1
+        stats["audio_seconds"] += row["audio_seconds"] or 0.0
+
+    try:
+        if workers == 1:
+            _init_worker(corpus_path, stt_name, domain)
+            for job in jobs:
+                record(process_call(job))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(corpus_path, stt_name, domain),
+            ) as pool:
+                limit = (workers or os.cpu_count() or 1) * QUEUE_PER_WORKER
+                pending = set()
+                for job in jobs:
+                    pending.add(pool.submit(process_call, job))
+                    if len(pending) >= limit:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            record(future.result())
+                for future in wait(pending).done:
+                    record(future.result())
+    finally:
+        writer.close()
+        # Also after an interruption, so a retried call never has two rows
+        if retried:
+            compact_retries(output_path, previous_rows, retried)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcribe and answer recorded calls in bulk.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--audio-dir", help="Directory searched recursively for WAV, FLAC and AIFF files")
+    source.add_argument("--manifest", help="CSV with a path and an optional id column")
+    parser.add_argument("--output", default="transcripts.jsonl", help="Results, .jsonl or .csv")
+    parser.add_argument("--corpus", default="data/final/question_answer.csv")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--stt", default=None, help="Speech-to-text backend, AI_CALLCONNECT_STT by default")
+    parser.add_argument("--domain", default=None)
+    args = parser.parse_args()
+
+    if args.audio_dir:
+        recordings = find_recordings(args.audio_dir)
+    else:
+        recordings = read_manifest(args.manifest)
+
+    start = time.perf_counter()
+    stats = transcribe_calls(
+        recordings, args.output, args.corpus, args.workers, args.stt, args.domain
+    )
+    elapsed = time.perf_counter() - start
+    processed = sum(
+        count for status, count in stats.items() if status not in ("skipped", "audio_seconds")
+    )
+    print(f"Skipped {stats['skipped']} calls already in {args.output}")
+    print(
+        f"Processed {processed} calls ({stats['audio_seconds']:.0f}s of audio) in {elapsed:.1f}s: "
+        + ", ".join(
+            f"{count} {status}"
+            for status, count in stats.items()
+            if status not in ("skipped", "audio_seconds")
+        )
+    )
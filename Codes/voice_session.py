@@ -0,0 +1,126 @@
+"""
+AI-CallConnect Voice Session
+
+Microphone capture state kept for the whole session of a caller instead of being
+rebuilt for every question. Calibrating the energy threshold with
+adjust_for_ambient_noise listens to the room for about a second, so it is done once,
+when the first question is asked, and the calibrated Recognizer is reused afterwards.
+
+Keeping the threshold current:
+- During every listen the Recognizer keeps adapting the threshold to the noise it
+  hears (dynamic_energy_threshold).
+- Once the calibration is older than recalibrate_after seconds, a short calibration
+  runs on a background thread after the question, while the caller listens to the
+  answer, so the next question still starts capturing immediately.
+
+Questions record a zero "calibration" stage and the time the skipped calibration
+would have cost as "calibration_saved" in their trace.
+"""
+
+# speech_recognition: A library for performing speech recognition with support for multiple engines and APIs.
+import speech_recognition as sr
+
+# contextlib: A Python module of context manager utilities, used here for the calibrated microphone.
+from contextlib import contextmanager
+
+# threading: A Python module for running code concurrently, used here for the background recalibration.
+import threading
+
+# time: A Python module providing time-related functions, used here to time and age the calibration.
+import time
+
+# logging: A Python module for emitting log messages from applications and libraries.
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceSession:
+    """
+    Calibrated Recognizer of one caller, shared by all of their questions.
+
+    Args:
+    - recalibrate_after (float): Age in seconds after which the threshold is recalibrated.
+    - calibration_seconds (float): Length of the first calibration.
+    - background_seconds (float): Length of the background recalibrations.
+    - microphone_factory (callable): Creates the microphone source, sr.Microphone by default.
+    """
+
+    def __init__(
+        self,
+        recalibrate_after=60.0,
+        calibration_seconds=1.0,
+        background_seconds=0.5,
+        microphone_factory=sr.Microphone,
+    ):
+        self.recognizer = sr.Recognizer()
+        self.recalibrate_after = recalibrate_after
+        self.calibration_seconds = calibration_seconds
+        self.background_seconds = background_seconds
+        self.microphone_factory = microphone_factory
+        self.calibrated_at = None
+        # Duration of the first calibration, the time saved by every later question
+        self.calibration_cost = 0.0
+        # Held while the microphone is open, so capture and recalibration never overlap
+        self._microphone_lock = threading.Lock()
+        self._recalibration = None
+
+    @property
+    def calibrated(self):
+        return self.calibrated_at is not None
+
+    # Function to tell whether the calibration is due for a refresh
+    def is_stale(self):
+        return (
+            not self.calibrated
+            or time.monotonic() - self.calibrated_at > self.recalibrate_after
+        )
+
+    def _calibrate(self, source, duration):
+        start = time.perf_counter()
+        self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+        self.calibrated_at = time.monotonic()
+        return time.perf_counter() - start
+
+    # Function to open the microphone with a calibrated Recognizer
+    @contextmanager
+    def microphone(self, trace):
+        """
+        Args:
+        - trace (Trace): The request trace the calibration stages are recorded in.
+
+        Yields:
+        - sr.AudioSource: The open microphone, ready to listen with self.recognizer.
+        """
+        with self._microphone_lock:
+            with self.microphone_factory() as source:
+                if self.calibrated:
+                    trace.record("calibration", 0.0)
+                    trace.record("calibration_saved", self.calibration_cost)
+                else:
+                    seconds = self._calibrate(source, self.calibration_seconds)
+                    self.calibration_cost = seconds
+                    trace.record("calibration", seconds)
+                yield source
+
+        if self.is_stale():
+            self.recalibrate_in_background()
+
+    # Function to refresh the calibration on a background thread, unless one is running
+    def recalibrate_in_background(self):
+        if self._recalibration is not None and self._recalibration.is_alive():
+            return
+        self._recalibration = threading.Thread(target=self._recalibrate, daemon=True)
+        self._recalibration.start()
+
+    def _recalibrate(self):
+        # A question being captured has priority; its listen adapts the threshold anyway
+        if not self._microphone_lock.acquire(blocking=False):
+            return
+        try:
+            with self.microphone_factory() as source:
+                self._calibrate(source, self.background_seconds)
+        except (OSError, AttributeError) as e:
+            logger.warning("Background recalibration failed: %s", e)
+        finally:
+            self._microphone_lock.release()